@@ -0,0 +1,146 @@
+"""Micro-benchmark: REST `dict(row)` decoding vs the Arrow result path, on synthetic result sets.
+
+For each result size, the same sales rows are encoded the way BigQuery delivers
+them: REST `tabledata` JSON (every value a string) and an Arrow IPC stream (the
+format of the Storage Read API). Three ways of producing the first page of
+`execute_sql` output are then timed:
+
+- `rest_dicts`: parse the JSON, build a `Row` and a dict per row (the REST path)
+- `arrow_page`: read the Arrow stream zero-copy and convert only the page rows
+- `arrow_dicts`: read the Arrow stream and convert every row (the worst case)
+
+Reports rows/second (median of `--repeats`) and peak memory (Python heap via
+tracemalloc plus the Arrow memory pool) for each path.
+
+    uv run python -m benchmarks.arrow_results
+    uv run python -m benchmarks.arrow_results --rows 10000,200000 --repeats 3
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pyarrow as pa
+from google.cloud.bigquery import _helpers
+
+from benchmarks.fakes import SALES_SCHEMA, generate_sales_rows
+from sales_agent.arrow_results import iter_arrow_rows
+
+_ARROW_TYPES = {"INT64": pa.int64(), "DATE": pa.date32(), "STRING": pa.string(), "FLOAT64": pa.float64()}
+
+
+def make_payloads(num_rows: int, seed: int) -> tuple:
+    """Returns (REST JSON text, Arrow IPC stream bytes) holding the same synthetic sales rows."""
+    rows = generate_sales_rows(num_rows, seed)
+    rest = json.dumps({"rows": [{"f": [{"v": str(value)} for value in row]} for row in rows]})
+
+    columns = list(zip(*rows)) if rows else [[] for _ in SALES_SCHEMA]
+    arrays = []
+    for field, values in zip(SALES_SCHEMA, columns):
+        if field.field_type == "DATE":
+            values = pa.array(values, pa.string()).cast(pa.date32())
+        arrays.append(pa.array(values, _ARROW_TYPES[field.field_type]))
+    table = pa.Table.from_arrays(arrays, names=[field.name for field in SALES_SCHEMA])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        # Storage Read API streams arrive as record batches of a few thousand rows
+        writer.write_table(table, max_chunksize=4096)
+    return rest, sink.getvalue()
+
+
+def _first_page(rows, page_rows: int) -> str:
+    page = []
+    for row in rows:
+        if len(page) >= page_rows:
+            break
+        page.append(dict(row))
+    return str(page)
+
+
+def rest_dicts(rest: str, arrow_stream, page_rows: int) -> int:
+    rows = [dict(row) for row in _helpers._rows_from_json(json.loads(rest)["rows"], SALES_SCHEMA)]
+    _first_page(rows, page_rows)
+    return len(rows)
+
+
+def arrow_page(rest: str, arrow_stream, page_rows: int) -> int:
+    table = pa.ipc.open_stream(arrow_stream).read_all()
+    _first_page(iter_arrow_rows(table, 0, chunk_rows=page_rows + 1), page_rows)
+    return table.num_rows
+
+
+def arrow_dicts(rest: str, arrow_stream, page_rows: int) -> int:
+    table = pa.ipc.open_stream(arrow_stream).read_all()
+    rows = list(iter_arrow_rows(table))
+    _first_page(rows, page_rows)
+    return len(rows)
+
+
+PATHS = {"rest_dicts": rest_dicts, "arrow_page": arrow_page, "arrow_dicts": arrow_dicts}
+
+
+def measure(path, rest: str, arrow_stream, page_rows: int, repeats: int) -> dict:
+    """Median rows/second over `repeats` runs, then one traced run for peak memory."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        num_rows = path(rest, arrow_stream, page_rows)
+        durations.append(time.perf_counter() - start)
+
+    # A proxy pool tracks its own peak, so Arrow allocations are attributed to this run only
+    previous_pool = pa.default_memory_pool()
+    pool = pa.proxy_memory_pool(previous_pool)
+    pa.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        path(rest, arrow_stream, page_rows)
+        _, python_peak = tracemalloc.get_traced_memory()
+        arrow_peak = pool.max_memory() or 0
+    finally:
+        tracemalloc.stop()
+        pa.set_memory_pool(previous_pool)
+
+    median = statistics.median(durations)
+    return {
+        "rows": num_rows,
+        "seconds": median,
+        "rows_per_s": num_rows / median if median else None,
+        "peak_python_mb": python_peak / 1e6,
+        "peak_arrow_mb": arrow_peak / 1e6,
+        "peak_total_mb": (python_peak + arrow_peak) / 1e6,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000,100000", help="Comma-separated result sizes.")
+    parser.add_argument("--page-rows", type=int, default=100, help="Rows on the formatted first page.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per path; the median is reported.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the synthetic rows.")
+    parser.add_argument("--output", help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    report = {"sizes": [], "settings": {k: v for k, v in vars(args).items() if k != "output"}}
+    for num_rows in (int(n) for n in args.rows.split(",") if n.strip()):
+        rest, arrow_stream = make_payloads(num_rows, args.seed)
+        paths = {name: measure(path, rest, arrow_stream, args.page_rows, args.repeats) for name, path in PATHS.items()}
+        baseline = paths["rest_dicts"]["seconds"]
+        for result in paths.values():
+            result["speedup_vs_rest"] = baseline / result["seconds"] if result["seconds"] else None
+        report["sizes"].append({"rows": num_rows, "rest_bytes": len(rest), "arrow_bytes": arrow_stream.size,
+                                "paths": paths})
+        print(f"rows={num_rows}: " + ", ".join(
+            f"{name} {r['rows_per_s']:,.0f} rows/s {r['peak_total_mb']:.1f}MB" for name, r in paths.items()
+        ), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
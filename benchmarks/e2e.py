@@ -0,0 +1,347 @@
+"""End-to-end benchmark: replays a corpus of sales questions through the real agent offline.
+
+The agent, Runner, in-memory services and tools are the production code from
+`create_runner()`; only the edges are replaced. Gemini is swapped for
+`ScriptedLlm` (via `MODEL=scripted-sales`) and BigQuery for a SQLite-backed
+client loaded with a synthetic sales dataset (see benchmarks/fakes.py).
+Reports tool calls, LLM round trips, tokens, bytes processed and latency per
+question (total, and perceived: time to the first answer token and to the
+final answer), plus process memory.
+
+    uv run python -m benchmarks.e2e
+    uv run python -m benchmarks.e2e --llm-latency-ms 400 --query-latency-ms 800 --repeats 3
+    uv run python -m benchmarks.e2e --write-baseline benchmarks/e2e_baseline.json
+    uv run python -m benchmarks.e2e --baseline benchmarks/e2e_baseline.json
+    uv run python -m benchmarks.e2e --plan-cache --repeats 2
+    uv run python -m benchmarks.e2e --history-max-tokens 1000
+    uv run python -m benchmarks.e2e --streaming  # stream answers as partial events (SSE)
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "sales_questions.json")
+
+# Always offline: the scripted model and local services, whatever the .env says.
+_FORCED_ENV = {
+    "MODEL": "scripted-sales",
+    "USE_AGENT_ENGINE_MEMORY": "false",
+    "USE_AGENT_ENGINE_SESSION": "false",
+    "INSTRUMENTATION_ENABLED": "true",
+}
+
+# Placeholder settings so the benchmark runs without a .env; real values are kept if set.
+_DEFAULT_ENV = {
+    "GOOGLE_CLOUD_PROJECT": "benchmark-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "BIGQUERY_TABLE_ID": "benchmark-project.sales.sales_transactions",
+    "PREFETCH_SCHEMA": "false",
+    "RESULT_CACHE_BACKEND": "memory",
+    "METADATA_REFRESH_INTERVAL_SECONDS": "0",
+    "PLAN_CACHE_ENABLED": "false",
+    "MEMORY_INGESTION": "write_behind",
+}
+
+# Per-question metrics compared against a baseline: counts must not grow at all
+_COUNT_METRICS = ("tool_calls", "llm_round_trips", "tool_errors")
+_TOLERANT_METRICS = ("prompt_tokens", "latency_s")
+# Latency differences below this are noise on a millisecond-scale offline run
+_LATENCY_SLACK_S = 0.05
+
+
+def configure_environment() -> None:
+    os.environ.update(_FORCED_ENV)
+    for key, value in _DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def load_corpus(path: str, table_id: str) -> list:
+    """Loads the question corpus, filling in `{table_id}`, `{dataset_id}`, `{dataset_name}` and `{project_id}`."""
+    project_id, dataset_name, _ = table_id.split(".")
+    replacements = {
+        "{table_id}": table_id,
+        "{dataset_id}": f"{project_id}.{dataset_name}",
+        "{dataset_name}": dataset_name,
+        "{project_id}": project_id,
+    }
+
+    def fill(value):
+        if isinstance(value, str):
+            for placeholder, replacement in replacements.items():
+                value = value.replace(placeholder, replacement)
+            return value
+        if isinstance(value, list):
+            return [fill(v) for v in value]
+        if isinstance(value, dict):
+            return {k: fill(v) for k, v in value.items()}
+        return value
+
+    with open(path) as f:
+        return fill(json.load(f))
+
+
+class SpanCollector:
+    """Instrumentation sink that keeps every span in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def write(self, span, instrumentation) -> None:
+        self.spans.append(span)
+
+
+def build_runner(rows: int, seed: int, query_latency_s: float, session_service=None):
+    """Returns (runner, fake BigQuery client) with the scripted model and local BigQuery installed."""
+    from google.adk.models.registry import LLMRegistry
+    from benchmarks.fakes import ScriptedLlm, create_sales_client
+    from sales_agent import tools
+    from sales_agent.agent import create_runner
+    from sales_agent.config import config
+
+    # The agent module configures INFO logging on stdout; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    LLMRegistry.register(ScriptedLlm)
+    fake_client = create_sales_client(config.bigquery_table_id, rows, seed, query_latency_s)
+    tools.client_pool.client_factory = lambda token: fake_client
+    tools.client_pool.clear()
+    runner = create_runner(session_service=session_service)
+    if tools.replica_router is not None:
+        # Take the first snapshot up front so every question sees the same routing
+        tools.replica_router.replica.sync(force=True)
+    return runner, fake_client
+
+
+async def ask(runner, user_id: str, session_id: str, question: str, run_config=None) -> tuple:
+    """Sends one question; returns (final answer, invocation ids, timings).
+
+    Timings are those of `StreamRenderer.finish()`, measured the way a client
+    sees them: `first_token_s`, `answer_s` and `total_s` (wall-clock seconds).
+    """
+    from google.genai import types
+    from sales_agent.streaming import StreamRenderer
+
+    message = types.Content(role="user", parts=[types.Part(text=question)])
+    invocation_ids = set()
+    renderer = StreamRenderer(out=io.StringIO(), show_tools=False)
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message,
+                                        run_config=run_config):
+        invocation_ids.add(event.invocation_id)
+        renderer.feed(event)
+    return renderer.answer, invocation_ids, renderer.finish()
+
+
+def question_metrics(spans: list) -> dict:
+    """Aggregates the instrumentation spans of one question."""
+    llm = [s for s in spans if s.kind == "llm"]
+    tool = [s for s in spans if s.kind == "tool"]
+    return {
+        "tool_calls": len(tool),
+        "llm_round_trips": len(llm),
+        "prompt_tokens": sum(s.attributes.get("prompt_tokens", 0) for s in llm),
+        "response_tokens": sum(s.attributes.get("response_tokens", 0) for s in llm),
+        "bytes_processed": sum(s.attributes.get("bytes_processed", 0) for s in tool),
+        "cache_hits": sum(s.attributes.get("cache_hits", 0) for s in tool),
+        "tool_errors": sum(1 for s in tool if s.attributes.get("error")),
+        "tools": [s.name for s in tool],
+        "engines": sorted({engine for s in tool for engine in s.attributes.get("engines", [])}),
+    }
+
+
+async def run_corpus(runner, corpus: list, collector: SpanCollector, repeats: int, trace_memory: bool,
+                     run_config=None) -> list:
+    """Asks every question in order, one session per repeat, and returns one result per question asked."""
+    results = []
+    for repeat in range(repeats):
+        session_id = f"benchmark-session-{repeat}"
+        for item in corpus:
+            if trace_memory:
+                tracemalloc.reset_peak()
+            answer, invocation_ids, timings = await ask(
+                runner, "benchmark-user", session_id, item["question"], run_config
+            )
+            result = {
+                "id": item["id"],
+                "repeat": repeat,
+                "latency_s": timings["total_s"],
+                "first_token_s": timings["first_token_s"],
+                "answer_s": timings["answer_s"],
+                "answered": bool(answer),
+                **question_metrics([s for s in collector.spans if s.invocation_id in invocation_ids]),
+            }
+            if trace_memory:
+                result["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+            results.append(result)
+    return results
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q * (len(ordered) - 1)))))]
+
+
+def _median(values) -> float:
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def summarize(results: list) -> dict:
+    """Collapses repeats into one entry per question (median latency) plus run totals."""
+    questions = {}
+    for result in results:
+        questions.setdefault(result["id"], []).append(result)
+    per_question = {}
+    timed = ("latency_s", "first_token_s", "answer_s")
+    for question_id, runs in questions.items():
+        first = runs[0]
+        per_question[question_id] = {
+            **{k: v for k, v in first.items() if k not in ("id", "repeat", "peak_traced_mb") + timed},
+            **{k: _median(r[k] for r in runs) for k in timed},
+            "cache_hits": sum(r["cache_hits"] for r in runs),
+            "answered": all(r["answered"] for r in runs),
+        }
+        if "peak_traced_mb" in first:
+            per_question[question_id]["peak_traced_mb"] = max(r["peak_traced_mb"] for r in runs)
+    latencies = [r["latency_s"] for r in results]
+    first_tokens = [r["first_token_s"] for r in results if r["first_token_s"] is not None]
+    return {
+        "questions": per_question,
+        "totals": {
+            "questions_asked": len(results),
+            "tool_calls": sum(r["tool_calls"] for r in results),
+            "llm_round_trips": sum(r["llm_round_trips"] for r in results),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in results),
+            "bytes_processed": sum(r["bytes_processed"] for r in results),
+            "latency_p50_s": _percentile(latencies, 0.5),
+            "latency_p95_s": _percentile(latencies, 0.95),
+            "first_token_p50_s": _percentile(first_tokens, 0.5) if first_tokens else None,
+            "first_token_p95_s": _percentile(first_tokens, 0.95) if first_tokens else None,
+            "wall_s": sum(latencies),
+            "peak_rss_mb": _peak_rss_mb(),
+        },
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns descriptions of per-question metrics that regressed against the baseline.
+
+    Tool calls, LLM round trips and tool errors may not grow at all; prompt tokens
+    and latency may grow by `tolerance` (a fraction). Questions missing from either
+    side are skipped.
+    """
+    regressions = []
+    for question_id, expected in baseline.get("questions", {}).items():
+        actual = report["questions"].get(question_id)
+        if actual is None:
+            continue
+        for metric in _COUNT_METRICS:
+            if metric in expected and actual[metric] > expected[metric]:
+                regressions.append(f"{question_id}.{metric}: {actual[metric]} vs baseline {expected[metric]}")
+        for metric in _TOLERANT_METRICS:
+            slack = _LATENCY_SLACK_S if metric == "latency_s" else 0
+            if metric in expected and actual[metric] > expected[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{question_id}.{metric}: {actual[metric]:.4g} vs baseline {expected[metric]:.4g}")
+        if expected.get("answered") and not actual["answered"]:
+            regressions.append(f"{question_id}: no longer answered")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=_CORPUS_PATH, help="JSON list of scripted questions.")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows in the synthetic sales table.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the synthetic dataset.")
+    parser.add_argument("--repeats", type=int, default=1, help="Times the corpus is replayed, each in a new session.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated fixed latency per LLM call.")
+    parser.add_argument("--llm-latency-per-1k-tokens-ms", type=float, default=0, help="Simulated latency per 1k prompt tokens.")
+    parser.add_argument("--query-latency-ms", type=float, default=0, help="Simulated latency per BigQuery query.")
+    parser.add_argument("--replica", action="store_true", help="Serve eligible queries from the local DuckDB replica.")
+    parser.add_argument("--plan-cache", action="store_true", help="Replay SQL plans for questions seen before.")
+    parser.add_argument("--history-max-tokens", type=int,
+                        help="Per-session history budget before old tool results are compacted (HISTORY_MAX_TOKENS).")
+    parser.add_argument("--streaming", action="store_true", help="Stream model text as partial events (SSE).")
+    parser.add_argument("--trace-memory", action="store_true", help="Report peak traced allocations per question (slower).")
+    parser.add_argument("--baseline", help="Fail if this run regressed against the baseline file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth in tokens and latency vs the baseline.")
+    parser.add_argument("--write-baseline", help="Write this run's report to the given file.")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    if args.replica:
+        os.environ["REPLICA_ENABLED"] = "true"
+        os.environ["REPLICA_DIR"] = tempfile.mkdtemp(prefix="sales-agent-replica-")
+    if args.plan_cache:
+        os.environ["PLAN_CACHE_ENABLED"] = "true"
+    if args.history_max_tokens is not None:
+        os.environ["HISTORY_MAX_TOKENS"] = str(args.history_max_tokens)
+    from benchmarks.fakes import ScriptedLlm
+    from sales_agent.config import config
+    from sales_agent.instrumentation import get_instrumentation
+
+    corpus = load_corpus(args.corpus, config.bigquery_table_id)
+    ScriptedLlm.configure(
+        {item["question"]: item for item in corpus},
+        latency_s=args.llm_latency_ms / 1000,
+        latency_per_1k_prompt_tokens_s=args.llm_latency_per_1k_tokens_ms / 1000,
+    )
+    runner, fake_client = build_runner(args.rows, args.seed, args.query_latency_ms / 1000)
+    collector = SpanCollector()
+    get_instrumentation().sinks.append(collector)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    from sales_agent.agent import create_run_config
+    run_config = create_run_config(streaming=args.streaming)
+    results = asyncio.run(run_corpus(runner, corpus, collector, args.repeats, args.trace_memory, run_config))
+    report = summarize(results)
+    report["totals"]["bigquery_queries_run"] = fake_client.queries_run
+    from sales_agent import tools
+    if tools.replica_router is not None:
+        report["routing"] = tools.replica_router.report()["served"]
+    if args.plan_cache:
+        report["plan_cache"] = tools.plan_cache.stats()
+    report["result_format"] = tools.result_formatter.stats()
+    report["sql_validation"] = tools.sql_validator.stats()
+    if config.memory_ingestion in ("write_behind", "inline"):
+        from sales_agent.memory import get_memory_ingestor
+        get_memory_ingestor().flush()
+        report["memory_ingestion"] = get_memory_ingestor().stats()
+    if config.history_max_tokens > 0:
+        from sales_agent.session_history import get_history_compactor
+        compactor = get_history_compactor()
+        report["session_history"] = {
+            **compactor.stats(),
+            # History tokens sent to the model on each call, per session
+            "sent_tokens": {sid: [p["sent_tokens"] for p in points] for sid, points in compactor.report().items()},
+        }
+    report["settings"] = {k: v for k, v in vars(args).items() if k not in ("baseline", "write_baseline", "corpus")}
+    print(json.dumps(report, indent=2))
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+"""Offline stand-ins for Gemini and BigQuery used by the end-to-end benchmarks.
+
+`FakeBigQueryClient` implements the subset of `bigquery.Client` the tools use
+on top of SQLite, loaded with a deterministic synthetic sales dataset.
+`ScriptedLlm` replays a fixed sequence of tool calls per question, so a run
+exercises the real agent, Runner and tools without any network access.
+`FakeMemoryBank` stands in for Vertex AI Memory Bank with simulated latency
+and transient failures.
+"""
+import asyncio
+import datetime
+import itertools
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncGenerator, Dict, List, Optional
+
+import pyarrow as pa
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+from google.genai import types
+
+from sales_agent.memory import InvertedIndexMemoryService
+from sales_agent.sql_utils import extract_table_refs, qualify_table_id
+
+REGIONS = ["North America", "Europe", "Asia Pacific", "Latin America", "Middle East"]
+PRODUCTS = [
+    ("Laptop Pro 14", "Computers", 1899.0),
+    ("Laptop Air 13", "Computers", 1199.0),
+    ("Desktop Tower", "Computers", 1499.0),
+    ("4K Monitor", "Displays", 449.0),
+    ("Portable Monitor", "Displays", 229.0),
+    ("Wireless Mouse", "Accessories", 39.0),
+    ("Mechanical Keyboard", "Accessories", 129.0),
+    ("USB-C Dock", "Accessories", 199.0),
+    ("Noise Cancelling Headphones", "Audio", 349.0),
+    ("Conference Speaker", "Audio", 279.0),
+]
+
+SALES_SCHEMA = [
+    bigquery.SchemaField("transaction_id", "INT64", description="Unique transaction id"),
+    bigquery.SchemaField("order_date", "DATE", description="Date the order was placed"),
+    bigquery.SchemaField("customer_id", "STRING"),
+    bigquery.SchemaField("customer_name", "STRING"),
+    bigquery.SchemaField("region", "STRING", description="Sales region"),
+    bigquery.SchemaField("product", "STRING"),
+    bigquery.SchemaField("quantity", "INT64"),
+    bigquery.SchemaField("unit_price", "FLOAT64", description="Price per unit in USD"),
+    bigquery.SchemaField("revenue", "FLOAT64", description="quantity * unit_price in USD"),
+]
+
+PRODUCTS_SCHEMA = [
+    bigquery.SchemaField("product", "STRING"),
+    bigquery.SchemaField("category", "STRING"),
+    bigquery.SchemaField("list_price", "FLOAT64"),
+]
+
+# Approximate BigQuery storage size per value, used for bytes-processed estimates
+_TYPE_BYTES = {"INT64": 8, "FLOAT64": 8, "NUMERIC": 16, "BOOL": 1, "DATE": 8, "TIMESTAMP": 8}
+
+_DATE_LITERAL_RE = re.compile(r"\bDATE\s*('[^']*')", re.I)
+_TABLE_PATH_RE = re.compile(r"`([^`]+)`|\b([A-Za-z0-9_\-]+(?:\.[A-Za-z0-9_\-]+){1,2})\b")
+_WORD_RE = re.compile(r"[A-Za-z_]\w*")
+
+
+def generate_sales_rows(num_rows: int, seed: int = 7, start: datetime.date = datetime.date(2024, 1, 1), days: int = 730) -> list:
+    """Returns `num_rows` deterministic sales transactions spread over `days` days."""
+    rng = random.Random(seed)
+    customers = [(f"C{i:05d}", f"Customer {i}") for i in range(max(10, num_rows // 20))]
+    rows = []
+    for transaction_id in range(1, num_rows + 1):
+        customer_id, customer_name = rng.choice(customers)
+        product, _, price = rng.choice(PRODUCTS)
+        quantity = rng.randint(1, 10)
+        rows.append((
+            transaction_id,
+            (start + datetime.timedelta(days=rng.randrange(days))).isoformat(),
+            customer_id,
+            customer_name,
+            rng.choice(REGIONS),
+            product,
+            quantity,
+            price,
+            round(quantity * price, 2),
+        ))
+    return rows
+
+
+def _value_bytes(field_type: str, value) -> int:
+    return _TYPE_BYTES.get(field_type, len(str(value)) + 2)
+
+
+_ARROW_TYPES = {"INT64": pa.int64(), "FLOAT64": pa.float64(), "DATE": pa.date32(), "STRING": pa.string()}
+
+
+class FakeRowIterator:
+    """Iterates a slice of stored result rows, like `bigquery.table.RowIterator`."""
+
+    def __init__(self, rows: list, field_to_index: dict, start: int = 0, max_results: Optional[int] = None,
+                 schema: Optional[List[bigquery.SchemaField]] = None):
+        self.total_rows = len(rows)
+        end = len(rows) if max_results is None else min(len(rows), start + max_results)
+        self._rows = rows[start:end]
+        self._field_to_index = field_to_index
+        self._schema = schema
+
+    def __iter__(self):
+        return (Row(values, self._field_to_index) for values in self._rows)
+
+    def to_arrow(self, **kwargs) -> pa.Table:
+        names = list(self._field_to_index)
+        columns = [list(column) for column in zip(*self._rows)] if self._rows else [[] for _ in names]
+        if self._schema is None:
+            return pa.table(dict(zip(names, columns)))
+        arrays = []
+        for field, values in zip(self._schema, columns):
+            if field.field_type == "DATE":
+                values = [datetime.date.fromisoformat(v) if v is not None else None for v in values]
+            arrays.append(pa.array(values, type=_ARROW_TYPES.get(field.field_type, pa.string())))
+        return pa.Table.from_arrays(arrays, names=names)
+
+
+class FakeQueryJob:
+    """The parts of `bigquery.QueryJob` the tools read."""
+
+    def __init__(self, client: "FakeBigQueryClient", job_id: str, referenced_tables: list,
+                 total_bytes_processed: int, dry_run: bool):
+        self._client = client
+        self.job_id = job_id
+        self.project = client.project
+        self.location = client.location
+        self.referenced_tables = referenced_tables
+        self.total_bytes_processed = total_bytes_processed
+        self.dry_run = dry_run
+        self.cache_hit = False
+        self.slot_millis = None
+        self.cancelled = False
+        self.destination = None if dry_run else bigquery.TableReference.from_string(
+            f"{client.project}._results.{job_id}"
+        )
+
+    def result(self, page_size: Optional[int] = None, max_results: Optional[int] = None, **kwargs) -> FakeRowIterator:
+        return self._client._iterate(self.job_id, 0, max_results)
+
+    def to_arrow(self, **kwargs) -> pa.Table:
+        return self.result().to_arrow()
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+
+class FakeBigQueryClient:
+    """A SQLite-backed stand-in for `bigquery.Client` with BigQuery-like table metadata.
+
+    BigQuery SQL is translated just enough for the benchmark corpus: table paths
+    become SQLite table names, `DATE '...'` literals become strings (dates are
+    stored as ISO strings) and FORMAT_DATE is provided as a SQL function.
+    `query_latency_s` adds a fixed delay to every real (non dry-run) query.
+    """
+
+    def __init__(self, project: str, location: str = "US", query_latency_s: float = 0.0):
+        self.project = project
+        self.location = location
+        self.query_latency_s = query_latency_s
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.create_function("FORMAT_DATE", 2, _format_date, deterministic=True)
+        self._lock = threading.Lock()
+        self._tables: Dict[str, dict] = {}
+        self._jobs: Dict[str, FakeQueryJob] = {}
+        self._results: Dict[str, tuple] = {}
+        self._job_ids = itertools.count(1)
+        self.queries_run = 0
+        self.dry_runs = 0
+
+    def add_table(self, table_id: str, schema: List[bigquery.SchemaField], rows: list,
+                  partition_field: Optional[str] = None, clustering_fields: Optional[list] = None) -> None:
+        name = table_id.replace(".", "__").replace("-", "_")
+        columns = ", ".join(f'"{field.name}"' for field in schema)
+        placeholders = ", ".join("?" for _ in schema)
+        column_bytes = {
+            field.name: sum(_value_bytes(field.field_type, row[i]) for row in rows)
+            for i, field in enumerate(schema)
+        }
+        with self._lock:
+            self._conn.execute(f'CREATE TABLE "{name}" ({columns})')
+            self._conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', rows)
+        self._tables[table_id] = {
+            "name": name,
+            "schema": schema,
+            "num_rows": len(rows),
+            "column_bytes": column_bytes,
+            "partition_field": partition_field,
+            "clustering_fields": clustering_fields,
+            "modified": datetime.datetime.now(datetime.timezone.utc),
+            "etag": uuid.uuid4().hex,
+        }
+
+    # --- bigquery.Client API used by the tools ---
+
+    def get_table(self, table) -> bigquery.Table:
+        table_id = str(table)
+        info = self._tables.get(table_id)
+        if info is None:
+            raise LookupError(f"Not found: Table {table_id}")
+        result = bigquery.Table(table_id, schema=info["schema"])
+        if info["partition_field"]:
+            result.time_partitioning = bigquery.TimePartitioning(field=info["partition_field"])
+        if info["clustering_fields"]:
+            result.clustering_fields = info["clustering_fields"]
+        result._properties.update({
+            "etag": info["etag"],
+            "lastModifiedTime": str(int(info["modified"].timestamp() * 1000)),
+            "numRows": str(info["num_rows"]),
+            "numBytes": str(sum(info["column_bytes"].values())),
+            "type": "TABLE",
+        })
+        return result
+
+    def list_tables(self, dataset) -> list:
+        dataset_id = str(dataset)
+        if dataset_id.count(".") == 0:
+            dataset_id = f"{self.project}.{dataset_id}"
+        return [
+            bigquery.TableReference.from_string(table_id)
+            for table_id in sorted(self._tables) if table_id.rsplit(".", 1)[0] == dataset_id
+        ]
+
+    def query(self, sql: str, job_config: Optional[bigquery.QueryJobConfig] = None, **kwargs) -> FakeQueryJob:
+        dry_run = bool(job_config and job_config.dry_run)
+        table_ids = self._referenced_table_ids(sql)
+        translated = self._to_sqlite(sql)
+        job_id = f"job_{next(self._job_ids):06d}"
+        job = FakeQueryJob(
+            self, job_id,
+            [bigquery.TableReference.from_string(t) for t in table_ids],
+            self._estimate_bytes(sql, table_ids),
+            dry_run,
+        )
+        with self._lock:
+            if dry_run:
+                self._conn.execute(f"EXPLAIN {translated}")
+                self.dry_runs += 1
+                return job
+            start = time.perf_counter()
+            cursor = self._conn.execute(translated)
+            rows = cursor.fetchall()
+            field_to_index = {description[0]: i for i, description in enumerate(cursor.description or [])}
+            self._results[job_id] = (rows, field_to_index)
+            self._jobs[job_id] = job
+            self.queries_run += 1
+            job.slot_millis = int((time.perf_counter() - start) * 1000)
+        if self.query_latency_s:
+            time.sleep(self.query_latency_s)
+        return job
+
+    def get_job(self, job_id: str, project: Optional[str] = None, location: Optional[str] = None) -> FakeQueryJob:
+        if job_id not in self._jobs:
+            raise LookupError(f"Not found: Job {job_id}")
+        return self._jobs[job_id]
+
+    def list_rows(self, table, start_index: int = 0, page_size: Optional[int] = None,
+                  max_results: Optional[int] = None, **kwargs) -> FakeRowIterator:
+        table_id = str(table) if isinstance(table, str) else f"{table.project}.{table.dataset_id}.{table.table_id}"
+        info = self._tables.get(table_id)
+        if info is None:
+            return self._iterate(table_id.rsplit(".", 1)[-1], start_index, max_results)
+        # Reading a table directly, as the replica's snapshot does
+        schema = info["schema"]
+        with self._lock:
+            rows = self._conn.execute(f'SELECT * FROM "{info["name"]}"').fetchall()
+        return FakeRowIterator(rows, {f.name: i for i, f in enumerate(schema)}, start_index, max_results, schema)
+
+    # --- helpers ---
+
+    def _iterate(self, job_id: str, start: int, max_results: Optional[int]) -> FakeRowIterator:
+        rows, field_to_index = self._results[job_id]
+        return FakeRowIterator(rows, field_to_index, start, max_results)
+
+    def _resolve(self, path: str) -> Optional[str]:
+        table_id = qualify_table_id(path, self.project)
+        return table_id if table_id in self._tables else None
+
+    def _referenced_table_ids(self, sql: str) -> list:
+        table_ids = []
+        for ref in extract_table_refs(sql):
+            table_id = self._resolve(ref)
+            if table_id is None:
+                raise LookupError(f"Not found: Table {ref}")
+            table_ids.append(table_id)
+        return table_ids
+
+    def _to_sqlite(self, sql: str) -> str:
+        def replace(match):
+            path = match.group(1) or match.group(2)
+            table_id = self._resolve(path)
+            return f'"{self._tables[table_id]["name"]}"' if table_id else match.group(0)
+        return _DATE_LITERAL_RE.sub(r"\1", _TABLE_PATH_RE.sub(replace, sql)).rstrip().rstrip(";")
+
+    def _estimate_bytes(self, sql: str, table_ids: list) -> int:
+        """Like BigQuery on-demand billing: the full size of every referenced column."""
+        words = {word.lower() for word in _WORD_RE.findall(sql)}
+        total = 0
+        for table_id in table_ids:
+            column_bytes = self._tables[table_id]["column_bytes"]
+            if "*" in sql:
+                total += sum(column_bytes.values())
+            else:
+                total += sum(size for name, size in column_bytes.items() if name.lower() in words)
+        return total
+
+
+def _format_date(fmt: str, value: str) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.date.fromisoformat(value[:10]).strftime(fmt)
+
+
+def create_sales_client(table_id: str, num_rows: int = 5000, seed: int = 7, query_latency_s: float = 0.0) -> FakeBigQueryClient:
+    """Builds a fake client holding `table_id` (synthetic sales, partitioned by order_date) and a products table."""
+    project, dataset, _ = table_id.split(".")
+    client = FakeBigQueryClient(project, query_latency_s=query_latency_s)
+    client.add_table(table_id, SALES_SCHEMA, generate_sales_rows(num_rows, seed),
+                     partition_field="order_date", clustering_fields=["region"])
+    client.add_table(f"{project}.{dataset}.products", PRODUCTS_SCHEMA, list(PRODUCTS))
+    return client
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for relative comparisons."""
+    return max(1, len(text) // 4)
+
+
+# Words per partial response when the runner streams (RunConfig with StreamingMode.SSE)
+_STREAM_CHUNK_WORDS = 8
+
+_FETCH_MORE_RE = re.compile(r'fetch_more_results\(handle="([^"]+)", start_row=(\d+)\)')
+
+# Scripts and timing shared by every ScriptedLlm instance; ADK builds the model from its name
+_scripts: Dict[str, dict] = {}
+_timing = {"latency_s": 0.0, "latency_per_1k_prompt_tokens_s": 0.0}
+
+
+class ScriptedLlm(BaseLlm):
+    """A deterministic model that replays a scripted tool-call sequence per question.
+
+    Selected with `MODEL=scripted-<anything>`. Each script is a list of steps;
+    a step is one tool call `{"tool": ..., "args": {...}}` or a list of calls
+    made in parallel. Once all steps ran, the model answers with the last tool
+    result. `{handle}` and `{next_row}` in arguments are filled from the most
+    recent "More rows are available" footer, like a real model would. When
+    streamed, the answer arrives as partial chunks before the full response.
+    """
+
+    @classmethod
+    def supported_models(cls) -> list:
+        return [r"scripted-.*"]
+
+    @staticmethod
+    def configure(scripts: Dict[str, dict], latency_s: float = 0.0, latency_per_1k_prompt_tokens_s: float = 0.0) -> None:
+        """Sets the scripts (question text -> {"steps": [...], "answer": optional}) and simulated latency."""
+        _scripts.clear()
+        _scripts.update(scripts)
+        _timing.update(latency_s=latency_s, latency_per_1k_prompt_tokens_s=latency_per_1k_prompt_tokens_s)
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        question, _, _ = _conversation_position(llm_request.contents)
+        script = _scripts.get(question, {"steps": [], "answer": "I do not have a script for that question."})
+        _, steps_taken, last_result = _conversation_position(llm_request.contents, script["steps"])
+        prompt_tokens = estimate_tokens(_request_text(llm_request))
+
+        delay = _timing["latency_s"] + prompt_tokens / 1000 * _timing["latency_per_1k_prompt_tokens_s"]
+        if delay:
+            await asyncio.sleep(delay)
+
+        parts = None
+        if steps_taken < len(script["steps"]):
+            parts = _function_call_parts(script["steps"][steps_taken], last_result)
+        if not parts:
+            answer = script.get("answer") or f"Here is what I found: {last_result[:300]}"
+            parts = [types.Part(text=answer)]
+        response_tokens = estimate_tokens(json.dumps([p.model_dump(exclude_none=True) for p in parts]))
+        if stream and parts[0].text:
+            # Streamed like Gemini over SSE: partial text chunks, then the complete response
+            words = re.findall(r"\S+\s*", parts[0].text)
+            for start in range(0, len(words), _STREAM_CHUNK_WORDS):
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text="".join(words[start:start + _STREAM_CHUNK_WORDS]))]),
+                    partial=True,
+                    model_version=self.model,
+                )
+                await asyncio.sleep(0)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=response_tokens,
+                total_token_count=prompt_tokens + response_tokens,
+            ),
+            model_version=self.model,
+        )
+
+
+def _request_text(llm_request) -> str:
+    config = llm_request.config
+    instruction = str(config.system_instruction) if config and config.system_instruction else ""
+    contents = json.dumps([c.model_dump(exclude_none=True, mode="json") for c in llm_request.contents])
+    return instruction + contents
+
+
+def _conversation_position(contents: list, steps: list = None) -> tuple:
+    """Returns (latest user question, script steps done since it, latest tool result text).
+
+    Each model tool-call turn counts as one step. With `steps`, a turn whose calls
+    equal a later scripted step (e.g. SQL replayed by the plan cache) jumps there.
+    """
+    question, steps_taken, last_result = "", 0, ""
+    for content in contents:
+        for part in content.parts or []:
+            if content.role == "user" and part.text:
+                question, steps_taken, last_result = part.text.strip(), 0, ""
+            elif part.function_response is not None:
+                response = part.function_response.response or {}
+                last_result = str(response.get("result", response))
+        calls = [part.function_call for part in content.parts or [] if part.function_call]
+        if content.role == "model" and calls:
+            steps_taken = _matching_step(steps or [], steps_taken, calls) + 1
+    return question, steps_taken, last_result
+
+
+def _matching_step(steps: list, position: int, calls: list) -> int:
+    made = sorted(json.dumps([call.name, call.args], sort_keys=True) for call in calls)
+    for index in range(position, len(steps)):
+        step = steps[index] if isinstance(steps[index], list) else [steps[index]]
+        if sorted(json.dumps([c["tool"], c.get("args", {})], sort_keys=True) for c in step) == made:
+            return index
+    return position
+
+
+def _function_call_parts(step, last_result: str) -> list:
+    calls = step if isinstance(step, list) else [step]
+    match = _FETCH_MORE_RE.search(last_result)
+    values = {"handle": match.group(1), "next_row": match.group(2)} if match else {}
+    parts = []
+    for call in calls:
+        args = {}
+        for key, value in call.get("args", {}).items():
+            if isinstance(value, str) and value in ("{handle}", "{next_row}"):
+                if not values:
+                    return []
+                value = int(values["next_row"]) if value == "{next_row}" else values["handle"]
+            args[key] = value
+        parts.append(types.Part(function_call=types.FunctionCall(name=call["tool"], args=args)))
+    return parts
+
+
+class FakeMemoryBank(BaseMemoryService):
+    """A local stand-in for Vertex AI Memory Bank.
+
+    Each `add_session_to_memory` call takes `latency_s` (memory generation is
+    a remote call of a second or more) and fails with probability
+    `failure_rate`, like a transient 503; the sessions that get through are
+    searchable through an inverted index.
+    """
+
+    def __init__(self, latency_s: float = 0.0, failure_rate: float = 0.0, seed: int = 7):
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.index = InvertedIndexMemoryService()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def add_session_to_memory(self, session) -> None:
+        with self._lock:
+            self.calls += 1
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+            fail = self._rng.random() < self.failure_rate
+        try:
+            if self.latency_s:
+                await asyncio.sleep(self.latency_s)
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                raise RuntimeError("503 Service Unavailable (simulated memory bank error)")
+            await self.index.add_session_to_memory(session)
+        finally:
+            with self._lock:
+                self.concurrent -= 1
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        return await self.index.search_memory(app_name=app_name, user_id=user_id, query=query)
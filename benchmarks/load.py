@@ -0,0 +1,259 @@
+"""Load test: many simulated users with their own sessions against one Runner, offline.
+
+Each concurrency level builds one `create_runner()` instance (with the scripted
+model and local BigQuery from benchmarks/fakes.py) and starts N users as
+asyncio tasks, ramped up over `--ramp-up-s`. Every user asks questions drawn
+from the corpus by `--mix`, pausing for an exponentially distributed think
+time between turns. Reports throughput, p50/p99 turn latency, event-loop lag
+and per-session memory growth; with `--p99-slo-ms` it also names the largest
+level that met the SLO.
+
+    uv run python -m benchmarks.load --users 1,10,50 --turns 5
+    uv run python -m benchmarks.load --users 50 --session-backend sqlite
+    uv run python -m benchmarks.load --users 1,10,50,100 --p99-slo-ms 5000 --mix top_customers=3,revenue_by_region=1
+
+Simulated latencies default to values typical of a real deployment (see
+--llm-latency-ms and --query-latency-ms) so concurrency limits show up.
+`--session-backend` takes `memory`, `sqlite` or `module:factory` for any
+other `BaseSessionService` (the factory is called with no arguments).
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.e2e import ask, build_runner, configure_environment, load_corpus, _CORPUS_PATH, _percentile
+
+
+def parse_mix(mix: str) -> dict:
+    """Parses `id=weight,id=weight` into a dict; an empty string means every question equally."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in (mix or "").split(","))):
+        question_id, _, weight = item.partition("=")
+        weights[question_id.strip()] = float(weight or 1)
+    return weights
+
+
+def pick_questions(corpus: list, weights: dict, rng: random.Random, count: int) -> list:
+    """Draws `count` questions from the corpus according to `weights` (uniform when empty)."""
+    pool = [item for item in corpus if not weights or item["id"] in weights]
+    if not pool:
+        raise ValueError(f"--mix matches no question ids; known ids: {[item['id'] for item in corpus]}")
+    return rng.choices(pool, weights=[weights.get(item["id"], 1) for item in pool], k=count)
+
+
+def create_session_service(backend: str, directory: str):
+    """Builds the session service named by `backend` (`memory`, `sqlite` or `module:factory`)."""
+    if backend == "memory":
+        # The same bounded service create_runner() builds by default
+        from sales_agent.config import config
+        from sales_agent.session_history import BoundedInMemorySessionService
+        return BoundedInMemorySessionService(
+            max_sessions=config.session_max_count,
+            max_bytes=config.session_max_bytes,
+            idle_ttl_seconds=config.session_idle_ttl_seconds,
+        )
+    if backend == "sqlite":
+        from google.adk.sessions.sqlite_session_service import SqliteSessionService
+        return SqliteSessionService(os.path.join(directory, f"sessions-{time.monotonic_ns()}.db"))
+    module_name, _, factory_name = backend.partition(":")
+    if not factory_name:
+        raise ValueError(f"Unknown session backend '{backend}'; use memory, sqlite or module:factory")
+    return getattr(importlib.import_module(module_name), factory_name)()
+
+
+def current_rss_bytes():
+    """Current resident set size on Linux, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def monitor_event_loop_lag(interval_s: float, lags: list, stop: asyncio.Event) -> None:
+    """Records how late each `interval_s` sleep wakes up; a blocked loop shows up as lag."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def simulate_user(runner, user_index: int, questions: list, think_time_s: float, start_delay_s: float,
+                        rng: random.Random) -> list:
+    """Asks `questions` in one session after `start_delay_s`; returns one record per turn."""
+    await asyncio.sleep(start_delay_s)
+    user_id, session_id = f"load-user-{user_index}", f"load-session-{user_index}"
+    turns = []
+    for i, item in enumerate(questions):
+        if i and think_time_s:
+            await asyncio.sleep(rng.expovariate(1 / think_time_s))
+        start = time.perf_counter()
+        try:
+            _, _, timings = await ask(runner, user_id, session_id, item["question"])
+            turns.append({"id": item["id"], "latency_s": timings["total_s"], "error": None})
+        except Exception as e:
+            turns.append({"id": item["id"], "latency_s": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"})
+    return turns
+
+
+async def session_sizes(runner, users: int) -> list:
+    """Returns (events, serialized bytes) for every simulated user's session."""
+    sizes = []
+    for user_index in range(users):
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=f"load-user-{user_index}", session_id=f"load-session-{user_index}"
+        )
+        if session is not None:
+            sizes.append((len(session.events), len(session.model_dump_json())))
+    return sizes
+
+
+async def run_level(runner, corpus: list, users: int, args) -> dict:
+    """Runs one concurrency level to completion and returns its metrics."""
+    weights = parse_mix(args.mix)
+    # One untimed turn first, so lazy imports and first-use setup are not charged to the level
+    await ask(runner, "load-warmup", "load-warmup", corpus[0]["question"])
+    lags, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_event_loop_lag(args.lag_interval_ms / 1000, lags, stop))
+    rss_before = current_rss_bytes()
+
+    start = time.perf_counter()
+    tasks = []
+    for user_index in range(users):
+        rng = random.Random(args.seed * 100003 + user_index)
+        delay = args.ramp_up_s * user_index / users
+        questions = pick_questions(corpus, weights, rng, args.turns)
+        tasks.append(simulate_user(runner, user_index, questions, args.think_time_s, delay, rng))
+    turns = [turn for user_turns in await asyncio.gather(*tasks) for turn in user_turns]
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    rss_after = current_rss_bytes()
+    sizes = await session_sizes(runner, users)
+
+    latencies = [t["latency_s"] for t in turns if t["error"] is None]
+    errors = [t["error"] for t in turns if t["error"]]
+    growth = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return {
+        "users": users,
+        "turns": len(turns),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": wall,
+        "throughput_turns_per_s": len(latencies) / wall if wall else 0.0,
+        "latency_p50_s": _percentile(latencies, 0.5) if latencies else None,
+        "latency_p99_s": _percentile(latencies, 0.99) if latencies else None,
+        "loop_lag_p50_ms": _percentile(lags, 0.5) * 1000 if lags else None,
+        "loop_lag_p99_ms": _percentile(lags, 0.99) * 1000 if lags else None,
+        "loop_lag_max_ms": max(lags) * 1000 if lags else None,
+        "rss_growth_mb": growth / 1e6 if growth is not None else None,
+        "rss_growth_per_session_kb": growth / users / 1e3 if growth is not None else None,
+        "session_events_avg": statistics.mean(s[0] for s in sizes) if sizes else 0,
+        "session_bytes_avg": statistics.mean(s[1] for s in sizes) if sizes else 0,
+    }
+
+
+def find_ceiling(levels: list, p99_slo_s: float):
+    """Largest user count whose level had no errors and met the p99 SLO, or None."""
+    passing = [
+        level["users"] for level in levels
+        if not level["errors"] and level["latency_p99_s"] is not None and level["latency_p99_s"] <= p99_slo_s
+    ]
+    return max(passing) if passing else None
+
+
+def _reset_shared_caches() -> None:
+    # Every level starts cold, so levels are comparable regardless of order
+    from sales_agent import tools
+    tools.result_cache.clear()
+    tools.metadata_cache.clear()
+    tools.query_preflight.clear()
+    tools.plan_cache.clear()
+    tools.arrow_results.clear()
+    tools.result_formatter.clear()
+    tools.single_flight.clear()
+    from sales_agent.session_history import get_history_compactor
+    get_history_compactor().clear()
+    from sales_agent.memory import get_memory_ingestor
+    get_memory_ingestor().flush()
+    get_memory_ingestor().clear()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,10,50", help="Comma-separated concurrency levels to run in order.")
+    parser.add_argument("--turns", type=int, default=3, help="Questions asked by each user.")
+    parser.add_argument("--think-time-s", type=float, default=1.0, help="Mean pause between a user's turns.")
+    parser.add_argument("--ramp-up-s", type=float, default=2.0, help="Time over which users are started.")
+    parser.add_argument("--mix", default="", help="Question weights, e.g. top_customers=3,monthly_trend=1.")
+    parser.add_argument("--session-backend", default="memory", help="memory, sqlite or module:factory.")
+    parser.add_argument("--corpus", default=_CORPUS_PATH, help="JSON list of scripted questions.")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows in the synthetic sales table.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the dataset and each user's choices.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Simulated fixed latency per LLM call.")
+    parser.add_argument("--llm-latency-per-1k-tokens-ms", type=float, default=20, help="Simulated latency per 1k prompt tokens.")
+    parser.add_argument("--query-latency-ms", type=float, default=500, help="Simulated latency per BigQuery query.")
+    parser.add_argument("--lag-interval-ms", type=float, default=10, help="Event-loop lag sampling interval.")
+    parser.add_argument("--p99-slo-ms", type=float, help="Report the largest level whose p99 turn latency met this.")
+    parser.add_argument("--output", help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    from benchmarks.fakes import ScriptedLlm
+    from sales_agent.config import config
+    from sales_agent.instrumentation import get_instrumentation
+
+    corpus = load_corpus(args.corpus, config.bigquery_table_id)
+    ScriptedLlm.configure(
+        {item["question"]: item for item in corpus},
+        latency_s=args.llm_latency_ms / 1000,
+        latency_per_1k_prompt_tokens_s=args.llm_latency_per_1k_tokens_ms / 1000,
+    )
+    levels = []
+    with tempfile.TemporaryDirectory() as directory:
+        for users in (int(u) for u in args.users.split(",") if u.strip()):
+            runner, _ = build_runner(
+                args.rows, args.seed, args.query_latency_ms / 1000,
+                session_service=create_session_service(args.session_backend, directory),
+            )
+            _reset_shared_caches()
+            get_instrumentation().reset()
+            level = asyncio.run(run_level(runner, corpus, users, args))
+            from sales_agent import tools
+            level["single_flight"] = tools.single_flight.stats()
+            if config.history_max_tokens > 0:
+                from sales_agent.session_history import get_history_compactor
+                level["session_history"] = get_history_compactor().stats()
+            if config.memory_ingestion in ("write_behind", "inline"):
+                from sales_agent.memory import get_memory_ingestor
+                get_memory_ingestor().flush()
+                level["memory_ingestion"] = get_memory_ingestor().stats()
+            levels.append(level)
+            print(f"users={users}: {level['throughput_turns_per_s']:.2f} turns/s, "
+                  f"p99 {level['latency_p99_s'] or 0:.2f}s, loop lag p99 {level['loop_lag_p99_ms'] or 0:.1f}ms, "
+                  f"errors {level['errors']}", file=sys.stderr)
+
+    report = {
+        "levels": levels,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "corpus")},
+    }
+    if args.p99_slo_ms:
+        report["ceiling_users"] = find_ceiling(levels, args.p99_slo_ms / 1000)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
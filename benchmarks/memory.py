@@ -0,0 +1,204 @@
+"""Micro-benchmark: memory ingestion off the turn's critical path, and indexed vs scanned memory search.
+
+Ingestion: `--users` simulated users each hold a session and take `--turns`
+turns; after every turn the session is handed to a `FakeMemoryBank` (a local
+stand-in for Vertex AI Memory Bank with `--bank-latency-ms` per call and
+`--failure-rate` transient errors) through a `MemoryIngestor`, in each mode:
+
+- `inline`: the turn waits for the memory bank call (and its retries)
+- `write_behind`: the turn only queues the session; a background thread ingests it
+
+Reports the time each turn spent handing its session over (p50/p99), the time
+to drain the queue at the end, and the ingestor's retry/coalescing/lag counts.
+
+Search: `--events` synthetic sales conversation events (Zipf-distributed
+vocabulary) are ingested into ADK's `InMemoryMemoryService`, which scans every
+event per search, and into `InvertedIndexMemoryService`; `--queries` searches
+are timed on both and their results compared.
+
+    uv run python -m benchmarks.memory
+    uv run python -m benchmarks.memory --users 50 --turns 5 --bank-latency-ms 800 --events 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from google.adk.events.event import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from benchmarks.fakes import PRODUCTS, REGIONS, FakeMemoryBank
+from sales_agent.memory import InvertedIndexMemoryService, MemoryIngestor
+
+APP_NAME = "benchmark"
+
+_FILLER = (
+    "revenue sales orders customers quarter month year total average growth top region product "
+    "category discount margin trend compare last this show list by per share units returns forecast "
+    "pipeline deal account renewal churn segment channel partner enterprise retail online store"
+).split()
+
+
+def _percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_vocabulary(size: int, seed: int) -> list:
+    """Sales words first (the most frequent), then product and region words, then rare synthetic terms."""
+    rng = random.Random(seed)
+    words = list(_FILLER)
+    for product, category, _ in PRODUCTS:
+        words.extend(f"{product} {category}".lower().split())
+    for region in REGIONS:
+        words.extend(region.lower().split())
+    words = list(dict.fromkeys(words))
+    while len(words) < size:
+        words.append(f"acct{rng.randrange(10 ** 6):06d}")
+    return words[:size]
+
+
+def make_text(rng: random.Random, vocabulary: list, weights: list, num_words: int) -> str:
+    return " ".join(rng.choices(vocabulary, weights=weights, k=num_words))
+
+
+def make_event(text: str, author: str, timestamp: float) -> Event:
+    role = "user" if author == "user" else "model"
+    return Event(author=author, timestamp=timestamp, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+async def run_ingestion(mode: str, args) -> dict:
+    bank = FakeMemoryBank(latency_s=args.bank_latency_ms / 1000, failure_rate=args.failure_rate, seed=args.seed)
+    ingestor = MemoryIngestor(write_behind=mode == "write_behind", batch_size=args.batch_size,
+                              flush_interval_seconds=args.flush_interval_s, max_pending=args.max_pending,
+                              retry_backoff_seconds=args.retry_backoff_ms / 1000)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(500, args.seed)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    overheads = []
+
+    async def user(number: int) -> None:
+        session = Session(id=f"s{number}", app_name=APP_NAME, user_id=f"u{number}")
+        for _ in range(args.turns):
+            session.events.append(make_event(make_text(rng, vocabulary, weights, 12), "user", time.time()))
+            await asyncio.sleep(args.turn_ms / 1000)
+            session.events.append(make_event(make_text(rng, vocabulary, weights, 40), "agent", time.time()))
+            start = time.perf_counter()
+            await ingestor.ingest(bank, session)
+            overheads.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(number) for number in range(args.users)))
+    turns_s = time.perf_counter() - start
+    drain_start = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, ingestor.flush)
+    drain_s = time.perf_counter() - drain_start
+    ingestor.close()
+
+    return {
+        "turns": len(overheads),
+        "turn_overhead_p50_ms": _percentile(overheads, 0.5),
+        "turn_overhead_p99_ms": _percentile(overheads, 0.99),
+        "turns_wall_s": turns_s,
+        "drain_s": drain_s,
+        "bank_calls": bank.calls,
+        "bank_failures": bank.failures,
+        "bank_max_concurrent": bank.max_concurrent,
+        "indexed_events": bank.index.stats()["events"],
+        "ingestor": ingestor.stats(),
+    }
+
+
+async def run_search(args) -> dict:
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, args.seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(vocabulary))]
+    services = {"adk_scan": InMemoryMemoryService(), "inverted_index": InvertedIndexMemoryService()}
+    sessions = []
+    timestamp = 1.7e9
+    for number in range(0, args.events, args.events_per_session):
+        session = Session(id=f"s{number}", app_name=APP_NAME, user_id="u")
+        for _ in range(min(args.events_per_session, args.events - number)):
+            timestamp += 1
+            text = make_text(rng, vocabulary, weights, rng.randint(5, 60))
+            session.events.append(make_event(text, rng.choice(("user", "agent")), timestamp))
+        sessions.append(session)
+    queries = [make_text(rng, vocabulary, weights, rng.randint(2, 6)) for _ in range(args.queries)]
+
+    report, results = {}, {}
+    for name, service in services.items():
+        start = time.perf_counter()
+        for session in sessions:
+            await service.add_session_to_memory(session)
+        ingest_s = time.perf_counter() - start
+        durations, results[name] = [], []
+        for query in queries:
+            start = time.perf_counter()
+            response = await service.search_memory(app_name=APP_NAME, user_id="u", query=query)
+            durations.append((time.perf_counter() - start) * 1000)
+            results[name].append([memory.content.parts[0].text for memory in response.memories])
+        report[name] = {
+            "ingest_s": ingest_s,
+            "search_p50_ms": _percentile(durations, 0.5),
+            "search_p99_ms": _percentile(durations, 0.99),
+            "search_mean_ms": statistics.fmean(durations),
+        }
+
+    # Both keep the ten events matching the most query words, ties in ingestion order
+    identical = sum(indexed == scanned for indexed, scanned in zip(results["inverted_index"], results["adk_scan"]))
+    scan, index = report["adk_scan"]["search_mean_ms"], report["inverted_index"]["search_mean_ms"]
+    report["speedup"] = scan / index if index else None
+    report["identical_results"] = identical / len(queries) if queries else None
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users in the ingestion benchmark.")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per user.")
+    parser.add_argument("--turn-ms", type=float, default=50, help="Simulated work per turn before ingestion.")
+    parser.add_argument("--bank-latency-ms", type=float, default=400, help="Simulated memory bank call latency.")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of memory bank calls that fail.")
+    parser.add_argument("--retry-backoff-ms", type=float, default=50, help="First retry delay after a failure.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Sessions ingested concurrently per batch.")
+    parser.add_argument("--flush-interval-s", type=float, default=0.2, help="Longest a queued session waits.")
+    parser.add_argument("--max-pending", type=int, default=1000, help="Write-behind queue bound.")
+    parser.add_argument("--events", type=int, default=10000, help="Events in the search benchmark.")
+    parser.add_argument("--events-per-session", type=int, default=20, help="Events per ingested session.")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="Distinct words in the synthetic events.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of word frequencies.")
+    parser.add_argument("--queries", type=int, default=50, help="Searches timed per service.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the synthetic sessions and failures.")
+    parser.add_argument("--output", help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    report = {"ingestion": {}, "settings": {k: v for k, v in vars(args).items() if k != "output"}}
+    for mode in ("inline", "write_behind"):
+        result = asyncio.run(run_ingestion(mode, args))
+        report["ingestion"][mode] = result
+        print(f"ingestion {mode}: turn overhead p50 {result['turn_overhead_p50_ms']:.2f}ms "
+              f"p99 {result['turn_overhead_p99_ms']:.2f}ms, turns {result['turns_wall_s']:.2f}s, "
+              f"drain {result['drain_s']:.2f}s, retries {result['ingestor']['retries']}, "
+              f"failed {result['ingestor']['failed']}", file=sys.stderr)
+    report["search"] = asyncio.run(run_search(args))
+    search = report["search"]
+    print(f"search over {args.events} events: ADK scan p50 {search['adk_scan']['search_p50_ms']:.2f}ms, "
+          f"inverted index p50 {search['inverted_index']['search_p50_ms']:.3f}ms "
+          f"({search['speedup']:.0f}x), identical results {search['identical_results']:.0%}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
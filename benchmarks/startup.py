@@ -0,0 +1,130 @@
+"""Startup benchmark: import time and time-to-ready for the sales agent.
+
+Each measurement runs in a fresh interpreter so module caches do not hide
+import costs. Runs fully offline: the agent and an in-memory runner are built,
+but no model or BigQuery call is made.
+
+    uv run python -m benchmarks.startup --runs 5
+    uv run python -m benchmarks.startup --write-baseline benchmarks/startup_baseline.json
+    uv run python -m benchmarks.startup --baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+# Placeholder settings so the benchmark runs without a .env; real values are kept if set.
+_OFFLINE_ENV = {
+    "GOOGLE_CLOUD_PROJECT": "benchmark-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "BIGQUERY_TABLE_ID": "benchmark-project.sales.sales_transactions",
+    "PREFETCH_SCHEMA": "false",
+    "USE_AGENT_ENGINE_MEMORY": "false",
+    "USE_AGENT_ENGINE_SESSION": "false",
+}
+
+_READY_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import sales_agent.agent as agent_module
+imported = time.perf_counter()
+agent_module.create_runner()
+ready = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "ready_s": ready - start}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    for key, value in _OFFLINE_ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parses `-X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            # One space follows the bar at top level; each nesting level adds two more
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def measure_imports(module: str, top: int) -> dict:
+    """Returns the import time of `module` and the heaviest imports on the way to a ready runner.
+
+    Imports deferred until `create_runner()` show up in the breakdown too, so the
+    list covers everything a cold start pays for, not just the module itself.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}\n{_READY_SNIPPET}"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    entries = parse_importtime(result.stderr)
+    total_us = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), 0)
+    heaviest = sorted((e for e in entries if e[3] == 0), key=lambda e: e[2], reverse=True)[:top]
+    return {
+        "import_total_s": total_us / 1e6,
+        "heaviest_imports": [{"module": name, "cumulative_s": cumulative / 1e6} for name, _, cumulative, _ in heaviest],
+    }
+
+
+def measure_ready(runs: int) -> dict:
+    """Returns median in-process import and time-to-ready (agent + runner built) over `runs` runs."""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _READY_SNIPPET],
+            capture_output=True, text=True, env=_env(), check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        "import_s": statistics.median(s["import_s"] for s in samples),
+        "ready_s": statistics.median(s["ready_s"] for s in samples),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns descriptions of metrics that regressed by more than `tolerance` (a fraction)."""
+    regressions = []
+    for metric in ("import_total_s", "import_s", "ready_s"):
+        if metric in baseline and report[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric}: {report[metric]:.3f}s vs baseline {baseline[metric]:.3f}s")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="sales_agent.agent", help="Module whose import is profiled.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters used for time-to-ready.")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list.")
+    parser.add_argument("--baseline", help="Fail if this run is slower than the baseline file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline.")
+    parser.add_argument("--write-baseline", help="Write this run's results to the given file.")
+    args = parser.parse_args(argv)
+
+    report = {**measure_imports(args.module, args.top), **measure_ready(args.runs)}
+    print(json.dumps(report, indent=2))
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,12 @@
 import asyncio
 import sys
-from sales_agent.agent import create_runner
+from sales_agent.agent import create_run_config, create_runner
+from sales_agent.streaming import StreamRenderer, format_timings
 from google.genai import types
 
 async def run_chat():
     runner = create_runner()
+    run_config = create_run_config()
     session_id = "test-session-001"
     user_id = "test-user-001"
     
@@ -17,19 +19,17 @@ async def run_chat():
             if user_input.lower() in ["exit", "quit"]:
                 break
             
-            print("Agent: Thinking...", end="\r")
-            
-            # Using runner.run_async to manage the session and execution
+            # Partial text is printed as it streams in, with a progress line per tool call
+            renderer = StreamRenderer()
             async for event in runner.run_async(
                 user_id=user_id,
                 session_id=session_id,
-                new_message=types.Content(role='user', parts=[types.Part(text=user_input)])
+                new_message=types.Content(role='user', parts=[types.Part(text=user_input)]),
+                run_config=run_config,
             ):
-                if event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if part.text:
-                            print(f"\nAgent: {part.text}")
+                renderer.feed(event)
             
+            print(f"({format_timings(renderer.finish())})")
             print("-" * 50)
             
         except KeyboardInterrupt:
@@ -1,71 +1,176 @@
 import logging
 import sys
 import os
+import threading
+from typing import TYPE_CHECKING
 try:
-    from .config import config
+    from .config import AgentConfig, get_config
 except (ImportError, ValueError):
-    from config import config
-
-# Set environment variables for ADK/GenAI
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "true"
-os.environ["GOOGLE_CLOUD_PROJECT"] = config.project_id
-os.environ["GOOGLE_CLOUD_LOCATION"] = config.location
+    from config import AgentConfig, get_config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 logger = logging.getLogger(__name__)
 
-import google.auth
-from google.adk.agents.llm_agent import Agent
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.memory.vertex_ai_memory_bank_service import VertexAiMemoryBankService
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.adk.sessions.vertex_ai_session_service import VertexAiSessionService
-from google.adk.runners import Runner
-from .tools import get_bigquery_tools
+# ADK, BigQuery and the Vertex AI services are imported where they are first
+# needed, so importing this module stays cheap (see benchmarks/startup.py).
+if TYPE_CHECKING:
+    from google.adk.agents.llm_agent import Agent
+    from google.adk.agents.run_config import RunConfig
+    from google.adk.memory.base_memory_service import BaseMemoryService
+    from google.adk.runners import Runner
+    from google.adk.sessions.base_session_service import BaseSessionService
+    from .prefetch import SchemaPrefetcher
+
+
+def _configure_environment() -> AgentConfig:
+    """Points ADK/GenAI at Vertex AI in the configured project; done on first use rather than at import."""
+    config = get_config()
+    os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "true"
+    os.environ["GOOGLE_CLOUD_PROJECT"] = config.project_id
+    os.environ["GOOGLE_CLOUD_LOCATION"] = config.location
+    return config
 
     
-def create_agent() -> Agent:
+def build_instruction(schema_context: str = "", prefetched_tables: list = None) -> str:
+    """Builds the agent instruction, optionally embedding prefetched schema context."""
+    config = get_config()
+    prefetched_tables = prefetched_tables or []
+    if prefetched_tables:
+        tables = ", ".join(f"`{table_id}`" for table_id in prefetched_tables)
+        schema_rule = (
+            "- ALWAYS check the schema before querying a table for the first time in a session, "
+            f"except {tables}, whose schema is already listed under Prefetched Metadata below."
+        )
+    else:
+        schema_rule = "- ALWAYS check the schema before querying a table for the first time in a session."
+    prefetched_section = f"\nPrefetched Metadata:\n{schema_context}\n" if schema_context else ""
+
+    return f"""
+You are a knowledgeable Sales Assistant for the `{config.project_id}` project.
+Your goal is to answer user questions about sales transactions using BigQuery data.
+
+Workflow Guidelines:
+1.  **Discovery**: If you are unsure what data is available, start by listing tables in the default dataset `{config.bigquery_table_id.rsplit('.', 1)[0]}` using `list_tables`.
+2.  **Schema Inspection**: Before writing any SQL query for a table, YOU MUST inspect its schema using `get_table_schema` unless it is listed under Prefetched Metadata. This ensures you use the correct column names and types.
+3.  **Data Retrieval**: Once you understand the schema, use `execute_sql` to retrieve the relevant data. Large results are returned one page at a time; prefer aggregating in SQL over paging, and use `fetch_more_results` only when the remaining rows are truly needed.
+4.  **Batching**: When a question needs several queries that do not depend on each other (e.g. this quarter vs. last quarter, or one query per region), run them together in a single `execute_sql_batch` call instead of separate `execute_sql` calls.
+5.  **Natural Response**: Provide a clear, customer-friendly answer based on the data. If no data is found, explain why (e.g., no transactions for that date).
+
+Important Rules:
+- The default table for transactions is `{config.bigquery_table_id}`.
+{schema_rule}
+- If `execute_sql` rejects a query in its pre-flight check, follow the suggestion (e.g. add a date filter) and retry instead of giving up.
+- Do not make up data. If you cannot find the answer in BigQuery, say so.
+{prefetched_section}"""
+
+def create_schema_prefetcher() -> "SchemaPrefetcher":
+    """Prefetches the default dataset's table list and default table's schema, or returns None on failure."""
+    from .prefetch import SchemaPrefetcher
+    from .tools import client_pool, metadata_cache
+
+    config = get_config()
+    prefetcher = SchemaPrefetcher(
+        metadata_cache,
+        client_getter=lambda: client_pool.get(None),
+        table_id=config.bigquery_table_id,
+        refresh_interval_seconds=config.prefetch_refresh_interval_seconds,
+    )
+    try:
+        prefetcher.prefetch()
+    except Exception as e:
+        logger.warning(f"Schema prefetch failed, continuing without it: {e}")
+        return None
+    return prefetcher
+
+def _add_callbacks(callbacks: dict, more: dict) -> None:
+    for name, callback in more.items():
+        callbacks.setdefault(name, []).append(callback)
+
+def create_agent(prefetch_schema: bool = None) -> "Agent":
     """Creates the Sales Assist Agent (without runner framework)."""
+    from google.adk.agents.llm_agent import Agent
+    from .tools import get_bigquery_tools, start_metadata_refresh, start_replica_sync
 
+    config = _configure_environment()
     logger.info(f"Initializing agent for project: {config.project_id}")
     
     # Initialize BigQuery Tools
     bq_tools = get_bigquery_tools()
+    start_metadata_refresh()
+    start_replica_sync()
+
+    if prefetch_schema is None:
+        prefetch_schema = config.prefetch_schema
+    prefetcher = create_schema_prefetcher() if prefetch_schema else None
+    if prefetcher is not None:
+        # Rendered on every turn so schema refreshes reach running sessions
+        instruction = lambda context: build_instruction(prefetcher.context(), prefetcher.prefetched_table_ids)
+    else:
+        instruction = build_instruction()
+
+    # Each callback kind is a list run in order; a before-model callback that
+    # returns a response (a plan cache hit) skips the ones after it
+    callbacks = {}
+    if config.plan_cache_enabled:
+        from .tools import plan_cache
+        _add_callbacks(callbacks, plan_cache.callbacks())
+    if config.history_max_tokens > 0:
+        from .session_history import get_history_compactor
+        _add_callbacks(callbacks, get_history_compactor().callbacks())
+    if config.instrumentation_enabled:
+        from .instrumentation import get_instrumentation
+        _add_callbacks(callbacks, get_instrumentation().callbacks())
+    if config.memory_ingestion in ("write_behind", "inline"):
+        # Last, so the turn's spans are closed before its session is handed to memory
+        from .memory import get_memory_ingestor
+        _add_callbacks(callbacks, get_memory_ingestor().callbacks())
 
     # Create the Agent
     agent = Agent(
         name="sales_assist_agent",
         model=config.model,
         description="A helpful sales assistant that answers questions about sales transactions.",
-        instruction=f"""
-You are a knowledgeable Sales Assistant for the `{config.project_id}` project.
-Your goal is to answer user questions about sales transactions using BigQuery data.
-
-Workflow Guidelines:
-1.  **Discovery**: If you are unsure what data is available, start by listing tables in the default dataset `{config.bigquery_table_id.rsplit('.', 1)[0]}` using `list_tables`.
-2.  **Schema Inspection**: Before writing any SQL query for a table, YOU MUST inspect its schema using `get_table_schema`. This ensures you use the correct column names and types.
-3.  **Data Retrieval**: Once you understand the schema, use `execute_sql` to retrieve the relevant data.
-4.  **Natural Response**: Provide a clear, customer-friendly answer based on the data. If no data is found, explain why (e.g., no transactions for that date).
-
-Important Rules:
-- The default table for transactions is `{config.bigquery_table_id}`.
-- ALWAYS check the schema before querying a table for the first time in a session.
-- Do not make up data. If you cannot find the answer in BigQuery, say so.
-        """,
+        instruction=instruction,
         tools=bq_tools, 
+        **callbacks,
     )
     
     return agent
 
-def create_runner() -> Runner:
-    """Creates a Runner with the agent and configured services."""
-    global root_agent
-    if root_agent is None:
-        root_agent = create_agent()
+_root_agent = None
+_root_agent_lock = threading.Lock()
+
+def get_root_agent() -> "Agent":
+    """Returns the shared agent, creating it on first use."""
+    global _root_agent
+    with _root_agent_lock:
+        if _root_agent is None:
+            _root_agent = create_agent()
+        return _root_agent
+
+def __getattr__(name: str):
+    # ADK's loaders and deployments look up `root_agent`; build it on first access instead of at import
+    if name == "root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def create_runner(session_service: "BaseSessionService" = None, memory_service: "BaseMemoryService" = None) -> "Runner":
+    """Creates a Runner with the agent and configured services.
+
+    `session_service` and `memory_service` override the configured backends
+    (e.g. for load tests against an alternative session store).
+    """
+    from google.adk.runners import Runner
+
+    config = _configure_environment()
+    root_agent = get_root_agent()
     
     # Initialize Memory Service
-    if config.use_agent_engine_memory and config.agent_engine_id:
+    if memory_service is not None:
+        logger.info(f"Using provided memory service: {type(memory_service).__name__}")
+    elif config.use_agent_engine_memory and config.agent_engine_id:
+        from google.adk.memory.vertex_ai_memory_bank_service import VertexAiMemoryBankService
         logger.info(f"Using Vertex AI Agent Engine Memory (ID: {config.agent_engine_id})")
         memory_service = VertexAiMemoryBankService(
             project=config.project_id,
@@ -73,11 +178,20 @@ def create_runner() -> Runner:
             agent_engine_id=config.agent_engine_id
         )
     else:
+        from .memory import InvertedIndexMemoryService
         logger.info("Using In-Memory Memory Service (Local)")
-        memory_service = InMemoryMemoryService()
+        memory_service = InvertedIndexMemoryService()
+
+    if config.memory_ingestion in ("write_behind", "inline"):
+        # Hand the ingestor this runner's memory service instead of having it dig through ADK internals
+        from .memory import get_memory_ingestor
+        get_memory_ingestor().memory_service = memory_service
         
     # Initialize Session Service
-    if config.use_agent_engine_session and config.agent_engine_id:
+    if session_service is not None:
+        logger.info(f"Using provided session service: {type(session_service).__name__}")
+    elif config.use_agent_engine_session and config.agent_engine_id:
+        from google.adk.sessions.vertex_ai_session_service import VertexAiSessionService
         logger.info(f"Using Vertex AI Agent Engine Session (ID: {config.agent_engine_id})")
         session_service = VertexAiSessionService(
             project=config.project_id,
@@ -85,8 +199,13 @@ def create_runner() -> Runner:
             agent_engine_id=config.agent_engine_id
         )
     else:
+        from .session_history import BoundedInMemorySessionService
         logger.info("Using In-Memory Session Service (Local)")
-        session_service = InMemorySessionService()
+        session_service = BoundedInMemorySessionService(
+            max_sessions=config.session_max_count,
+            max_bytes=config.session_max_bytes,
+            idle_ttl_seconds=config.session_idle_ttl_seconds,
+        )
     
     runner = Runner(
         app_name="sales-assist-app",
@@ -98,7 +217,17 @@ def create_runner() -> Runner:
     
     return runner
 
-root_agent = create_agent()
+def create_run_config(streaming: bool = None) -> "RunConfig":
+    """Returns the RunConfig for `Runner.run_async`; with streaming, the model's text arrives as partial events.
+
+    `streaming` defaults to STREAMING_ENABLED. Partial events are only shown
+    to the caller; the session keeps the complete, non-partial ones.
+    """
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+
+    if streaming is None:
+        streaming = get_config().streaming_enabled
+    return RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
 
 if __name__ == "__main__":
     runner = create_runner()
@@ -0,0 +1,116 @@
+import functools
+import importlib.util
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Rows converted to Python objects at a time when formatting a page from Arrow
+_CHUNK_ROWS = 256
+
+
+@functools.lru_cache(maxsize=None)
+def storage_read_available() -> bool:
+    """True if the BigQuery Storage Read API client library is installed (`uv sync --extra arrow`)."""
+    try:
+        return importlib.util.find_spec("google.cloud.bigquery_storage") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def iter_arrow_rows(table: pa.Table, start_row: int = 0, chunk_rows: int = _CHUNK_ROWS) -> Iterator[dict]:
+    """Yields rows of `table` from `start_row` as dicts, converting one small slice at a time.
+
+    Slicing is zero-copy, so only the rows a caller actually consumes (e.g. one
+    page, cut short by a byte budget) are ever turned into Python objects.
+    """
+    for offset in range(max(0, start_row), table.num_rows, chunk_rows):
+        yield from table.slice(offset, chunk_rows).to_pylist()
+
+
+def download_result_arrow(query_job) -> pa.Table:
+    """Downloads a finished query's full result as Arrow, over the Storage Read API when available.
+
+    The BigQuery client falls back to REST pages (still decoded straight into
+    Arrow) when the result is small enough to have been returned inline.
+    """
+    return query_job.result().to_arrow(create_bqstorage_client=True)
+
+
+class ArrowResultStore:
+    """Process-wide LRU of downloaded query results, keyed by (credential scope, result handle) and bounded by bytes.
+
+    `fetch_more_results` reads later pages from here as zero-copy slices instead
+    of calling `list_rows` once per page. Keying by credential scope means a
+    result downloaded for one user is never served to a caller who only knows
+    its handle. Results that were judged not to fit are remembered, so they
+    are paged over REST without being downloaded again.
+    """
+
+    def __init__(self, max_bytes: int, max_rejected: int = 1024):
+        self.max_bytes = max_bytes
+        self.max_rejected = max_rejected
+        self._tables: "OrderedDict[tuple, pa.Table]" = OrderedDict()
+        self._rejected: "OrderedDict[tuple, None]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def put(self, key: tuple, table: pa.Table) -> bool:
+        """Stores a result; returns False (and rejects `key`) if it is larger than the whole store."""
+        if table.nbytes > self.max_bytes:
+            self.reject(key)
+            return False
+        with self._lock:
+            previous = self._tables.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._tables[key] = table
+            self._bytes += table.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._tables.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return True
+
+    def get(self, key: tuple) -> Optional[pa.Table]:
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                self.misses += 1
+                return None
+            self._tables.move_to_end(key)
+            self.hits += 1
+            return table
+
+    def reject(self, key: tuple) -> None:
+        """Remembers that the result under `key` stays in BigQuery."""
+        with self._lock:
+            self._rejected[key] = None
+            self._rejected.move_to_end(key)
+            while len(self._rejected) > self.max_rejected:
+                self._rejected.popitem(last=False)
+
+    def is_rejected(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._rejected
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+            self._rejected.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._tables), "bytes": self._bytes, "hits": self.hits, "misses": self.misses,
+                    "rejected": len(self._rejected)}
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+try:
+    from .config import config
+    from .job_tracking import JobTracker, current_tracker
+    from . import tools
+except (ImportError, ValueError):
+    from config import config
+    from job_tracking import JobTracker, current_tracker
+    import tools
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_cancel_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Returns the bounded thread pool that runs blocking BigQuery calls off the event loop."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.tool_thread_pool_size,
+                thread_name_prefix="bigquery-tool",
+            )
+        return _executor
+
+
+def _cancel_jobs(tracker: JobTracker) -> None:
+    """Cancels a call's BigQuery jobs on a small pool of its own.
+
+    Timeouts happen when the tool pool is saturated, so cancellations must not
+    queue behind the very calls they are meant to stop.
+    """
+    global _cancel_executor
+    with _executor_lock:
+        if _cancel_executor is None:
+            _cancel_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bigquery-cancel")
+    _cancel_executor.submit(tracker.cancel_all)
+
+
+def _async_tool(sync_tool: Callable[..., str]) -> Callable[..., str]:
+    """Wraps a blocking tool so the Runner's event loop keeps serving other sessions.
+
+    The tool runs in the bounded thread pool with a per-call timeout. If the call
+    times out or the turn is abandoned (the awaiting task is cancelled), every
+    BigQuery job the call started is cancelled so it stops consuming slots.
+    The wrapper keeps the tool's name, signature and docstring, which ADK uses
+    to build the function declaration.
+    """
+
+    @functools.wraps(sync_tool)
+    async def wrapper(*args, **kwargs):
+        tracker = JobTracker()
+        context = contextvars.copy_context()
+        context.run(current_tracker.set, tracker)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            get_tool_executor(), functools.partial(context.run, sync_tool, *args, **kwargs)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=config.tool_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"{sync_tool.__name__} timed out after {config.tool_timeout_seconds}s")
+            _cancel_jobs(tracker)
+            return (
+                f"Error: {sync_tool.__name__} timed out after {config.tool_timeout_seconds} seconds "
+                "and its BigQuery job was cancelled. Try a narrower query."
+            )
+        except asyncio.CancelledError:
+            _cancel_jobs(tracker)
+            raise
+
+    return wrapper
+
+
+execute_sql = _async_tool(tools.execute_sql)
+fetch_more_results = _async_tool(tools.fetch_more_results)
+list_tables = _async_tool(tools.list_tables)
+get_table_schema = _async_tool(tools.get_table_schema)
+
+
+@functools.wraps(tools.execute_sql_batch)
+async def execute_sql_batch(queries, tool_context=None):
+    error = tools._check_batch(queries)
+    if error:
+        return error
+    # Each query is its own pool task with its own timeout and job cancellation
+    semaphore = asyncio.Semaphore(config.batch_max_parallel)
+
+    async def run(sql):
+        async with semaphore:
+            return await execute_sql(sql, tool_context=tool_context)
+
+    results = await asyncio.gather(*(run(sql) for sql in queries))
+    return tools.format_batch_results(queries, results)
+
+
+def get_async_bigquery_tools() -> list:
+    """Returns the non-blocking versions of the BigQuery tools."""
+    return [execute_sql, execute_sql_batch, fetch_more_results, list_tables, get_table_schema]
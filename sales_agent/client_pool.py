@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+ADC_SCOPE = "adc"
+
+
+def credential_scope(token: Optional[str] = None) -> str:
+    """Returns the pool key for a credential: `adc` or a hash of the OAuth token.
+
+    The raw token is never used as a key so it does not end up in logs or stats.
+    """
+    if not token:
+        return ADC_SCOPE
+    digest = hashlib.sha256(str(token).encode("utf-8")).hexdigest()[:16]
+    return f"token:{digest}"
+
+
+@dataclass
+class _PooledClient:
+    client: bigquery.Client
+    created_at: float
+    expires_at: Optional[float]
+
+
+class BigQueryClientPool:
+    """Process-wide, thread-safe LRU pool of BigQuery clients keyed by credential scope.
+
+    Reusing a client keeps its auth state and HTTP session (and therefore its
+    TLS connections) alive across tool calls. ADC clients refresh their own
+    credentials and never expire; clients built from a Gemini Enterprise token
+    are dropped after `token_ttl_seconds` because the token itself is short-lived.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[Optional[str]], bigquery.Client],
+        max_size: int = 32,
+        token_ttl_seconds: float = 3300,
+    ):
+        self.client_factory = client_factory
+        self.max_size = max(1, max_size)
+        self.token_ttl_seconds = token_ttl_seconds
+        self._clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, token: Optional[str] = None) -> bigquery.Client:
+        """Returns the pooled client for `token` (None for ADC), creating it on a miss."""
+        scope = credential_scope(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.get(scope)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+                self._drop(scope)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._clients.move_to_end(scope)
+                self.hits += 1
+                return entry.client
+            self.misses += 1
+
+        # Build outside the lock: ADC lookup and client construction can be slow.
+        client = self.client_factory(token)
+        expires_at = None if scope == ADC_SCOPE else now + self.token_ttl_seconds
+
+        with self._lock:
+            existing = self._clients.get(scope)
+            if existing is not None:
+                # Another thread won the race; keep its client and discard ours.
+                self._clients.move_to_end(scope)
+                return existing.client
+            self._clients[scope] = _PooledClient(client, now, expires_at)
+            while len(self._clients) > self.max_size:
+                evicted_scope = next(iter(self._clients))
+                self._drop(evicted_scope)
+                self.evictions += 1
+                logger.info(f"Evicted BigQuery client for scope {evicted_scope}")
+            return client
+
+    def get_cached(self, scope: str) -> Optional[bigquery.Client]:
+        """Returns a live pooled client for `scope` without creating one or touching the counters."""
+        with self._lock:
+            entry = self._clients.get(scope)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                return None
+            return entry.client
+
+    def clear(self) -> None:
+        """Removes every pooled client and resets the counters."""
+        with self._lock:
+            for scope in list(self._clients):
+                self._drop(scope)
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _drop(self, scope: str) -> None:
+        # Dropped clients are not closed: another thread may still be mid-request
+        # on them. Their HTTP sessions are released once the last reference goes.
+        self._clients.pop(scope, None)
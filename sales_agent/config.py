@@ -3,7 +3,8 @@ from dataclasses import dataclass
 from typing import Optional
 from dotenv import load_dotenv
 
-load_dotenv()
+# How finished turns reach the memory service (MEMORY_INGESTION)
+MEMORY_INGESTION_MODES = ("write_behind", "inline", "none")
 
 
 @dataclass
@@ -17,6 +18,60 @@ class AgentConfig:
     use_agent_engine_memory: bool = False
     use_agent_engine_session: bool = False
     gemini_enterprise_auth_id: Optional[str] = None
+    bigquery_client_pool_size: int = 32
+    bigquery_client_token_ttl_seconds: int = 3300
+    metadata_cache_ttl_seconds: int = 300
+    metadata_cache_size: int = 256
+    metadata_refresh_interval_seconds: int = 0
+    result_cache_backend: str = "memory"
+    result_cache_path: str = "~/.cache/sales_agent/query_results.sqlite"
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl_seconds: int = 3600
+    result_page_rows: int = 100
+    result_page_max_bytes: int = 32000
+    single_flight_enabled: bool = True
+    sql_validation_enabled: bool = True
+    result_format: str = "tsv"
+    result_max_tokens: int = 2000
+    result_arrow_min_rows: int = 5000
+    result_arrow_max_rows: int = 1000000
+    result_arrow_cache_bytes: int = 256 * 1024 * 1024
+    query_preflight_enabled: bool = True
+    max_scan_bytes: int = 10 * 1024 ** 3
+    maximum_bytes_billed: int = 0
+    require_partition_filter: bool = True
+    partition_scan_min_bytes: int = 1024 ** 3
+    streaming_enabled: bool = True
+    async_tools: bool = True
+    tool_thread_pool_size: int = 8
+    tool_timeout_seconds: int = 120
+    batch_max_queries: int = 10
+    batch_max_parallel: int = 4
+    prefetch_schema: bool = False
+    prefetch_refresh_interval_seconds: int = 900
+    instrumentation_enabled: bool = True
+    instrumentation_jsonl_path: Optional[str] = None
+    instrumentation_prometheus_path: Optional[str] = None
+    instrumentation_prometheus_port: int = 0
+    replica_enabled: bool = False
+    replica_dir: str = "~/.cache/sales_agent/replica"
+    replica_sync_interval_seconds: int = 300
+    replica_incremental_column: Optional[str] = None
+    replica_max_bytes: int = 2 * 1024 ** 3
+    replica_allow_user_credentials: bool = False
+    history_max_tokens: int = 8000
+    session_max_count: int = 1000
+    session_max_bytes: int = 256 * 1024 * 1024
+    session_idle_ttl_seconds: int = 3600
+    memory_ingestion: str = "none"
+    memory_ingest_batch_size: int = 16
+    memory_ingest_flush_interval_seconds: float = 1.0
+    memory_ingest_max_pending: int = 1000
+    memory_ingest_max_retries: int = 3
+    plan_cache_enabled: bool = False
+    plan_cache_max_entries: int = 500
+    plan_cache_ttl_seconds: int = 86400
+    plan_cache_min_similarity: float = 0.8
 
     
     @classmethod
@@ -28,6 +83,12 @@ class AgentConfig:
         if not all([project_id, location, bigquery_table_id]):
             raise ValueError("Missing required environment variables: GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION, BIGQUERY_TABLE_ID")
 
+        memory_ingestion = os.getenv("MEMORY_INGESTION", "none").lower()
+        if memory_ingestion not in MEMORY_INGESTION_MODES:
+            raise ValueError(
+                f"Invalid MEMORY_INGESTION '{memory_ingestion}': expected one of {', '.join(MEMORY_INGESTION_MODES)}"
+            )
+
         return cls(
             project_id=project_id,
             location=location,
@@ -38,7 +99,76 @@ class AgentConfig:
             use_agent_engine_memory=os.getenv("USE_AGENT_ENGINE_MEMORY", "false").lower() == "true",
             use_agent_engine_session=os.getenv("USE_AGENT_ENGINE_SESSION", "false").lower() == "true",
             gemini_enterprise_auth_id=os.getenv("GEMINI_ENTERPRISE_AUTH_ID"),
+            bigquery_client_pool_size=int(os.getenv("BIGQUERY_CLIENT_POOL_SIZE", "32")),
+            bigquery_client_token_ttl_seconds=int(os.getenv("BIGQUERY_CLIENT_TOKEN_TTL_SECONDS", "3300")),
+            metadata_cache_ttl_seconds=int(os.getenv("METADATA_CACHE_TTL_SECONDS", "300")),
+            metadata_cache_size=int(os.getenv("METADATA_CACHE_SIZE", "256")),
+            metadata_refresh_interval_seconds=int(os.getenv("METADATA_REFRESH_INTERVAL_SECONDS", "0")),
+            result_cache_backend=os.getenv("RESULT_CACHE_BACKEND", "memory"),
+            result_cache_path=os.getenv("RESULT_CACHE_PATH", "~/.cache/sales_agent/query_results.sqlite"),
+            result_cache_max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            result_cache_ttl_seconds=int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600")),
+            result_page_rows=int(os.getenv("RESULT_PAGE_ROWS", "100")),
+            result_page_max_bytes=int(os.getenv("RESULT_PAGE_MAX_BYTES", "32000")),
+            sql_validation_enabled=os.getenv("SQL_VALIDATION_ENABLED", "true").lower() == "true",
+            single_flight_enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true",
+            result_format=os.getenv("RESULT_FORMAT", "tsv"),
+            result_max_tokens=int(os.getenv("RESULT_MAX_TOKENS", "2000")),
+            result_arrow_min_rows=int(os.getenv("RESULT_ARROW_MIN_ROWS", "5000")),
+            result_arrow_max_rows=int(os.getenv("RESULT_ARROW_MAX_ROWS", "1000000")),
+            result_arrow_cache_bytes=int(os.getenv("RESULT_ARROW_CACHE_BYTES", str(256 * 1024 * 1024))),
+            query_preflight_enabled=os.getenv("QUERY_PREFLIGHT_ENABLED", "true").lower() == "true",
+            max_scan_bytes=int(os.getenv("MAX_SCAN_BYTES", str(10 * 1024 ** 3))),
+            maximum_bytes_billed=int(os.getenv("MAXIMUM_BYTES_BILLED", "0")),
+            require_partition_filter=os.getenv("REQUIRE_PARTITION_FILTER", "true").lower() == "true",
+            partition_scan_min_bytes=int(os.getenv("PARTITION_SCAN_MIN_BYTES", str(1024 ** 3))),
+            streaming_enabled=os.getenv("STREAMING_ENABLED", "true").lower() == "true",
+            async_tools=os.getenv("ASYNC_TOOLS", "true").lower() == "true",
+            tool_thread_pool_size=int(os.getenv("TOOL_THREAD_POOL_SIZE", "8")),
+            tool_timeout_seconds=int(os.getenv("TOOL_TIMEOUT_SECONDS", "120")),
+            batch_max_queries=int(os.getenv("BATCH_MAX_QUERIES", "10")),
+            batch_max_parallel=int(os.getenv("BATCH_MAX_PARALLEL", "4")),
+            prefetch_schema=os.getenv("PREFETCH_SCHEMA", "false").lower() == "true",
+            prefetch_refresh_interval_seconds=int(os.getenv("PREFETCH_REFRESH_INTERVAL_SECONDS", "900")),
+            instrumentation_enabled=os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true",
+            instrumentation_jsonl_path=os.getenv("INSTRUMENTATION_JSONL_PATH") or None,
+            instrumentation_prometheus_path=os.getenv("INSTRUMENTATION_PROMETHEUS_PATH") or None,
+            instrumentation_prometheus_port=int(os.getenv("INSTRUMENTATION_PROMETHEUS_PORT", "0")),
+            replica_enabled=os.getenv("REPLICA_ENABLED", "false").lower() == "true",
+            replica_dir=os.getenv("REPLICA_DIR", "~/.cache/sales_agent/replica"),
+            replica_sync_interval_seconds=int(os.getenv("REPLICA_SYNC_INTERVAL_SECONDS", "300")),
+            replica_incremental_column=os.getenv("REPLICA_INCREMENTAL_COLUMN") or None,
+            replica_max_bytes=int(os.getenv("REPLICA_MAX_BYTES", str(2 * 1024 ** 3))),
+            replica_allow_user_credentials=os.getenv("REPLICA_ALLOW_USER_CREDENTIALS", "false").lower() == "true",
+            history_max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "8000")),
+            session_max_count=int(os.getenv("SESSION_MAX_COUNT", "1000")),
+            session_max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+            session_idle_ttl_seconds=int(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600")),
+            memory_ingestion=memory_ingestion,
+            memory_ingest_batch_size=int(os.getenv("MEMORY_INGEST_BATCH_SIZE", "16")),
+            memory_ingest_flush_interval_seconds=float(os.getenv("MEMORY_INGEST_FLUSH_INTERVAL_SECONDS", "1.0")),
+            memory_ingest_max_pending=int(os.getenv("MEMORY_INGEST_MAX_PENDING", "1000")),
+            memory_ingest_max_retries=int(os.getenv("MEMORY_INGEST_MAX_RETRIES", "3")),
+            plan_cache_enabled=os.getenv("PLAN_CACHE_ENABLED", "false").lower() == "true",
+            plan_cache_max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "500")),
+            plan_cache_ttl_seconds=int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400")),
+            plan_cache_min_similarity=float(os.getenv("PLAN_CACHE_MIN_SIMILARITY", "0.8")),
         )
 
-# Global config instance
-config = AgentConfig.from_env()
+_config: Optional[AgentConfig] = None
+
+
+def get_config() -> AgentConfig:
+    """Returns the global config, loading `.env` and the environment on first use."""
+    global _config
+    if _config is None:
+        load_dotenv()
+        _config = AgentConfig.from_env()
+    return _config
+
+
+def __getattr__(name: str):
+    # `from .config import config` resolves here, so importing this module has no side effects
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,425 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class Span:
+    """One timed unit of work: a whole turn, a single LLM call or a single tool call.
+
+    Turn spans also carry `first_token_ms` and `answer_ms`, the perceived
+    latency: time until the model's first answer text and its final answer.
+    """
+    kind: str
+    name: str
+    session_id: Optional[str]
+    invocation_id: Optional[str]
+    start_time: float
+    duration_ms: float
+    attributes: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` for `q` in [0, 1]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+# Query statistics reported by tools, keyed by function call id until the
+# after-tool callback picks them up. Bounded so calls made outside an
+# instrumented agent (e.g. tests, scripts) cannot grow it forever.
+_pending_query_stats: "OrderedDict[str, list]" = OrderedDict()
+_pending_lock = threading.Lock()
+_MAX_PENDING = 1000
+
+# Session state key through which tools report query progress to clients: the
+# state delta rides on the tool's function response event, so streaming
+# clients (local or deployed) can show e.g. "2.1 GiB scanned" per call.
+QUERY_PROGRESS_STATE_KEY = "query_progress"
+
+
+def record_query_stats(tool_context, job=None, cache_hit: Optional[bool] = None, engine: str = "bigquery") -> None:
+    """Called by tools to attach BigQuery job statistics to the current tool span.
+
+    `cache_hit` defaults to the job's own `cache_hit` (BigQuery's query cache).
+    """
+    call_id = getattr(tool_context, "function_call_id", None)
+    if not isinstance(call_id, str):
+        return
+    if cache_hit is None:
+        cache_hit = getattr(job, "cache_hit", None) is True
+    stats = {"engine": engine, "cache_hit": cache_hit}
+    if job is not None:
+        for key, attribute in (("job_id", "job_id"), ("bytes_processed", "total_bytes_processed"), ("slot_ms", "slot_millis")):
+            value = getattr(job, attribute, None)
+            if isinstance(value, (int, str)):
+                stats[key] = value
+    with _pending_lock:
+        _pending_query_stats.setdefault(call_id, []).append(stats)
+        queries = [q for q in _pending_query_stats[call_id] if not q.get("format")]
+        while len(_pending_query_stats) > _MAX_PENDING:
+            _pending_query_stats.popitem(last=False)
+        _report_progress(tool_context, call_id, queries)
+
+
+def _report_progress(tool_context, call_id: str, queries: list) -> None:
+    state = getattr(tool_context, "state", None)
+    if state is None:
+        return
+    # Keyed by call id: ADK deep-merges the state deltas of parallel calls into one event
+    state[QUERY_PROGRESS_STATE_KEY] = {call_id: {
+        "queries": len(queries),
+        "bytes_processed": sum(q.get("bytes_processed", 0) for q in queries),
+        "cache_hits": sum(1 for q in queries if q["cache_hit"]),
+        "engines": sorted({q["engine"] for q in queries}),
+    }}
+
+
+def record_format_stats(tool_context, output_bytes: int, output_tokens: int, format_ms: float,
+                        summarized: bool = False) -> None:
+    """Called by tools to attach result formatting statistics (output size, formatting time) to the tool span."""
+    call_id = getattr(tool_context, "function_call_id", None)
+    if not isinstance(call_id, str):
+        return
+    stats = {"format": True, "output_bytes": output_bytes, "output_tokens": output_tokens,
+             "format_ms": format_ms, "summarized": summarized}
+    with _pending_lock:
+        _pending_query_stats.setdefault(call_id, []).append(stats)
+        while len(_pending_query_stats) > _MAX_PENDING:
+            _pending_query_stats.popitem(last=False)
+
+
+def _pop_query_stats(call_id: Optional[str]) -> list:
+    with _pending_lock:
+        return _pending_query_stats.pop(call_id, []) if call_id else []
+
+
+def _session_id(context) -> Optional[str]:
+    session = getattr(context, "session", None)
+    if session is None:
+        invocation_context = getattr(context, "_invocation_context", None)
+        session = getattr(invocation_context, "session", None)
+    session_id = getattr(session, "id", None)
+    return session_id if isinstance(session_id, str) else None
+
+
+class JsonlSink:
+    """Appends every span to a JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, span: Span, instrumentation: "Instrumentation") -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text-format file (e.g. for node_exporter's textfile collector) after every turn."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, span: Span, instrumentation: "Instrumentation") -> None:
+        if span.kind != "turn":
+            return
+        text = instrumentation.prometheus_text()
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+
+class Instrumentation:
+    """Records per-turn latency and cost spans through ADK agent callbacks.
+
+    Attach with `Agent(**instrumentation.callbacks(), ...)`. Spans go to the
+    configured sinks, and the most recent `window` durations per series feed
+    the p50/p95/p99 aggregates in `summary()` and `prometheus_text()`.
+    Everything is in-process, so it works offline with the in-memory services.
+    """
+
+    def __init__(self, sinks: Optional[list] = None, window: int = 10000):
+        self.sinks = list(sinks or [])
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations: Dict[tuple, deque] = {}
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._model_starts: Dict[tuple, float] = {}
+        self._tool_starts: Dict[str, float] = {}
+        self._turn_starts: Dict[str, float] = {}
+        self._turn_totals: Dict[str, dict] = defaultdict(lambda: defaultdict(float))
+        # invocation id -> perf_counter() of the first answer text, and of the final answer
+        self._first_token: Dict[str, float] = {}
+        self._answered: Dict[str, float] = {}
+
+    def callbacks(self) -> dict:
+        """Returns the Agent keyword arguments that attach this instrumentation."""
+        return {
+            "before_agent_callback": self.before_agent,
+            "after_agent_callback": self.after_agent,
+            "before_model_callback": self.before_model,
+            "after_model_callback": self.after_model,
+            "before_tool_callback": self.before_tool,
+            "after_tool_callback": self.after_tool,
+        }
+
+    # --- ADK callbacks (all return None so they never alter the flow) ---
+
+    def before_agent(self, callback_context):
+        self._turn_starts[callback_context.invocation_id] = time.perf_counter()
+
+    def after_agent(self, callback_context):
+        invocation_id = callback_context.invocation_id
+        start = self._turn_starts.pop(invocation_id, None)
+        totals = self._turn_totals.pop(invocation_id, {})
+        first_token = self._first_token.pop(invocation_id, None)
+        answered = self._answered.pop(invocation_id, None)
+        for key in [k for k in self._model_starts if k[0] == invocation_id]:
+            self._model_starts.pop(key, None)
+        if start is None:
+            return None
+        attributes = {key: int(value) for key, value in totals.items()}
+        if first_token is not None:
+            attributes["first_token_ms"] = (first_token - start) * 1000
+        if answered is not None:
+            attributes["answer_ms"] = (answered - start) * 1000
+        self._emit(Span(
+            kind="turn",
+            name=getattr(callback_context, "agent_name", "agent"),
+            session_id=_session_id(callback_context),
+            invocation_id=invocation_id,
+            start_time=time.time() - (time.perf_counter() - start),
+            duration_ms=(time.perf_counter() - start) * 1000,
+            attributes=attributes,
+        ))
+        return None
+
+    def before_model(self, callback_context, llm_request):
+        self._model_starts[(callback_context.invocation_id, "llm")] = time.perf_counter()
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        invocation_id = callback_context.invocation_id
+        self._note_answer_text(invocation_id, llm_response)
+        if getattr(llm_response, "partial", False):
+            # Streaming chunk; the span closes on the final, non-partial response
+            return None
+        start = self._model_starts.pop((invocation_id, "llm"), None)
+        if start is None:
+            return None
+        usage = getattr(llm_response, "usage_metadata", None)
+        attributes = {
+            "model": getattr(llm_response, "model_version", None),
+            "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+            "response_tokens": getattr(usage, "candidates_token_count", None) or 0,
+        }
+        self._add_to_turn(invocation_id, llm_calls=1, prompt_tokens=attributes["prompt_tokens"],
+                          response_tokens=attributes["response_tokens"])
+        self._emit(Span(
+            kind="llm",
+            name="generate_content",
+            session_id=_session_id(callback_context),
+            invocation_id=invocation_id,
+            start_time=time.time() - (time.perf_counter() - start),
+            duration_ms=(time.perf_counter() - start) * 1000,
+            attributes=attributes,
+        ))
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        self._tool_starts[tool_context.function_call_id] = time.perf_counter()
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        call_id = tool_context.function_call_id
+        start = self._tool_starts.pop(call_id, None)
+        queries = _pop_query_stats(call_id)
+        if start is None:
+            return None
+        formats = [q for q in queries if q.get("format")]
+        queries = [q for q in queries if not q.get("format")]
+        attributes = {
+            "job_ids": [q["job_id"] for q in queries if "job_id" in q],
+            "bytes_processed": sum(q.get("bytes_processed", 0) for q in queries),
+            "slot_ms": sum(q.get("slot_ms", 0) for q in queries),
+            "cache_hits": sum(1 for q in queries if q["cache_hit"]),
+            "cache_misses": sum(1 for q in queries if not q["cache_hit"]),
+            "engines": sorted({q["engine"] for q in queries}),
+            "error": "error" in str(tool_response)[:200].lower(),
+        }
+        if formats:
+            attributes.update(
+                output_bytes=sum(f["output_bytes"] for f in formats),
+                output_tokens=sum(f["output_tokens"] for f in formats),
+                format_ms=sum(f["format_ms"] for f in formats),
+                summarized_results=sum(1 for f in formats if f["summarized"]),
+            )
+        self._add_to_turn(tool_context.invocation_id, tool_calls=1, bytes_processed=attributes["bytes_processed"],
+                          slot_ms=attributes["slot_ms"], output_tokens=attributes.get("output_tokens", 0))
+        self._emit(Span(
+            kind="tool",
+            name=getattr(tool, "name", str(tool)),
+            session_id=_session_id(tool_context),
+            invocation_id=tool_context.invocation_id,
+            start_time=time.time() - (time.perf_counter() - start),
+            duration_ms=(time.perf_counter() - start) * 1000,
+            attributes=attributes,
+        ))
+        return None
+
+    def _note_answer_text(self, invocation_id: str, llm_response) -> None:
+        content = getattr(llm_response, "content", None)
+        parts = getattr(content, "parts", None) or []
+        if not any(getattr(part, "text", None) and not getattr(part, "thought", None) for part in parts):
+            return
+        now = time.perf_counter()
+        self._first_token.setdefault(invocation_id, now)
+        if not getattr(llm_response, "partial", False) and not any(getattr(part, "function_call", None) for part in parts):
+            self._answered[invocation_id] = now
+
+    # --- Aggregation and export ---
+
+    def summary(self) -> dict:
+        """Returns count and p50/p95/p99 latency (ms) per `kind:name` series, plus counters."""
+        with self._lock:
+            series = {key: list(values) for key, values in self._durations.items()}
+            counters = dict(self._counters)
+        result = {}
+        for (kind, name), values in sorted(series.items()):
+            result[f"{kind}:{name}"] = {
+                "count": len(values),
+                **{f"p{int(q * 100)}_ms": percentile(values, q) for q in QUANTILES},
+            }
+        return {"latency": result, "counters": counters}
+
+    def prometheus_text(self) -> str:
+        """Renders the aggregates in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            "# HELP sales_agent_latency_seconds Latency of turns, LLM calls and tool calls, and time to first token and answer.",
+            "# TYPE sales_agent_latency_seconds summary",
+        ]
+        with self._lock:
+            series = {key: list(values) for key, values in self._durations.items()}
+        for (kind, name), values in sorted(series.items()):
+            labels = f'kind="{kind}",name="{name}"'
+            for q in QUANTILES:
+                lines.append(f'sales_agent_latency_seconds{{{labels},quantile="{q}"}} {percentile(values, q) / 1000:.6f}')
+            lines.append(f"sales_agent_latency_seconds_sum{{{labels}}} {sum(values) / 1000:.6f}")
+            lines.append(f"sales_agent_latency_seconds_count{{{labels}}} {len(values)}")
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append(f"# TYPE sales_agent_{counter}_total counter")
+            lines.append(f"sales_agent_{counter}_total {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+            self._counters.clear()
+
+    def _add_to_turn(self, invocation_id: str, **values) -> None:
+        totals = self._turn_totals[invocation_id]
+        for key, value in values.items():
+            totals[key] += value or 0
+
+    def _emit(self, span: Span) -> None:
+        with self._lock:
+            key = (span.kind, span.name)
+            if key not in self._durations:
+                self._durations[key] = deque(maxlen=self.window)
+            self._durations[key].append(span.duration_ms)
+            # Perceived latency gets its own series next to the turn's total
+            for attribute, kind in (("first_token_ms", "first_token"), ("answer_ms", "answer")):
+                if span.kind == "turn" and attribute in span.attributes:
+                    if (kind, span.name) not in self._durations:
+                        self._durations[(kind, span.name)] = deque(maxlen=self.window)
+                    self._durations[(kind, span.name)].append(span.attributes[attribute])
+            self._counters[f"{span.kind}_spans"] += 1
+            for attribute in (
+                "prompt_tokens", "response_tokens", "bytes_processed", "slot_ms", "cache_hits", "cache_misses",
+                "output_bytes", "output_tokens", "format_ms", "summarized_results",
+            ):
+                if span.kind != "turn" and isinstance(span.attributes.get(attribute), (int, float)):
+                    self._counters[attribute] += span.attributes[attribute]
+        for sink in self.sinks:
+            try:
+                sink.write(span, self)
+            except Exception as e:
+                logger.warning(f"Instrumentation sink {type(sink).__name__} failed: {e}")
+
+
+def serve_prometheus(instrumentation: Instrumentation, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves `/metrics` in Prometheus text format from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = instrumentation.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="prometheus-metrics", daemon=True).start()
+    logger.info(f"Serving Prometheus metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+_instrumentation: Optional[Instrumentation] = None
+_instrumentation_lock = threading.Lock()
+
+
+def get_instrumentation() -> Instrumentation:
+    """Returns the process-wide instrumentation, creating its sinks (and endpoint) from config on first use."""
+    global _instrumentation
+    with _instrumentation_lock:
+        if _instrumentation is None:
+            try:
+                from .config import config
+            except (ImportError, ValueError):
+                from config import config
+
+            sinks = []
+            if config.instrumentation_jsonl_path:
+                sinks.append(JsonlSink(config.instrumentation_jsonl_path))
+            if config.instrumentation_prometheus_path:
+                sinks.append(PrometheusFileSink(config.instrumentation_prometheus_path))
+            _instrumentation = Instrumentation(sinks)
+            if config.instrumentation_prometheus_port:
+                serve_prometheus(_instrumentation, config.instrumentation_prometheus_port)
+        return _instrumentation
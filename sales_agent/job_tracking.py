@@ -0,0 +1,48 @@
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobTracker:
+    """Collects the BigQuery jobs started by one tool call so they can be cancelled together."""
+
+    def __init__(self):
+        self._jobs = []
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def add(self, job) -> None:
+        with self._lock:
+            self._jobs.append(job)
+            cancelled = self.cancelled
+        if cancelled:
+            # The call was abandoned while this job was being submitted
+            self._cancel(job)
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            jobs = list(self._jobs)
+        for job in jobs:
+            self._cancel(job)
+
+    @staticmethod
+    def _cancel(job) -> None:
+        try:
+            job.cancel()
+            logger.info(f"Cancelled BigQuery job {job.job_id}")
+        except Exception as e:
+            logger.warning(f"Could not cancel BigQuery job: {e}")
+
+
+current_tracker: ContextVar[Optional[JobTracker]] = ContextVar("current_job_tracker", default=None)
+
+
+def track_job(job) -> None:
+    """Registers `job` with the tracker of the current tool call, if there is one."""
+    tracker = current_tracker.get()
+    if tracker is not None:
+        tracker.add(job)
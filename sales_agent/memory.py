@@ -0,0 +1,502 @@
+import asyncio
+import atexit
+import functools
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+
+logger = logging.getLogger(__name__)
+
+# Scope for events added without a session id (same as ADK's InMemoryMemoryService)
+_UNKNOWN_SESSION_ID = "__unknown_session_id__"
+
+
+def _words(text: str) -> Set[str]:
+    """Lower-case `\\w+` tokens of NFC-normalized text, as ADK's in-memory service matches queries."""
+    return {word.lower() for word in re.findall(r"\w+", unicodedata.normalize("NFC", text))}
+
+
+def _is_latin(c: str) -> bool:
+    if c.isascii():
+        return c.isalnum() or c == "_"
+    return unicodedata.name(c, "").startswith("LATIN")
+
+
+def _searchable_words(text: str) -> Set[str]:
+    """Tokens an event can be found by: its words, plus the single-script runs of mixed-script words.
+
+    Japanese and Chinese are written without spaces, so `私はPythonを使う` is one
+    token; splitting it on Latin/non-Latin boundaries makes `python` findable.
+    """
+    words = _words(text)
+    for word in list(words):
+        if not word.isascii():
+            for _, group in itertools.groupby(word, _is_latin):
+                words.add("".join(group))
+    return words
+
+
+class _UserIndex:
+    """One user's indexed events: postings from word to event number.
+
+    Search results are ranked in the order ADK's in-memory service scans
+    events: sessions in the order they were first added, then each session's
+    events in order, so `order` keeps each event's (session rank, position).
+    """
+
+    def __init__(self):
+        self.next_number = 0
+        self.session_ranks: Dict[str, int] = {}
+        self.order: Dict[int, tuple] = {}
+        self.entries: Dict[int, MemoryEntry] = {}
+        self.words: Dict[int, Set[str]] = {}
+        # Lower-cased text of events with non-ASCII words, for substring matches of non-ASCII query words
+        self.texts: Dict[int, str] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        # session id -> event id -> event number
+        self.sessions: Dict[str, Dict[str, int]] = {}
+
+    def add(self, session_id: str, event, position: int) -> None:
+        events = self.sessions.setdefault(session_id, {})
+        rank = self.session_ranks.setdefault(session_id, len(self.session_ranks))
+        if event.id in events:
+            if events[event.id] >= 0:
+                self.order[events[event.id]] = (rank, position)
+            return
+        text = " ".join(part.text for part in event.content.parts if part.text)
+        words = _searchable_words(text)
+        if not words:
+            # Tool calls and responses have no text to match; remember the id so re-adds skip them
+            events[event.id] = -1
+            return
+        number = self.next_number
+        self.next_number += 1
+        events[event.id] = number
+        self.order[number] = (rank, position)
+        self.entries[number] = MemoryEntry(
+            content=event.content,
+            author=event.author,
+            timestamp=datetime.fromtimestamp(event.timestamp).isoformat(),
+        )
+        self.words[number] = words
+        if not text.isascii():
+            self.texts[number] = unicodedata.normalize("NFC", text).lower()
+        for word in words:
+            self.postings[word].add(number)
+
+    def remove(self, session_id: str, event_id: str) -> None:
+        number = self.sessions.get(session_id, {}).pop(event_id, -1)
+        if number < 0:
+            return
+        self.entries.pop(number, None)
+        self.order.pop(number, None)
+        self.texts.pop(number, None)
+        for word in self.words.pop(number, ()):
+            numbers = self.postings.get(word)
+            if numbers is not None:
+                numbers.discard(number)
+                if not numbers:
+                    del self.postings[word]
+
+
+class InvertedIndexMemoryService(BaseMemoryService):
+    """In-memory memory service that searches an inverted keyword index instead of scanning every event.
+
+    Matches and ranks like ADK's `InMemoryMemoryService` (the events sharing
+    the most words with the query, ties in session and event order), but each event is
+    tokenized once when it is ingested and a search only touches the events
+    containing a query word. Re-adding a session, as happens after every turn,
+    indexes just its new events. Non-ASCII query words also match inside
+    longer words, as ADK does for scripts written without spaces; those few
+    words fall back to scanning the events with non-ASCII text.
+    """
+
+    def __init__(self, max_results: int = 10):
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._users: Dict[tuple, _UserIndex] = {}
+
+    async def add_session_to_memory(self, session) -> None:
+        events = [event for event in session.events if event.content and event.content.parts]
+        with self._lock:
+            index = self._users.setdefault((session.app_name, session.user_id), _UserIndex())
+            current_ids = {event.id for event in events}
+            for event_id in [i for i in index.sessions.get(session.id, {}) if i not in current_ids]:
+                index.remove(session.id, event_id)
+            for position, event in enumerate(events):
+                index.add(session.id, event, position)
+
+    async def add_events_to_memory(self, *, app_name: str, user_id: str, events, session_id: Optional[str] = None,
+                                   custom_metadata=None) -> None:
+        with self._lock:
+            index = self._users.setdefault((app_name, user_id), _UserIndex())
+            session_id = session_id or _UNKNOWN_SESSION_ID
+            for event in events:
+                if event.content and event.content.parts:
+                    # Appended after the session's events, as ADK does
+                    index.add(session_id, event, len(index.sessions.get(session_id, ())))
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        query_words = _words(query)
+        with self._lock:
+            index = self._users.get((app_name, user_id))
+            if index is None:
+                return SearchMemoryResponse()
+            scores: Dict[int, int] = defaultdict(int)
+            for word in query_words:
+                numbers = index.postings.get(word, ())
+                for number in numbers:
+                    scores[number] += 1
+                if not word.isascii():
+                    for number, text in index.texts.items():
+                        if word in text and number not in numbers:
+                            scores[number] += 1
+            best = heapq.nsmallest(self.max_results, scores.items(), key=lambda item: (-item[1], index.order[item[0]]))
+            return SearchMemoryResponse(memories=[index.entries[number] for number, _ in best])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "events": sum(len(index.entries) for index in self._users.values()),
+                "words": sum(len(index.postings) for index in self._users.values()),
+            }
+
+
+class _Pending:
+    """One session to ingest: `add()` pushes it to the memory service; `key` identifies the session there."""
+    __slots__ = ("key", "add", "session_id", "submitted_at")
+
+    def __init__(self, key: tuple, add: Callable[[], Awaitable[None]], session_id: str, submitted_at: float):
+        self.key = key
+        self.add = add
+        self.session_id = session_id
+        self.submitted_at = submitted_at
+
+
+def _session_key(service, session) -> tuple:
+    return (id(service), session.app_name, session.user_id, session.id)
+
+
+def _memory_service(callback_context) -> Optional[BaseMemoryService]:
+    """The runner's memory service, read from the callback's invocation context.
+
+    ADK has no public accessor for it (`CallbackContext.add_session_to_memory()`
+    only ingests inline), so this private read is only a fallback for runners
+    not built by `create_runner()`, which passes its memory service to the
+    ingestor directly.
+    """
+    invocation_context = getattr(callback_context, "_invocation_context", None)
+    service = getattr(invocation_context, "memory_service", None)
+    if service is not None and not _warned_private_lookup.is_set():
+        _warned_private_lookup.set()
+        logger.warning("MemoryIngestor has no memory service; using the runner's from ADK's private invocation "
+                       "context. Pass memory_service to MemoryIngestor to avoid depending on ADK internals.")
+    return service
+
+
+_warned_private_lookup = threading.Event()
+
+
+async def _add_to_runner_memory(callback_context) -> None:
+    try:
+        await callback_context.add_session_to_memory()
+    except ValueError as e:
+        if "memory service is not available" not in str(e):
+            raise
+        # The runner was built without a memory service; there is nothing to ingest into
+        logger.debug("Runner has no memory service; skipping memory ingestion")
+
+
+class MemoryIngestor:
+    """Pushes finished turns' sessions into the memory service without holding up the response.
+
+    Attach with `Agent(**ingestor.callbacks(), ...)`; after every turn the
+    session is handed to the memory service the runner was built with. With
+    `write_behind` the after-agent callback only queues a snapshot of the
+    session and a background thread ingests the queue in batches of up to
+    `batch_size` (concurrently), at most `flush_interval_seconds` after a
+    session was queued. A session queued again before it was ingested
+    replaces its older snapshot, since every snapshot holds the full session.
+    The queue is bounded by `max_pending`: when it is full, callers wait up to
+    `enqueue_timeout_seconds` for room and the snapshot is dropped after that
+    (the session's next turn queues it again). Failed ingestions are retried
+    `max_retries` times with exponential backoff, and the queue is flushed on
+    interpreter exit. Without `write_behind` the session is ingested inline,
+    which is what the write-behind mode is benchmarked against.
+
+    Sessions go to `memory_service` (`create_runner()` sets it to the runner's).
+    Without one, inline ingestion uses ADK's public
+    `CallbackContext.add_session_to_memory()` and write-behind falls back to the
+    runner's memory service found in the callback context.
+    """
+
+    def __init__(self, write_behind: bool = True, batch_size: int = 16, flush_interval_seconds: float = 1.0,
+                 max_pending: int = 1000, enqueue_timeout_seconds: float = 1.0, max_retries: int = 3,
+                 retry_backoff_seconds: float = 0.5, memory_service: Optional[BaseMemoryService] = None):
+        self.write_behind = write_behind
+        self.memory_service = memory_service
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max(1, max_pending)
+        self.enqueue_timeout_seconds = enqueue_timeout_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # (id(service), app, user, session id) -> newest snapshot, oldest first
+        self._pending: "OrderedDict[tuple, _Pending]" = OrderedDict()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        self.clear()
+
+    def callbacks(self) -> dict:
+        """Returns the Agent keyword arguments that attach this ingestor."""
+        return {"after_agent_callback": self.after_agent}
+
+    async def after_agent(self, callback_context):
+        session = callback_context.session
+        service = self.memory_service
+        if service is None and not self.write_behind and hasattr(callback_context, "add_session_to_memory"):
+            # Inline ingestion goes through ADK's public API
+            add = functools.partial(_add_to_runner_memory, callback_context)
+            await self._ingest_inline(_Pending(_session_key(None, session), add, session.id, time.perf_counter()))
+            return None
+        if service is None:
+            service = _memory_service(callback_context)
+        if service is not None:
+            await self.ingest(service, session)
+        return None
+
+    async def ingest(self, service: BaseMemoryService, session) -> bool:
+        """Ingests `session` into `service`, inline or via the queue; returns False if it was dropped."""
+        start = time.perf_counter()
+        key = _session_key(service, session)
+        if not self.write_behind:
+            return await self._ingest_inline(
+                _Pending(key, functools.partial(service.add_session_to_memory, session), session.id, start)
+            )
+        # Later turns append to the live session; queue what it holds now
+        snapshot = session.model_copy(update={"events": list(session.events)})
+        pending = _Pending(key, functools.partial(service.add_session_to_memory, snapshot), session.id, start)
+        queued = self._enqueue(pending)
+        if not queued:
+            queued = await asyncio.get_running_loop().run_in_executor(
+                None, self._enqueue, pending, self.enqueue_timeout_seconds
+            )
+        self._record_enqueue(start)
+        if not queued:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"Memory ingestion queue is full; dropped session {session.id} until its next turn")
+        return queued
+
+    async def _ingest_inline(self, pending: _Pending) -> bool:
+        ok = await self._ingest_one(pending)
+        self._record_enqueue(pending.submitted_at)
+        return ok
+
+    def _enqueue(self, pending: _Pending, timeout: float = 0) -> bool:
+        key = pending.key
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.backpressure_waits += 1
+                self._changed.wait(remaining)
+            if key in self._pending:
+                pending.submitted_at = self._pending[key].submitted_at
+                self.coalesced += 1
+            self._pending[key] = pending
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            self._changed.notify_all()
+        self._ensure_worker()
+        return True
+
+    def _record_enqueue(self, start: float) -> None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.enqueue_total_ms += elapsed_ms
+            self.enqueue_max_ms = max(self.enqueue_max_ms, elapsed_ms)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopping = False
+            self._worker = threading.Thread(target=self._run, name="memory-ingestor", daemon=True)
+            self._worker.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    loop.run_until_complete(self._ingest_batch(batch))
+                except Exception as e:
+                    # Keep the worker alive; a failed batch must not stall every later turn
+                    logger.warning(f"Memory ingestion batch failed: {e}")
+                finally:
+                    with self._changed:
+                        self._in_flight -= len(batch)
+                        self.batches += 1
+                        self._changed.notify_all()
+        finally:
+            loop.close()
+
+    def _next_batch(self) -> Optional[List[_Pending]]:
+        """Waits for a full batch, the oldest snapshot's flush interval, a flush or shutdown."""
+        with self._changed:
+            while True:
+                if self._pending:
+                    oldest = next(iter(self._pending.values())).submitted_at
+                    wait = oldest + self.flush_interval_seconds - time.perf_counter()
+                    if len(self._pending) >= self.batch_size or wait <= 0 or self._flush_requested or self._stopping:
+                        break
+                    self._changed.wait(wait)
+                elif self._stopping:
+                    return None
+                else:
+                    self._flush_requested = False
+                    self._changed.wait()
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            self._in_flight += len(batch)
+            self._changed.notify_all()
+            return batch
+
+    async def _ingest_batch(self, batch: List[_Pending]) -> None:
+        await asyncio.gather(*(self._ingest_one(pending) for pending in batch))
+
+    async def _ingest_one(self, pending: _Pending) -> bool:
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await pending.add()
+            except Exception as e:
+                with self._lock:
+                    superseded = pending.key in self._pending
+                    if attempt < self.max_retries and not superseded:
+                        self.retries += 1
+                if superseded:
+                    # A newer snapshot of the session is queued; it will be ingested instead
+                    return False
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.failed += 1
+                    logger.warning(f"Giving up ingesting session {pending.session_id} into memory: {e}")
+                    return False
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** attempt)
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                self.ingested += 1
+                self.ingest_total_ms += (now - start) * 1000
+                lag_ms = (now - pending.submitted_at) * 1000
+                self.lag_total_ms += lag_ms
+                self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+            return True
+        return False
+
+    def flush(self, timeout: float = 30) -> bool:
+        """Ingests everything queued now; returns False if that took longer than `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            self._flush_requested = True
+            self._changed.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._worker is None or not self._worker.is_alive():
+                    return not (self._pending or self._in_flight)
+                self._changed.wait(remaining)
+            self._flush_requested = False
+        return True
+
+    def close(self, timeout: float = 30) -> None:
+        """Flushes the queue and stops the background thread."""
+        flushed = self.flush(timeout)
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+            worker, pending = self._worker, len(self._pending)
+        if worker is not None:
+            worker.join(timeout=5)
+        if not flushed:
+            logger.warning(f"Memory ingestion did not finish within {timeout}s; {pending} sessions were not ingested")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.calls = self.submitted = self.coalesced = self.dropped = self.backpressure_waits = 0
+            self.ingested = self.failed = self.retries = self.batches = self.max_queue_depth = 0
+            self.enqueue_total_ms = self.enqueue_max_ms = 0.0
+            self.ingest_total_ms = self.lag_total_ms = self.lag_max_ms = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": "write_behind" if self.write_behind else "inline",
+                "pending": len(self._pending) + self._in_flight,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "backpressure_waits": self.backpressure_waits,
+                "ingested": self.ingested,
+                "failed": self.failed,
+                "retries": self.retries,
+                "batches": self.batches,
+                "max_queue_depth": self.max_queue_depth,
+                # Time the turn itself spent handing the session over
+                "turn_overhead_avg_ms": self.enqueue_total_ms / self.calls if self.calls else None,
+                "turn_overhead_max_ms": self.enqueue_max_ms,
+                "ingest_avg_ms": self.ingest_total_ms / self.ingested if self.ingested else None,
+                # Time from queueing until the session was searchable
+                "lag_avg_ms": self.lag_total_ms / self.ingested if self.ingested else None,
+                "lag_max_ms": self.lag_max_ms,
+            }
+
+
+_ingestor: Optional[MemoryIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_memory_ingestor() -> MemoryIngestor:
+    """Returns the process-wide memory ingestor, configured from the MEMORY_INGEST_* settings on first use."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            try:
+                from .config import config
+            except (ImportError, ValueError):
+                from config import config
+            _ingestor = MemoryIngestor(
+                write_behind=config.memory_ingestion == "write_behind",
+                batch_size=config.memory_ingest_batch_size,
+                flush_interval_seconds=config.memory_ingest_flush_interval_seconds,
+                max_pending=config.memory_ingest_max_pending,
+                max_retries=config.memory_ingest_max_retries,
+            )
+        return _ingestor
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+TABLE = "table"
+DATASET = "dataset"
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    name: str
+    field_type: str
+    mode: str = "NULLABLE"
+    description: Optional[str] = None
+    fields: Tuple["ColumnInfo", ...] = ()
+
+    @classmethod
+    def from_schema_field(cls, schema_field) -> "ColumnInfo":
+        return cls(
+            name=schema_field.name,
+            field_type=schema_field.field_type,
+            mode=_str_or_none(getattr(schema_field, "mode", None)) or "NULLABLE",
+            description=_str_or_none(getattr(schema_field, "description", None)),
+            fields=tuple(cls.from_schema_field(f) for f in (_list_or_empty(getattr(schema_field, "fields", None)))),
+        )
+
+
+@dataclass(frozen=True)
+class TableMetadata:
+    """The subset of a BigQuery table's metadata the tools rely on."""
+    table_id: str
+    columns: Tuple[ColumnInfo, ...]
+    etag: Optional[str] = None
+    modified: Optional[str] = None
+    num_rows: Optional[int] = None
+    num_bytes: Optional[int] = None
+    partitioning_type: Optional[str] = None
+    partitioning_field: Optional[str] = None
+    require_partition_filter: bool = False
+    clustering_fields: Tuple[str, ...] = ()
+    table_type: Optional[str] = None
+    has_streaming_buffer: bool = False
+
+    @property
+    def is_static(self) -> bool:
+        """True if the version reliably changes with the data (not a view, external or streaming table)."""
+        return self.table_type in (None, "TABLE") and not self.has_streaming_buffer
+
+    @property
+    def version(self) -> str:
+        """Identifies this revision of the table; changes whenever BigQuery updates it."""
+        return f"{self.etag}|{self.modified}"
+
+    @property
+    def schema_version(self) -> str:
+        """Identifies the column layout (names, types, modes); unlike `version`, data changes keep it."""
+        return hashlib.sha256(repr(_column_layout(self.columns)).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_table(cls, table_id: str, table: bigquery.Table) -> "TableMetadata":
+        time_partitioning = getattr(table, "time_partitioning", None)
+        range_partitioning = getattr(table, "range_partitioning", None)
+        partitioning_type = None
+        partitioning_field = None
+        if isinstance(time_partitioning, bigquery.TimePartitioning):
+            partitioning_type = time_partitioning.type_
+            # Ingestion-time partitioned tables have no field; filter on _PARTITIONTIME instead
+            partitioning_field = time_partitioning.field or "_PARTITIONTIME"
+        elif isinstance(range_partitioning, bigquery.RangePartitioning):
+            partitioning_type = "RANGE"
+            partitioning_field = range_partitioning.field
+
+        modified = getattr(table, "modified", None)
+        return cls(
+            table_id=table_id,
+            columns=tuple(ColumnInfo.from_schema_field(f) for f in table.schema),
+            etag=_str_or_none(getattr(table, "etag", None)),
+            modified=modified.isoformat() if hasattr(modified, "isoformat") else _str_or_none(modified),
+            num_rows=_int_or_none(getattr(table, "num_rows", None)),
+            num_bytes=_int_or_none(getattr(table, "num_bytes", None)),
+            partitioning_type=partitioning_type,
+            partitioning_field=partitioning_field,
+            require_partition_filter=getattr(table, "require_partition_filter", None) is True,
+            clustering_fields=tuple(_list_or_empty(getattr(table, "clustering_fields", None))),
+            table_type=_str_or_none(getattr(table, "table_type", None)),
+            has_streaming_buffer=isinstance(getattr(table, "streaming_buffer", None), bigquery.table.StreamingBuffer),
+        )
+
+
+@dataclass
+class _Entry:
+    kind: str
+    scope: str
+    object_id: str
+    value: object
+    version: str
+    fetched_at: float
+
+
+def _column_layout(columns: Tuple[ColumnInfo, ...]) -> tuple:
+    return tuple((c.name, c.field_type, c.mode, _column_layout(c.fields)) for c in columns)
+
+
+def _str_or_none(value) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def _int_or_none(value) -> Optional[int]:
+    return value if isinstance(value, int) else None
+
+
+def _list_or_empty(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def _fetch(client: bigquery.Client, kind: str, object_id: str) -> Tuple[object, str]:
+    """Loads a metadata object from the BigQuery API and returns it with its version."""
+    if kind == TABLE:
+        metadata = TableMetadata.from_table(object_id, client.get_table(object_id))
+        return metadata, metadata.version
+    table_ids = sorted(table.table_id for table in client.list_tables(object_id))
+    return table_ids, ",".join(table_ids)
+
+
+class MetadataCache:
+    """Process-level TTL/LRU cache of table schemas and dataset table listings.
+
+    Entries are keyed by credential scope so users never see metadata fetched
+    with somebody else's permissions. When an entry is reloaded and its
+    version (table etag/modified time, or the set of table names) has changed,
+    registered listeners are notified so dependent caches can drop stale data.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str, str], None]] = []
+        self._refresher: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_table(self, scope: str, table_id: str, client_getter: Callable[[], bigquery.Client]) -> TableMetadata:
+        """Returns cached table metadata, loading it with a client from `client_getter` on a miss."""
+        return self._get(TABLE, scope, table_id, client_getter)
+
+    def list_tables(self, scope: str, dataset_id: str, client_getter: Callable[[], bigquery.Client]) -> List[str]:
+        """Returns the cached sorted table names of a dataset, loading them on a miss."""
+        return self._get(DATASET, scope, dataset_id, client_getter)
+
+    def reload(self, kind: str, scope: str, object_id: str, client: bigquery.Client):
+        """Fetches an object from BigQuery even if a fresh copy is cached, and caches it."""
+        value, version = _fetch(client, kind, object_id)
+        self._store(kind, scope, object_id, value, version)
+        return value
+
+    def peek_table(self, scope: str, table_id: str) -> Optional[TableMetadata]:
+        """Returns table metadata if it is cached and fresh, without ever calling BigQuery."""
+        return self._peek(TABLE, scope, table_id)
+
+    def peek_latest_table(self, table_id: str) -> Optional[TableMetadata]:
+        """Returns the most recently loaded fresh metadata of `table_id` in any scope, without calling BigQuery.
+
+        Only for scope-independent facts such as the schema; never show it to a user.
+        """
+        with self._lock:
+            entries = [
+                entry for key, entry in self._entries.items()
+                if key[0] == TABLE and key[2] == table_id and not self._is_expired(entry)
+            ]
+        return max(entries, key=lambda entry: entry.fetched_at).value if entries else None
+
+    def peek_dataset(self, scope: str, dataset_id: str) -> Optional[List[str]]:
+        """Returns a dataset's table names if they are cached and fresh, without calling BigQuery."""
+        return self._peek(DATASET, scope, dataset_id)
+
+    def invalidate(self, object_id: Optional[str] = None) -> None:
+        """Drops cached entries for `object_id` (in every scope), or everything when omitted."""
+        with self._lock:
+            for key in list(self._entries):
+                if object_id is None or key[2] == object_id:
+                    del self._entries[key]
+
+    def add_listener(self, listener: Callable[[str, str, str], None]) -> None:
+        """Registers `listener(kind, scope, object_id)`, called when a cached object changes."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def start_background_refresh(self, interval_seconds: float, client_lookup: Callable[[str], Optional[bigquery.Client]]) -> None:
+        """Starts a daemon thread that revalidates cached entries every `interval_seconds`.
+
+        `client_lookup(scope)` must return an existing client for the scope, or
+        None to skip it (for example when a user's token client has expired).
+        """
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop_refresh.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop,
+            args=(interval_seconds, client_lookup),
+            name="metadata-cache-refresher",
+            daemon=True,
+        )
+        self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop_refresh.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def refresh(self, client_lookup: Callable[[str], Optional[bigquery.Client]]) -> int:
+        """Reloads every cached entry that has a client available; returns how many changed."""
+        with self._lock:
+            entries = list(self._entries.values())
+        changed = 0
+        for entry in entries:
+            client = client_lookup(entry.scope)
+            if client is None:
+                continue
+            try:
+                value, version = _fetch(client, entry.kind, entry.object_id)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {entry.object_id}: {e}")
+                continue
+            if self._store(entry.kind, entry.scope, entry.object_id, value, version):
+                changed += 1
+        return changed
+
+    def _refresh_loop(self, interval_seconds: float, client_lookup) -> None:
+        while not self._stop_refresh.wait(interval_seconds):
+            changed = self.refresh(client_lookup)
+            if changed:
+                logger.info(f"Metadata refresh detected {changed} changed object(s)")
+
+    def _peek(self, kind: str, scope: str, object_id: str):
+        with self._lock:
+            entry = self._entries.get((kind, scope, object_id))
+            if entry is None or self._is_expired(entry):
+                return None
+            return entry.value
+
+    def _get(self, kind: str, scope: str, object_id: str, client_getter):
+        key = (kind, scope, object_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_expired(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+
+        value, version = _fetch(client_getter(), kind, object_id)
+        self._store(kind, scope, object_id, value, version)
+        return value
+
+    def _store(self, kind: str, scope: str, object_id: str, value, version: str) -> bool:
+        """Caches a freshly loaded value; returns True if it replaced a different version."""
+        key = (kind, scope, object_id)
+        with self._lock:
+            previous = self._entries.get(key)
+            changed = previous is not None and previous.version != version
+            if changed:
+                self.invalidations += 1
+            self._entries[key] = _Entry(kind, scope, object_id, value, version, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if changed:
+            logger.info(f"Cached {kind} {object_id} changed; invalidating dependents")
+            for listener in list(self._listeners):
+                try:
+                    listener(kind, scope, object_id)
+                except Exception as e:
+                    logger.warning(f"Metadata cache listener failed: {e}")
+        return changed
+
+    def _is_expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.fetched_at > self.ttl_seconds
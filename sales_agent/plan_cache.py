@@ -0,0 +1,414 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .sql_utils import extract_table_refs, qualify_table_id, tokenize
+except (ImportError, ValueError):
+    from sql_utils import extract_table_refs, qualify_table_id, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Tools whose successful calls are recorded as a plan and replayed on a hit
+PLANNED_TOOLS = ("execute_sql", "execute_sql_batch")
+
+# Words that may differ between two questions without changing what they ask.
+# Anything else (including negations, comparatives, "top"/"bottom", logical words
+# such as "and"/"or" and directions such as "from"/"to") must match, in order.
+FILLER_WORDS = frozenset("""
+    a an the of in on at for by with per me my our us we i you your it its this that these those
+    is are was were be been being do does did can could would will please show give tell list display find get
+    fetch remind what whats which who whom how there here again just also currently
+""".split())
+
+_QUESTION_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+_FAILURE_MARKERS = (
+    "error executing query", "query rejected by pre-flight", "query rejected before submission", "timed out",
+)
+
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@dataclass(frozen=True)
+class QuestionShape:
+    """A question reduced to what decides its SQL: content words and numbers, in order."""
+    content: Tuple[str, ...]
+    fillers: frozenset
+    numbers: Tuple[str, ...]
+
+    @classmethod
+    def parse(cls, question: str) -> "QuestionShape":
+        content, fillers, numbers = [], set(), []
+        for token in _QUESTION_TOKEN_RE.findall(question.lower().replace("'", "")):
+            if token[0].isdigit():
+                numbers.append(token)
+            elif token in FILLER_WORDS:
+                fillers.add(token)
+            else:
+                content.append(_stem(token))
+        return cls(tuple(content), frozenset(fillers), tuple(numbers))
+
+    @property
+    def signature(self) -> tuple:
+        return self.content, len(self.numbers)
+
+
+@dataclass
+class Plan:
+    """Tool calls that answered a question, with the question's numbers marked as parameters."""
+    question: str
+    shape: QuestionShape
+    calls: Tuple[Tuple[str, dict], ...]
+    parameters: Tuple[int, ...]
+    schemas: Dict[str, Optional[str]]
+    stored_at: float
+    context: str = ""
+    hits: int = 0
+
+    @property
+    def tables(self) -> Tuple[str, ...]:
+        return tuple(self.schemas)
+
+
+@dataclass
+class _Turn:
+    question: str
+    context: str = ""
+    replayed: Optional[tuple] = None
+    calls: List[Tuple[str, dict]] = field(default_factory=list)
+
+
+def _similarity(a: QuestionShape, b: QuestionShape) -> float:
+    """Jaccard similarity where content words weigh 1 and filler words 0.1."""
+    a_content, b_content = set(a.content), set(b.content)
+    shared = len(a_content & b_content) + 0.1 * len(a.fillers & b.fillers)
+    total = len(a_content | b_content) + 0.1 * len(a.fillers | b.fillers)
+    return shared / total if total else 1.0
+
+
+def _call_sql(name: str, args: dict) -> List[str]:
+    if name == "execute_sql":
+        return [args.get("sql", "")]
+    return list(args.get("queries") or [])
+
+
+def _map_call_sql(name: str, args: dict, transform: Callable[[str], str]) -> dict:
+    if name == "execute_sql":
+        return {**args, "sql": transform(args.get("sql", ""))}
+    return {**args, "queries": [transform(sql) for sql in args.get("queries") or []]}
+
+
+def _number_pattern(values) -> re.Pattern:
+    alternatives = "|".join(re.escape(v) for v in sorted(values, key=len, reverse=True))
+    return re.compile(rf"(?<![\w.])(?:{alternatives})(?![\w.])")
+
+
+def sql_mentions_number(sql: str, value: str) -> bool:
+    """True if `value` appears in `sql` as a numeric literal or inside a string literal (e.g. a date)."""
+    pattern = _number_pattern([value])
+    return any(
+        (kind == "number" and text == value) or (kind == "string" and pattern.search(text))
+        for kind, text in tokenize(sql)
+    )
+
+
+def bind_numbers(sql: str, replacements: Dict[str, str]) -> str:
+    """Replaces numeric literals (and numbers inside string literals) of `sql` in a single pass."""
+    if not replacements:
+        return sql
+    pattern = _number_pattern(replacements)
+    parts = []
+    for kind, text in tokenize(sql):
+        if kind == "number":
+            text = replacements.get(text, text)
+        elif kind == "string":
+            text = pattern.sub(lambda m: replacements[m.group()], text)
+        parts.append(text)
+    return "".join(parts)
+
+
+def is_failed_response(tool_response) -> bool:
+    """True if an execute_sql/execute_sql_batch response reports an error or rejection."""
+    text = str(tool_response).lower()
+    return any(marker in text for marker in _FAILURE_MARKERS)
+
+
+class PlanCache:
+    """Question -> SQL plans learned from completed turns, replayed without LLM planning.
+
+    After-tool/after-agent callbacks record the successful `execute_sql` (and
+    `execute_sql_batch`) calls of a turn under its question. Numbers in the
+    question that also appear in the SQL (limits, years in date literals)
+    become parameters. When a later question has the same content words in the
+    same order and number count, only filler words differ enough to stay above
+    `min_similarity`, and follows the same earlier questions in its session
+    (so a follow-up such as "what about Asia?" only matches after the same
+    conversation), the before-model callback skips the planning round trips
+    and answers the first model call with the recorded tool calls, bound to the
+    new numbers; the model only writes the final answer.
+
+    Plans are LRU-bounded with a TTL, dropped when a referenced table's schema
+    changes (`check_schema`), and dropped when a replay fails.
+    """
+
+    def __init__(
+        self,
+        default_project: str,
+        max_entries: int = 500,
+        ttl_seconds: float = 86400,
+        min_similarity: float = 0.8,
+        schema_lookup: Optional[Callable[[str], Optional[str]]] = None,
+        max_pending_turns: int = 1000,
+    ):
+        self.default_project = default_project
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        self.schema_lookup = schema_lookup or (lambda table_id: None)
+        self.max_pending_turns = max_pending_turns
+        self._plans: "OrderedDict[tuple, Plan]" = OrderedDict()
+        # The index: (conversation context, question signature) -> plan keys
+        self._index: Dict[tuple, set] = defaultdict(set)
+        self._turns: "OrderedDict[str, _Turn]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    # --- Lookup and recording ---
+
+    def lookup(self, question: str, context: str = "") -> Optional[Tuple[tuple, List[Tuple[str, dict]]]]:
+        """Returns (plan key, tool calls bound to this question's numbers) for a confident match.
+
+        `context` identifies the earlier turns of the conversation (see
+        `conversation_context`); plans only match questions asked after the same ones.
+        """
+        shape = QuestionShape.parse(question)
+        with self._lock:
+            self._counters["lookups"] += 1
+            best, best_score = None, 0.0
+            for key in list(self._index.get((context, shape.signature), ())):
+                plan = self._plans[key]
+                if time.time() - plan.stored_at > self.ttl_seconds:
+                    self._remove(key, "expired")
+                    continue
+                if not self._schemas_current(plan):
+                    self._remove(key, "invalidations")
+                    continue
+                if not all(plan.shape.numbers[i] == shape.numbers[i]
+                           for i in range(len(shape.numbers)) if i not in plan.parameters):
+                    continue
+                score = _similarity(shape, plan.shape)
+                if score > best_score:
+                    best, best_score = key, score
+            if best is None or best_score < self.min_similarity:
+                self._counters["misses"] += 1
+                if best is not None:
+                    self._counters["below_threshold"] += 1
+                return None
+            plan = self._plans[best]
+            plan.hits += 1
+            self._plans.move_to_end(best)
+            self._counters["hits"] += 1
+
+        replacements = {plan.shape.numbers[i]: shape.numbers[i] for i in plan.parameters
+                        if plan.shape.numbers[i] != shape.numbers[i]}
+        calls = [(name, _map_call_sql(name, args, lambda sql: bind_numbers(sql, replacements)))
+                 for name, args in plan.calls]
+        return best, calls
+
+    def record(self, question: str, calls: List[Tuple[str, dict]], context: str = "") -> Optional[Plan]:
+        """Stores the tool calls that answered `question`; returns the plan, or None if unusable."""
+        shape = QuestionShape.parse(question)
+        if not calls or not shape.content:
+            return None
+        statements = [sql for name, args in calls for sql in _call_sql(name, args)]
+        schemas = {}
+        for sql in statements:
+            for ref in extract_table_refs(sql):
+                table_id = qualify_table_id(ref, self.default_project)
+                if table_id is None:
+                    # Wildcards and INFORMATION_SCHEMA cannot be checked for schema changes
+                    return None
+                schemas.setdefault(table_id, self.schema_lookup(table_id))
+        if not schemas:
+            return None
+
+        # A question number repeated in the question is ambiguous, so only unique ones become parameters
+        parameters = tuple(
+            i for i, value in enumerate(shape.numbers)
+            if shape.numbers.count(value) == 1 and any(sql_mentions_number(sql, value) for sql in statements)
+        )
+        key = (context, shape.signature,
+               tuple(v if i not in parameters else None for i, v in enumerate(shape.numbers)), shape.fillers)
+        plan = Plan(question, shape, tuple(calls), parameters, schemas, time.time(), context)
+        with self._lock:
+            if key in self._plans:
+                self._remove(key, None)
+            self._plans[key] = plan
+            self._index[(context, shape.signature)].add(key)
+            self._counters["recorded"] += 1
+            while len(self._plans) > self.max_entries:
+                self._remove(next(iter(self._plans)), "evictions")
+        return plan
+
+    def check_schema(self, table_id: str, fingerprint: Optional[str]) -> int:
+        """Drops plans that were recorded against a different schema of `table_id`."""
+        if fingerprint is None:
+            return 0
+        with self._lock:
+            stale = [key for key, plan in self._plans.items()
+                     if plan.schemas.get(table_id) not in (None, fingerprint)]
+            for key in stale:
+                self._remove(key, "invalidations")
+        if stale:
+            logger.info(f"Schema of {table_id} changed; dropped {len(stale)} cached plan(s)")
+        return len(stale)
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            if key in self._plans:
+                self._remove(key, "invalidations")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._plans)
+        lookups = counters.get("lookups", 0)
+        return {
+            "entries": entries,
+            "lookups": lookups,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "hit_rate": counters.get("hits", 0) / lookups if lookups else 0.0,
+            "below_threshold": counters.get("below_threshold", 0),
+            "recorded": counters.get("recorded", 0),
+            "replay_failures": counters.get("replay_failures", 0),
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+            "invalidations": counters.get("invalidations", 0),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._index.clear()
+            self._turns.clear()
+            self._counters.clear()
+
+    # --- ADK callbacks ---
+
+    def callbacks(self) -> dict:
+        """Returns the agent callback kwargs that record and replay plans."""
+        return {
+            "before_model_callback": self.before_model,
+            "after_tool_callback": self.after_tool,
+            "after_agent_callback": self.after_agent,
+        }
+
+    def before_model(self, callback_context, llm_request):
+        invocation_id = callback_context.invocation_id
+        question = _latest_user_text(llm_request)
+        if question is None or invocation_id in self._turns:
+            # Not the first model call of the turn; the model is already planning or answering
+            return None
+        turn = _Turn(question, conversation_context(llm_request))
+        self._track(invocation_id, turn)
+        hit = self.lookup(question, turn.context)
+        if hit is None:
+            return None
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        turn.replayed, calls = hit
+        logger.info(f"Plan cache hit for question: {question!r}")
+        return LlmResponse(content=types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls
+        ]))
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        name = getattr(tool, "name", None)
+        turn = self._turns.get(tool_context.invocation_id)
+        if turn is None or name not in PLANNED_TOOLS:
+            return None
+        if not is_failed_response(tool_response):
+            turn.calls.append((name, dict(args)))
+        elif turn.replayed is not None and turn.replayed in self._plans:
+            logger.info("Replayed plan failed; dropping it so the model plans again")
+            self.invalidate(turn.replayed)
+            with self._lock:
+                self._counters["replay_failures"] += 1
+        return None
+
+    def after_agent(self, callback_context):
+        with self._lock:
+            turn = self._turns.pop(callback_context.invocation_id, None)
+        if turn is not None and turn.replayed is None and turn.calls:
+            self.record(turn.question, turn.calls, turn.context)
+        return None
+
+    def _track(self, invocation_id: str, turn: _Turn) -> None:
+        with self._lock:
+            self._turns[invocation_id] = turn
+            while len(self._turns) > self.max_pending_turns:
+                self._turns.popitem(last=False)
+
+    # --- Internals (callers hold the lock) ---
+
+    def _schemas_current(self, plan: Plan) -> bool:
+        for table_id, recorded in plan.schemas.items():
+            current = self.schema_lookup(table_id)
+            if current is None:
+                continue
+            if recorded is None:
+                plan.schemas[table_id] = current
+            elif recorded != current:
+                return False
+        return True
+
+    def _remove(self, key: tuple, counter: Optional[str]) -> None:
+        plan = self._plans.pop(key)
+        index_key = (plan.context, plan.shape.signature)
+        keys = self._index.get(index_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._index[index_key]
+        if counter:
+            self._counters[counter] += 1
+
+
+def _latest_user_text(llm_request) -> Optional[str]:
+    """The user's question if the request ends with it (i.e. no tool calls yet this turn)."""
+    contents = getattr(llm_request, "contents", None) or []
+    if not contents or contents[-1].role != "user":
+        return None
+    parts = contents[-1].parts or []
+    if any(part.function_response is not None for part in parts):
+        return None
+    text = " ".join(part.text for part in parts if part.text).strip()
+    return text or None
+
+
+def conversation_context(llm_request) -> str:
+    """A digest of the user's earlier questions in the request, or "" for the first turn of a session.
+
+    The SQL that answers a follow-up depends on what was asked before it, so
+    plans are keyed by this as well as by the question.
+    """
+    contents = (getattr(llm_request, "contents", None) or [])[:-1]
+    questions = [
+        " ".join(" ".join(part.text.lower().split()) for part in content.parts or [] if part.text)
+        for content in contents if content.role == "user"
+    ]
+    questions = [question for question in questions if question]
+    if not questions:
+        return ""
+    return hashlib.sha256("\n".join(questions).encode()).hexdigest()[:16]
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+
+try:
+    from .client_pool import ADC_SCOPE
+    from .metadata_cache import DATASET, TABLE, ColumnInfo, MetadataCache, TableMetadata
+except (ImportError, ValueError):
+    from client_pool import ADC_SCOPE
+    from metadata_cache import DATASET, TABLE, ColumnInfo, MetadataCache, TableMetadata
+
+logger = logging.getLogger(__name__)
+
+
+def _describe_column(column: ColumnInfo, indent: str = "- ") -> List[str]:
+    mode = "" if column.mode == "NULLABLE" else f" {column.mode}"
+    description = f" — {column.description}" if column.description else ""
+    lines = [f"{indent}{column.name}: {column.field_type}{mode}{description}"]
+    for child in column.fields:
+        lines.extend(_describe_column(child, indent="  " + indent))
+    return lines
+
+
+def render_schema_context(table: Optional[TableMetadata], dataset_id: str, table_ids: Optional[List[str]]) -> str:
+    """Renders prefetched metadata as compact instruction text."""
+    lines = []
+    if table is not None:
+        details = []
+        if table.num_rows is not None:
+            details.append(f"~{table.num_rows:,} rows")
+        if table.partitioning_field:
+            details.append(f"partitioned by {table.partitioning_type or 'DAY'} on `{table.partitioning_field}`")
+        if table.clustering_fields:
+            details.append(f"clustered by {', '.join(table.clustering_fields)}")
+        suffix = f" ({'; '.join(details)})" if details else ""
+        lines.append(f"Table `{table.table_id}`{suffix}:")
+        for column in table.columns:
+            lines.extend(_describe_column(column))
+    if table_ids:
+        lines.append(f"Tables in `{dataset_id}`: {', '.join(table_ids)}")
+    return "\n".join(lines)
+
+
+class SchemaPrefetcher:
+    """Keeps the default dataset's table list and default table's schema ready for the instruction.
+
+    Metadata is loaded once at startup with ADC and kept current in two ways:
+    a background reload once `refresh_interval_seconds` have passed, and a
+    metadata cache listener that picks up changes detected by any other lookup.
+    """
+
+    def __init__(self, metadata_cache: MetadataCache, client_getter, table_id: str, refresh_interval_seconds: float = 900):
+        self.metadata_cache = metadata_cache
+        self.client_getter = client_getter
+        self.table_id = table_id
+        self.dataset_id = table_id.rsplit(".", 1)[0]
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.table: Optional[TableMetadata] = None
+        self.table_ids: Optional[List[str]] = None
+        self.fetched_at: Optional[float] = None
+        self._refreshing = threading.Lock()
+        metadata_cache.add_listener(self._on_change)
+
+    @property
+    def prefetched_table_ids(self) -> List[str]:
+        return [self.table_id] if self.table is not None else []
+
+    def prefetch(self) -> None:
+        """Loads the table list and schema from BigQuery, bypassing any cached copy."""
+        client = self.client_getter()
+        self.table_ids = self.metadata_cache.reload(DATASET, ADC_SCOPE, self.dataset_id, client)
+        self.table = self.metadata_cache.reload(TABLE, ADC_SCOPE, self.table_id, client)
+        self.fetched_at = time.monotonic()
+        logger.info(f"Prefetched schema for {self.table_id} ({len(self.table.columns)} columns)")
+
+    def context(self) -> str:
+        """Returns the rendered metadata, scheduling a background reload if it is due."""
+        if self.fetched_at is not None and time.monotonic() - self.fetched_at > self.refresh_interval_seconds:
+            self._refresh_in_background()
+        return render_schema_context(self.table, self.dataset_id, self.table_ids)
+
+    def _refresh_in_background(self) -> None:
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.prefetch()
+            except Exception as e:
+                logger.warning(f"Schema prefetch refresh failed: {e}")
+                # Back off for another interval rather than retrying on every turn
+                self.fetched_at = time.monotonic()
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="schema-prefetch-refresh", daemon=True).start()
+
+    def _on_change(self, kind: str, scope: str, object_id: str) -> None:
+        if scope != ADC_SCOPE:
+            return
+        if kind == TABLE and object_id == self.table_id:
+            self.table = self.metadata_cache.peek_table(scope, object_id) or self.table
+        elif kind == DATASET and object_id == self.dataset_id:
+            self.table_ids = self.metadata_cache.peek_dataset(scope, object_id) or self.table_ids
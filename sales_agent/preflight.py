@@ -0,0 +1,217 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from google.cloud import bigquery
+
+try:
+    from .metadata_cache import TableMetadata
+    from .sql_utils import normalize_sql, strip_literals
+except (ImportError, ValueError):
+    from metadata_cache import TableMetadata
+    from sql_utils import normalize_sql, strip_literals
+
+logger = logging.getLogger(__name__)
+
+# `SELECT *`, `SELECT DISTINCT *`, `t.*` and `, *` read every column (COUNT(*) reads none)
+_SELECT_STAR_RE = re.compile(r"(?:\bselect\s+(?:distinct\s+)?|,\s*|\.)\*", re.I)
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+
+
+def format_bytes(num_bytes: Optional[int]) -> str:
+    """Formats a byte count for people and models in 1024-based units, e.g. `2.1 GiB`."""
+    if not isinstance(num_bytes, int):
+        return "an unknown amount of data"
+    size = float(num_bytes)
+    units = ("B", "KiB", "MiB", "GiB", "TiB", "PiB")
+    for unit in units:
+        if size < 1024 or unit == units[-1]:
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+@dataclass(frozen=True)
+class PreflightVerdict:
+    """Outcome of a dry run: whether the query may run, and if not, what to change."""
+    allowed: bool
+    estimated_bytes: Optional[int] = None
+    reason: Optional[str] = None
+    suggestion: Optional[str] = None
+    referenced_tables: Tuple[str, ...] = ()
+
+    def to_message(self) -> str:
+        message = (
+            f"Query rejected by pre-flight check: {self.reason} "
+            f"(estimated {format_bytes(self.estimated_bytes)} scanned)."
+        )
+        if self.suggestion:
+            message += f" Suggestion: {self.suggestion}"
+        return message
+
+
+def referenced_columns(sql: str, metadata: TableMetadata) -> Tuple[str, ...]:
+    """Columns of `metadata`'s table that `sql` may read: every column for SELECT *, else the ones it names."""
+    text = strip_literals(sql)
+    names = tuple(column.name for column in metadata.columns)
+    if _SELECT_STAR_RE.search(text):
+        return names
+    words = {word.lower() for word in _IDENTIFIER_RE.findall(text)}
+    return tuple(name for name in names if name.lower() in words)
+
+
+class QueryPreflight:
+    """Dry-runs queries before execution and rejects ones that would scan too much.
+
+    A query over a partitioned table is judged by bytes, not by its text: a
+    second dry run reads the same columns of the referenced tables without any
+    filter, and if the query's estimate is no lower, no partition was pruned
+    (whatever the WHERE clause says, e.g. `order_date IS NOT NULL`).
+
+    Verdicts are cached per (credential scope, normalized SQL) for `cache_ttl_seconds`
+    so repeated questions do not pay for another dry run.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_scan_bytes: int = 0,
+        maximum_bytes_billed: int = 0,
+        require_partition_filter: bool = True,
+        partition_scan_min_bytes: int = 0,
+        cache_ttl_seconds: float = 300,
+        cache_size: int = 256,
+    ):
+        self.enabled = enabled
+        self.max_scan_bytes = max_scan_bytes
+        self.maximum_bytes_billed = maximum_bytes_billed
+        self.require_partition_filter = require_partition_filter
+        self.partition_scan_min_bytes = partition_scan_min_bytes
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_size = max(1, cache_size)
+        self._verdicts: "OrderedDict[Tuple[str, str], Tuple[float, PreflightVerdict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.dry_runs = 0
+        self.cache_hits = 0
+        self.rejections = 0
+
+    def job_config(self) -> Optional[bigquery.QueryJobConfig]:
+        """Returns the config for the real query job, enforcing `maximum_bytes_billed` if set."""
+        if self.maximum_bytes_billed and self.maximum_bytes_billed > 0:
+            return bigquery.QueryJobConfig(maximum_bytes_billed=self.maximum_bytes_billed)
+        return None
+
+    def check(
+        self,
+        client: bigquery.Client,
+        sql: str,
+        scope: str,
+        table_metadata: Callable[[str], Optional[TableMetadata]],
+    ) -> PreflightVerdict:
+        """Dry-runs `sql` and returns a verdict; dry-run errors (e.g. invalid SQL) propagate.
+
+        `table_metadata(table_id)` supplies partitioning and columns of the referenced tables.
+        """
+        if not self.enabled:
+            return PreflightVerdict(allowed=True)
+        key = (scope, normalize_sql(sql))
+        with self._lock:
+            cached = self._verdicts.get(key)
+            if cached is not None and time.monotonic() - cached[0] <= self.cache_ttl_seconds:
+                self._verdicts.move_to_end(key)
+                self.cache_hits += 1
+                return cached[1]
+
+        job = self._dry_run(client, sql)
+        verdict = self._evaluate(client, sql, job, table_metadata)
+
+        with self._lock:
+            if not verdict.allowed:
+                self.rejections += 1
+            self._verdicts[key] = (time.monotonic(), verdict)
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+        logger.info(f"Pre-flight estimate: {format_bytes(verdict.estimated_bytes)} (allowed={verdict.allowed})")
+        return verdict
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dry_runs": self.dry_runs,
+                "cache_hits": self.cache_hits,
+                "rejections": self.rejections,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verdicts.clear()
+            self.dry_runs = self.cache_hits = self.rejections = 0
+
+    def _dry_run(self, client: bigquery.Client, sql: str):
+        job = client.query(sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+        with self._lock:
+            self.dry_runs += 1
+        return job
+
+    def _unfiltered_bytes(self, client: bigquery.Client, sql: str, referenced: Tuple[str, ...],
+                          table_metadata) -> Optional[int]:
+        """Bytes `sql` would scan with no filter at all: one dry run per table of the columns it reads.
+
+        None when a referenced table's schema is unknown, so nothing can be compared.
+        """
+        total = 0
+        for table_id in referenced:
+            metadata = table_metadata(table_id)
+            if metadata is None or not metadata.columns:
+                return None
+            columns = referenced_columns(sql, metadata)
+            if not columns:
+                continue
+            select = ", ".join(f"`{name}`" for name in columns)
+            scanned = self._dry_run(client, f"SELECT {select} FROM `{table_id}`").total_bytes_processed
+            if not isinstance(scanned, int):
+                return None
+            total += scanned
+        return total
+
+    def _evaluate(self, client: bigquery.Client, sql: str, job, table_metadata) -> PreflightVerdict:
+        estimated = job.total_bytes_processed
+        estimated = estimated if isinstance(estimated, int) else None
+        referenced = tuple(
+            f"{ref.project}.{ref.dataset_id}.{ref.table_id}"
+            for ref in (job.referenced_tables or [])
+        )
+
+        if estimated is not None and self.max_scan_bytes and estimated > self.max_scan_bytes:
+            return PreflightVerdict(
+                allowed=False,
+                estimated_bytes=estimated,
+                reason=f"the query would scan more than the {format_bytes(self.max_scan_bytes)} limit",
+                suggestion="select only the columns you need, add a date range filter, or aggregate over a smaller slice of data.",
+                referenced_tables=referenced,
+            )
+
+        if self.require_partition_filter and estimated is not None and estimated >= self.partition_scan_min_bytes:
+            partitioned = [
+                (table_id, metadata) for table_id, metadata in ((t, table_metadata(t)) for t in referenced)
+                if metadata is not None and metadata.partitioning_field
+            ]
+            unfiltered = self._unfiltered_bytes(client, sql, referenced, table_metadata) if partitioned else None
+            if unfiltered is not None and estimated >= unfiltered:
+                table_id, metadata = partitioned[0]
+                field = metadata.partitioning_field
+                return PreflightVerdict(
+                    allowed=False,
+                    estimated_bytes=estimated,
+                    reason=f"it scans every partition of `{table_id}`, which is partitioned on `{field}`",
+                    suggestion=(f"add a filter that limits `{field}` to a range (for example a date range) to the "
+                                f"WHERE clause; conditions such as `{field} IS NOT NULL` do not prune partitions."),
+                    referenced_tables=referenced,
+                )
+
+        return PreflightVerdict(allowed=True, estimated_bytes=estimated, referenced_tables=referenced)
@@ -0,0 +1,420 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency: `uv sync --extra replica`
+    duckdb = None
+
+try:
+    from .client_pool import ADC_SCOPE
+    from .metadata_cache import TableMetadata
+    from .sql_utils import extract_table_refs, is_deterministic, is_read_only, qualify_table_id, tokenize
+except (ImportError, ValueError):
+    from client_pool import ADC_SCOPE
+    from metadata_cache import TableMetadata
+    from sql_utils import extract_table_refs, is_deterministic, is_read_only, qualify_table_id, tokenize
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+BIGQUERY = "bigquery"
+
+# Result handles of replica results look like `replica:local.<id>` (see tools.make_result_handle)
+REPLICA_HANDLE_PROJECT = "replica"
+REPLICA_HANDLE_LOCATION = "local"
+
+# Functions (and keywords that may precede a parenthesis) that DuckDB evaluates exactly like BigQuery,
+# including NULL arguments. Anything else goes to BigQuery: e.g. CONCAT skips NULLs in DuckDB, SUBSTR
+# treats position 0 differently and EXTRACT(DAYOFWEEK) numbers Sunday 0 instead of 1.
+_REPLICA_FUNCTIONS = frozenset({
+    "abs", "avg", "coalesce", "count", "dense_rank", "if", "ifnull", "lag", "lead", "length", "lower", "max",
+    "min", "nullif", "rank", "round", "row_number", "sum", "upper",
+})
+_REPLICA_KEYWORDS = frozenset({
+    "all", "and", "as", "between", "by", "distinct", "else", "exists", "from", "having", "in", "join", "like",
+    "not", "on", "or", "over", "qualify", "select", "then", "union", "using", "when", "where",
+})
+_REPLICA_EXTRACT_PARTS = frozenset({"year", "quarter", "month", "day"})
+# No `/` (BigQuery raises on division by zero, DuckDB returns NULL), `||`, `%`, `[]` or bitwise operators
+_REPLICA_OPERATORS = frozenset("(),.*+-=<>!;")
+
+_MANIFEST = "manifest.json"
+
+
+@dataclass
+class ReplicaManifest:
+    """Describes the Parquet snapshot currently on disk for one table."""
+    table_id: str
+    generation: str
+    parts: List[str] = field(default_factory=list)
+    modified: Optional[str] = None
+    etag: Optional[str] = None
+    num_rows: int = 0
+    watermark: Optional[str] = None
+    synced_at: float = 0.0
+
+
+@dataclass
+class ReplicaResult:
+    """Rows served from the replica, kept so further pages can be read without re-running the query."""
+    result_id: str
+    table: pa.Table
+    as_of: Optional[str]
+
+    @property
+    def handle(self) -> str:
+        return f"{REPLICA_HANDLE_PROJECT}:{REPLICA_HANDLE_LOCATION}.{self.result_id}"
+
+    def rows(self, start_row: int, max_rows: int) -> list:
+        return self.table.slice(start_row, max_rows).to_pylist()
+
+
+class TableReplica:
+    """A local Parquet snapshot of one BigQuery table, queried with DuckDB.
+
+    `sync()` downloads the table when its modification time changed since the
+    last snapshot. With `incremental_column` set (a column that only grows, such
+    as an ingestion timestamp or an increasing id), later syncs append just the
+    rows above the last seen value; a full snapshot is taken again if the table
+    shrank, since deletes and updates cannot be seen incrementally.
+    """
+
+    def __init__(
+        self,
+        table_id: str,
+        directory: str,
+        client_getter: Callable[[], bigquery.Client],
+        incremental_column: Optional[str] = None,
+        max_bytes: int = 0,
+    ):
+        if duckdb is None:
+            raise ImportError("The local replica needs duckdb; install it with `uv sync --extra replica`.")
+        self.table_id = table_id
+        self.directory = os.path.join(os.path.expanduser(directory), table_id)
+        self.client_getter = client_getter
+        self.incremental_column = incremental_column
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._connection = duckdb.connect()
+        # BigQuery sorts NULLs first on ASC and last on DESC; DuckDB defaults to NULLS LAST for both
+        self._connection.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        # BigQuery evaluates TIMESTAMP parts (EXTRACT) in UTC
+        self._connection.execute("SET TimeZone = 'UTC'")
+        self.manifest = self._load_manifest()
+
+    @property
+    def ready(self) -> bool:
+        return self.manifest is not None and bool(self.manifest.parts)
+
+    def is_fresh(self, metadata: Optional[TableMetadata]) -> bool:
+        """True if the snapshot matches the table's current modification time."""
+        manifest = self.manifest
+        return manifest is not None and metadata is not None and metadata.modified == manifest.modified
+
+    def sync(self, force: bool = False) -> bool:
+        """Brings the snapshot up to date; returns True if anything was downloaded."""
+        with self._sync_lock:
+            client = self.client_getter()
+            table = client.get_table(self.table_id)
+            metadata = TableMetadata.from_table(self.table_id, table)
+            manifest = self.manifest
+            if not force and manifest is not None and manifest.modified == metadata.modified:
+                return False
+            if self.max_bytes and (metadata.num_bytes or 0) > self.max_bytes:
+                logger.warning(f"Not replicating {self.table_id}: {metadata.num_bytes} bytes exceeds the replica limit")
+                return False
+
+            incremental = (
+                not force and manifest is not None and self.incremental_column
+                and manifest.watermark is not None and (metadata.num_rows or 0) >= manifest.num_rows
+            )
+            start = time.perf_counter()
+            if incremental:
+                new_manifest = self._append_increment(client, manifest, metadata)
+            else:
+                new_manifest = self._full_snapshot(client, metadata)
+            self._write_manifest(new_manifest)
+            previous = self.manifest
+            with self._lock:
+                self.manifest = new_manifest
+            if previous is not None and previous.generation != new_manifest.generation:
+                shutil.rmtree(os.path.join(self.directory, previous.generation), ignore_errors=True)
+            logger.info(
+                f"Replica of {self.table_id} synced ({'incremental' if incremental else 'full'}, "
+                f"{new_manifest.num_rows} rows) in {time.perf_counter() - start:.2f}s"
+            )
+            return True
+
+    def query(self, sql: str) -> pa.Table:
+        """Runs BigQuery-dialect `sql`, which may only reference this table, against the snapshot."""
+        manifest = self.manifest
+        files = [os.path.join(self.directory, manifest.generation, part) for part in manifest.parts]
+        source = "read_parquet([" + ", ".join("'" + f.replace("'", "''") + "'" for f in files) + "])"
+        cursor = self._connection.cursor()
+        try:
+            result = cursor.execute(translate_sql(sql, self.table_id, source))
+            to_arrow = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+            return to_arrow()
+        finally:
+            cursor.close()
+
+    def _full_snapshot(self, client: bigquery.Client, metadata: TableMetadata) -> ReplicaManifest:
+        generation = f"gen-{uuid.uuid4().hex[:12]}"
+        arrow_table = client.list_rows(self.table_id).to_arrow()
+        manifest = ReplicaManifest(
+            table_id=self.table_id, generation=generation, modified=metadata.modified, etag=metadata.etag,
+        )
+        return self._add_part(manifest, arrow_table)
+
+    def _append_increment(self, client: bigquery.Client, manifest: ReplicaManifest, metadata: TableMetadata) -> ReplicaManifest:
+        column = self.incremental_column
+        field_type = next((c.field_type for c in metadata.columns if c.name == column), "STRING")
+        watermark = manifest.watermark
+        if field_type in ("INT64", "INTEGER"):
+            watermark = int(watermark)
+        elif field_type in ("FLOAT64", "FLOAT", "NUMERIC", "BIGNUMERIC"):
+            watermark = float(watermark)
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("watermark", field_type, watermark)]
+        )
+        sql = f"SELECT * FROM `{self.table_id}` WHERE `{column}` > @watermark"
+        arrow_table = client.query(sql, job_config=job_config).to_arrow()
+        updated = ReplicaManifest(**{**asdict(manifest), "modified": metadata.modified, "etag": metadata.etag})
+        return self._add_part(updated, arrow_table)
+
+    def _add_part(self, manifest: ReplicaManifest, arrow_table: pa.Table) -> ReplicaManifest:
+        directory = os.path.join(self.directory, manifest.generation)
+        os.makedirs(directory, exist_ok=True)
+        if arrow_table.num_rows or not manifest.parts:
+            part = f"part-{len(manifest.parts):05d}.parquet"
+            pq.write_table(arrow_table, os.path.join(directory, part))
+            manifest.parts.append(part)
+        manifest.num_rows += arrow_table.num_rows
+        if self.incremental_column and arrow_table.num_rows:
+            # Increments only contain rows above the previous watermark, so this is the new maximum
+            latest = pc.max(arrow_table.column(self.incremental_column)).as_py()
+            if latest is not None:
+                manifest.watermark = latest.isoformat() if hasattr(latest, "isoformat") else str(latest)
+        manifest.synced_at = time.time()
+        return manifest
+
+    def _load_manifest(self) -> Optional[ReplicaManifest]:
+        try:
+            with open(os.path.join(self.directory, _MANIFEST)) as f:
+                manifest = ReplicaManifest(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if not all(os.path.exists(os.path.join(self.directory, manifest.generation, p)) for p in manifest.parts):
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest: ReplicaManifest) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f"{_MANIFEST}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(manifest), f)
+        os.replace(tmp_path, os.path.join(self.directory, _MANIFEST))
+
+
+def translate_sql(sql: str, table_id: str, source: str) -> str:
+    """Rewrites BigQuery SQL for DuckDB: references to `table_id` become `source`, backticks become double quotes."""
+    project = table_id.split(".", 1)[0]
+    tokens = tokenize(sql)
+    out = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind in ("word", "quoted"):
+            # Collect a dotted path such as `p.d.t`, p.d.t or `p`.`d`.`t`
+            j, parts = i, []
+            while j < len(tokens) and tokens[j][0] in ("word", "quoted"):
+                parts.append(tokens[j][1].strip("`"))
+                if j + 2 < len(tokens) and tokens[j + 1][1] == "." and tokens[j + 2][0] in ("word", "quoted"):
+                    j += 2
+                else:
+                    break
+            if qualify_table_id(".".join(parts), project) == table_id:
+                out.append(source)
+                i = j + 1
+                continue
+            if kind == "quoted":
+                text = '"' + text.strip("`").replace('"', '""') + '"'
+        out.append(text)
+        i += 1
+    return "".join(out).rstrip().rstrip(";")
+
+
+def replica_compatible(sql: str) -> bool:
+    """True if `sql` only uses functions, operators and literals DuckDB evaluates the same way as BigQuery."""
+    tokens = [token for token in tokenize(sql) if token[0] not in ("space", "comment")]
+    for i, (kind, text) in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else (None, "")
+        if kind == "other" and text not in _REPLICA_OPERATORS:
+            return False
+        if kind == "string" and (not text.startswith("'") or text.startswith("'''") or "\\" in text):
+            # Double quotes are identifiers in DuckDB, and it does not read backslash escapes
+            return False
+        if kind != "word":
+            continue
+        name = text.lower()
+        if name == "interval" or (following[0] == "string" and name != "date"):
+            # Typed literals other than DATE, and interval arithmetic, produce different types
+            return False
+        if following[1] != "(":
+            continue
+        if i > 0 and tokens[i - 1][1] == ".":
+            # SAFE., ML., NET. and other function namespaces
+            return False
+        if name == "extract":
+            part = tokens[i + 2][1].lower() if i + 2 < len(tokens) else ""
+            if part not in _REPLICA_EXTRACT_PARTS:
+                return False
+        elif name not in _REPLICA_FUNCTIONS and name not in _REPLICA_KEYWORDS:
+            return False
+    return True
+
+
+@dataclass
+class RoutingDecision:
+    engine: str
+    reason: str
+    sql: str
+    elapsed_ms: float = 0.0
+
+
+class ReplicaRouter:
+    """Decides per query whether the local replica or BigQuery serves it, and keeps a routing report.
+
+    A query goes to the replica only if it is a deterministic, read-only query
+    over the replicated table alone, uses only constructs both engines evaluate
+    the same way (see `replica_compatible`), comes from
+    the service credentials (ADC) unless `allow_user_credentials` is set, and the
+    snapshot matches the table's current modification time. Anything DuckDB
+    fails to run falls back to BigQuery.
+    """
+
+    handle_project = REPLICA_HANDLE_PROJECT
+
+    def __init__(
+        self,
+        replica: TableReplica,
+        default_project: str,
+        allow_user_credentials: bool = False,
+        max_results: int = 64,
+        history_size: int = 200,
+    ):
+        self.replica = replica
+        self.default_project = default_project
+        self.allow_user_credentials = allow_user_credentials
+        self.max_results = max_results
+        self._results: "OrderedDict[str, ReplicaResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._reasons: Counter = Counter()
+        self._history: deque = deque(maxlen=history_size)
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def route(self, sql: str, scope: str, table_metadata: Callable[[str], Optional[TableMetadata]]) -> str:
+        """Returns the reason the query must go to BigQuery, or None if the replica can serve it."""
+        if not self.replica.ready:
+            return "not_synced"
+        if scope != ADC_SCOPE and not self.allow_user_credentials:
+            return "user_credentials"
+        if not is_read_only(sql):
+            return "not_read_only"
+        if not is_deterministic(sql):
+            return "non_deterministic"
+        refs = extract_table_refs(sql)
+        if not refs or any(qualify_table_id(ref, self.default_project) != self.replica.table_id for ref in refs):
+            return "other_tables"
+        if not replica_compatible(sql):
+            return "unsupported_sql"
+        if not self.replica.is_fresh(table_metadata(self.replica.table_id)):
+            self.sync_in_background()
+            return "stale"
+        return None
+
+    def execute(self, sql: str, scope: str, table_metadata: Callable[[str], Optional[TableMetadata]]) -> Optional[ReplicaResult]:
+        """Serves `sql` from the replica when possible; returns None to send it to BigQuery."""
+        start = time.perf_counter()
+        reason = self.route(sql, scope, table_metadata)
+        if reason is None:
+            try:
+                arrow_table = self.replica.query(sql)
+            except Exception as e:
+                logger.info(f"Replica could not run the query, using BigQuery: {e}")
+                reason = "engine_error"
+            else:
+                result = ReplicaResult(uuid.uuid4().hex[:16], arrow_table, self.replica.manifest.modified)
+                with self._lock:
+                    self._results[result.result_id] = result
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+                self._record(REPLICA, "eligible", sql, start)
+                return result
+        self._record(BIGQUERY, reason, sql, start)
+        return None
+
+    def get_result(self, result_id: str) -> Optional[ReplicaResult]:
+        with self._lock:
+            return self._results.get(result_id)
+
+    def report(self) -> dict:
+        """Queries served per engine, why queries went to BigQuery, and the most recent decisions."""
+        with self._lock:
+            return {
+                "served": dict(self._counts),
+                "bigquery_reasons": dict(self._reasons),
+                "recent": [asdict(decision) for decision in self._history],
+            }
+
+    def sync_in_background(self) -> None:
+        """Starts a one-off sync unless one is already running."""
+        with self._lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+            self._sync_thread = threading.Thread(target=self._sync_safely, name="replica-sync", daemon=True)
+            self._sync_thread.start()
+
+    def start_periodic_sync(self, interval_seconds: float) -> None:
+        """Syncs now and then every `interval_seconds` from a daemon thread."""
+        def run():
+            while True:
+                self._sync_safely()
+                if self._stop.wait(interval_seconds):
+                    return
+        threading.Thread(target=run, name="replica-periodic-sync", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _sync_safely(self) -> None:
+        try:
+            self.replica.sync()
+        except Exception as e:
+            logger.warning(f"Replica sync of {self.replica.table_id} failed: {e}")
+
+    def _record(self, engine: str, reason: str, sql: str, start: float) -> None:
+        decision = RoutingDecision(engine, reason, " ".join(sql.split())[:200], (time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._counts[engine] += 1
+            if engine == BIGQUERY:
+                self._reasons[reason] += 1
+            self._history.append(decision)
+        logger.info(f"Query routed to {engine} ({reason})")
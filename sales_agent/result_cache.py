@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResult:
+    value: str
+    tables: tuple
+    bytes_processed: int
+    stored_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.value.encode("utf-8"))
+
+
+class ResultCacheBackend(ABC):
+    """Storage for cached query results, bounded by total bytes with LRU eviction."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResult]:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, result: CachedResult) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_table(self, table_id: str) -> int:
+        """Removes every result that read `table_id`; returns how many were removed."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def usage(self) -> dict:
+        """Returns `entries` and `bytes` currently stored."""
+
+
+class InMemoryResultBackend(ResultCacheBackend):
+    """Process-local backend; results are lost on restart."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        if result.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = result
+            self._bytes += result.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def invalidate_table(self, table_id: str) -> int:
+        with self._lock:
+            keys = [key for key, result in self._entries.items() if table_id in result.tables]
+            for key in keys:
+                self._bytes -= self._entries.pop(key).size
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def usage(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class SQLiteResultBackend(ResultCacheBackend):
+    """On-disk backend so warm results survive process restarts."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                tables TEXT NOT NULL,
+                bytes_processed INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS query_results_accessed ON query_results (accessed_at)")
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, tables, bytes_processed, stored_at FROM query_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE query_results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        value, tables, bytes_processed, stored_at = row
+        return CachedResult(value, tuple(t for t in tables.split("|") if t), bytes_processed, stored_at)
+
+    def put(self, key: str, result: CachedResult) -> None:
+        if result.size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    result.value,
+                    result.size,
+                    # Delimited on both sides so invalidate_table can match whole ids with LIKE
+                    "|" + "|".join(result.tables) + "|",
+                    result.bytes_processed,
+                    result.stored_at,
+                    time.time(),
+                ),
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM query_results").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT key, size FROM query_results ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._conn.execute("DELETE FROM query_results WHERE key = ?", (oldest[0],))
+                total -= oldest[1]
+
+    def invalidate_table(self, table_id: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM query_results WHERE instr(tables, ?) > 0", (f"|{table_id}|",)
+            )
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM query_results")
+
+    def usage(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM query_results"
+            ).fetchone()
+        return {"entries": entries, "bytes": size}
+
+
+def create_result_cache_backend(kind: str, max_bytes: int, path: Optional[str] = None) -> Optional[ResultCacheBackend]:
+    """Builds the backend named by `kind` (`memory`, `sqlite` or `none`)."""
+    kind = (kind or "none").lower()
+    if kind == "memory":
+        return InMemoryResultBackend(max_bytes)
+    if kind == "sqlite":
+        return SQLiteResultBackend(os.path.expanduser(path), max_bytes)
+    if kind != "none":
+        logger.warning(f"Unknown result cache backend '{kind}'; result caching disabled")
+    return None
+
+
+class ResultCache:
+    """Query result cache keyed by normalized SQL, credential scope and table versions.
+
+    Including each referenced table's version (etag/modified time) in the key
+    means a table change makes old entries unreachable; they age out through
+    LRU eviction, or are dropped eagerly via `invalidate_table`.
+    """
+
+    def __init__(self, backend: Optional[ResultCacheBackend], ttl_seconds: float = 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.response_bytes_served = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(scope: str, normalized_sql: str, table_versions: Dict[str, str]) -> str:
+        parts = [scope, normalized_sql] + [f"{t}={v}" for t, v in sorted(table_versions.items())]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        result = self.backend.get(key)
+        if result is not None and time.time() - result.stored_at > self.ttl_seconds:
+            result = None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.bytes_saved += result.bytes_processed
+            self.response_bytes_served += result.size
+        return result.value
+
+    def put(self, key: str, value: str, tables: Iterable[str], bytes_processed: Optional[int] = None) -> None:
+        if self.backend is None:
+            return
+        bytes_processed = bytes_processed if isinstance(bytes_processed, int) else 0
+        self.backend.put(key, CachedResult(value, tuple(tables), bytes_processed, time.time()))
+
+    def invalidate_table(self, table_id: str) -> int:
+        return self.backend.invalidate_table(table_id) if self.backend is not None else 0
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.bytes_saved = self.response_bytes_served = 0
+
+    def stats(self) -> dict:
+        usage = self.backend.usage() if self.backend is not None else {"entries": 0, "bytes": 0}
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "response_bytes_served": self.response_bytes_served,
+                **usage,
+            }
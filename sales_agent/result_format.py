@@ -0,0 +1,307 @@
+import csv
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("tsv", "csv", "markdown", "repr")
+
+# Same rough ratio the benchmarks use to estimate prompt tokens
+CHARS_PER_TOKEN = 4
+
+# Room kept free under the budget for the paging footer added after the rows
+_FOOTER_RESERVE = 300
+
+# Full-result summaries kept, so paging through a result summarizes it once
+_MAX_CACHED_SUMMARIES = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text` (~4 characters per token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _cell(value, fmt: str) -> str:
+    if value is None:
+        return "" if fmt == "csv" else "NULL"
+    if isinstance(value, (list, dict)):
+        text = json.dumps(value, default=str)
+    elif isinstance(value, float):
+        text = f"{value:.15g}"
+    else:
+        text = str(value)
+    if fmt == "tsv":
+        return text.replace("\t", " ").replace("\n", " ")
+    if fmt == "markdown":
+        return text.replace("|", "\\|").replace("\n", " ")
+    return text
+
+
+def _csv_line(values: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(values)
+    return buffer.getvalue()
+
+
+def encode_rows(rows: List[dict], fmt: str) -> tuple:
+    """Encodes rows as (header lines, one line per row); column names appear only in the header."""
+    if fmt == "repr":
+        return [], [repr(row) for row in rows]
+    columns = list(rows[0]) if rows else []
+    cells = [[_cell(row.get(column), fmt) for column in columns] for row in rows]
+    if fmt == "markdown":
+        header = ["| " + " | ".join(_cell(c, fmt) for c in columns) + " |", "|" + " --- |" * len(columns)]
+        return header, ["| " + " | ".join(values) + " |" for values in cells]
+    if fmt == "csv":
+        return [_csv_line(columns)], [_csv_line(values) for values in cells]
+    return ["\t".join(_cell(c, fmt) for c in columns)], ["\t".join(values) for values in cells]
+
+
+def join_lines(header: List[str], lines: List[str], fmt: str) -> str:
+    if fmt == "repr":
+        return "[" + ", ".join(lines) + "]"
+    return "\n".join(header + lines)
+
+
+def _stat(value):
+    """Turns a pandas/NumPy scalar into a plain, compactly printed Python value."""
+    if value is None or (not isinstance(value, (list, dict, str)) and pd.isna(value)):
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+
+def _is_nested(value) -> bool:
+    # ARRAY and STRUCT cells: lists and dicts from REST rows, NumPy arrays and dicts from Arrow
+    return isinstance(value, (list, tuple, dict, np.ndarray))
+
+
+def _scalar(value):
+    """A nested cell as JSON text, so it can be counted and compared."""
+    if not _is_nested(value):
+        return value
+    return json.dumps(value.tolist() if isinstance(value, np.ndarray) else value, default=str)
+
+
+def summarize(frame: pd.DataFrame, fmt: str, top_n: int = 5) -> List[str]:
+    """Per-column summary lines for a result: non-null and distinct counts, min/max, sum/mean and top values.
+
+    Every statistic is a whole-column pandas aggregation, so the cost does not
+    depend on turning rows into text.
+    """
+    types = frame.dtypes.astype(str)
+    nested = [column for column in frame.columns
+              if frame[column].dtype == object and frame[column].map(_is_nested).any()]
+    if nested:
+        frame = frame.assign(**{column: frame[column].map(_scalar) for column in nested})
+    stats = pd.DataFrame({
+        "type": types,
+        "non_null": frame.count(),
+        "distinct": frame.nunique(dropna=True),
+    })
+    numeric = frame.select_dtypes(include="number").select_dtypes(exclude="bool")
+    if not numeric.columns.empty:
+        stats = stats.join(numeric.agg(["min", "max", "sum", "mean"]).T)
+    else:
+        stats = stats.assign(min=None, max=None, sum=None, mean=None)
+    stats = stats.astype(object)
+    top_lines = []
+    for column in frame.columns:
+        if column in numeric.columns:
+            continue
+        values = frame[column].dropna()
+        try:
+            # Dates and strings still have a meaningful range
+            stats.loc[column, ["min", "max"]] = [values.min(), values.max()] if len(values) else [None, None]
+        except TypeError:
+            pass
+        counts = values.astype(str).value_counts().head(top_n)
+        if len(counts) and stats.loc[column, "distinct"] < len(values):
+            top_lines.append(f"{column}: " + ", ".join(f"{value} ({count})" for value, count in counts.items()))
+
+    rows = [
+        {"column": column, **{key: _stat(value) for key, value in record.items()}}
+        for column, record in stats.to_dict(orient="index").items()
+    ]
+    header, lines = encode_rows(rows, "tsv" if fmt == "repr" else fmt)
+    summary = header + lines
+    if top_lines:
+        summary += [f"Top {top_n} values:"] + top_lines
+    return summary
+
+
+def _frame(source) -> pd.DataFrame:
+    if isinstance(source, pd.DataFrame):
+        return source
+    if hasattr(source, "to_pandas"):
+        return source.to_pandas()
+    return pd.DataFrame.from_records(source)
+
+
+@dataclass
+class FormattedPage:
+    text: str
+    rows_shown: int
+    summarized: bool
+    output_bytes: int
+    output_tokens: int
+    format_ms: float
+
+
+class ResultFormatter:
+    """Renders query result pages compactly under a hard token budget.
+
+    Rows are encoded header-once (`tsv`, `csv`, `markdown`; `repr` keeps the
+    old list-of-dicts text). When a page would not fit in `max_tokens`, as many
+    rows as fit in half the budget are kept and the rest is replaced by a
+    per-column summary of the whole result (or of the page, when the full
+    result is not held locally). `max_tokens=0` disables the budget.
+    """
+
+    def __init__(self, fmt: str = "tsv", max_tokens: int = 2000, top_n: int = 5):
+        fmt = (fmt or "tsv").lower()
+        if fmt not in FORMATS:
+            logger.warning(f"Unknown result format '{fmt}'; using tsv")
+            fmt = "tsv"
+        self.fmt = fmt
+        self.max_tokens = max_tokens
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        # (handle, id of the full result, max chars) -> (summary lines, scope)
+        self._summaries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.clear()
+
+    def format_page(self, rows: List[dict], start_row: int, total_rows, has_more: bool, handle: str,
+                    summary_source=None) -> FormattedPage:
+        """Renders a non-empty page plus, when truncated, instructions for fetching the rest.
+
+        `summary_source` is the full result (Arrow table or DataFrame) when it is
+        available locally; otherwise an over-budget page is summarized from `rows`.
+        """
+        start = time.perf_counter()
+        header, lines = encode_rows(rows, self.fmt)
+        text = join_lines(header, lines, self.fmt)
+        shown = len(rows)
+        summary = []
+        budget = self.max_tokens * CHARS_PER_TOKEN
+        if budget and len(text) > budget - _FOOTER_RESERVE:
+            summary, scope = self._summary(rows, summary_source, budget // 2, has_more, handle)
+            room = budget - _FOOTER_RESERVE - sum(len(line) + 1 for line in summary) - sum(len(h) + 1 for h in header)
+            shown, used = 0, 0
+            for line in lines:
+                if used + len(line) + 2 > room:
+                    break
+                used += len(line) + 2
+                shown += 1
+            if shown == 0:
+                # Always show one row, cut to fit, so an oversized row cannot stall paging
+                shown = 1
+                lines = [lines[0][:max(0, room - 3)] + "..."]
+            text = join_lines(header, lines[:shown], self.fmt)
+            summary = [f"Summary of {scope}:"] + summary
+
+        end_row = start_row + shown
+        if shown < len(rows) or (isinstance(total_rows, int) and total_rows > end_row):
+            has_more = True
+        if summary:
+            text = f"{text}\n\n" + "\n".join(summary)
+        if has_more:
+            of_total = f" of {total_rows}" if isinstance(total_rows, int) else ""
+            text = (
+                f"{text}\n\nShowing rows {start_row + 1}-{end_row}{of_total}. "
+                f"More rows are available: call fetch_more_results(handle=\"{handle}\", start_row={end_row}) "
+                "only if they are needed to answer the question."
+            )
+        page = FormattedPage(
+            text=text,
+            rows_shown=shown,
+            summarized=bool(summary),
+            output_bytes=len(text.encode("utf-8")),
+            output_tokens=estimate_tokens(text),
+            format_ms=(time.perf_counter() - start) * 1000,
+        )
+        with self._lock:
+            self.pages += 1
+            self.summarized += int(page.summarized)
+            self.rows_in += len(rows)
+            self.rows_shown += shown
+            self.output_bytes += page.output_bytes
+            self.output_tokens += page.output_tokens
+            self.format_ms += page.format_ms
+        return page
+
+    def _summary(self, rows: List[dict], source, max_chars: int, has_more: bool, handle: str = None) -> tuple:
+        """Summary lines cut to `max_chars`, and a description of what they cover.
+
+        A full result's summary is computed once per handle and reused for its later pages.
+        """
+        key = (handle, id(source), max_chars) if source is not None and handle else None
+        if key is not None:
+            with self._lock:
+                cached = self._summaries.get(key)
+                if cached is not None:
+                    self._summaries.move_to_end(key)
+                    return cached
+        lines, scope, full = self._compute_summary(rows, source, max_chars, has_more)
+        if key is not None and full:
+            with self._lock:
+                self._summaries[key] = (lines, scope)
+                while len(self._summaries) > _MAX_CACHED_SUMMARIES:
+                    self._summaries.popitem(last=False)
+        return lines, scope
+
+    def _compute_summary(self, rows: List[dict], source, max_chars: int, has_more: bool) -> tuple:
+        frame = None
+        if source is not None:
+            try:
+                frame = _frame(source)
+            except Exception as e:
+                logger.warning(f"Could not summarize the full result, summarizing the page instead: {e}")
+        full = frame is not None
+        if full:
+            scope = f"all {len(frame)} rows"
+        else:
+            frame = _frame(rows)
+            scope = f"the {len(frame)} rows read for this page" if has_more else f"all {len(frame)} rows"
+        lines, used = [], 0
+        for line in summarize(frame, self.fmt, self.top_n):
+            if used + len(line) + 1 > max_chars:
+                lines.append("...")
+                break
+            lines.append(line)
+            used += len(line) + 1
+        return lines, scope, full
+
+    def clear(self) -> None:
+        with self._lock:
+            self._summaries.clear()
+            self.pages = self.summarized = self.rows_in = self.rows_shown = 0
+            self.output_bytes = self.output_tokens = 0
+            self.format_ms = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "format": self.fmt,
+                "max_tokens": self.max_tokens,
+                "pages": self.pages,
+                "summarized": self.summarized,
+                "rows_in": self.rows_in,
+                "rows_shown": self.rows_shown,
+                "output_bytes": self.output_bytes,
+                "output_tokens": self.output_tokens,
+                "format_ms": self.format_ms,
+                "avg_output_tokens": self.output_tokens / self.pages if self.pages else None,
+            }
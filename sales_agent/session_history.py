@@ -0,0 +1,254 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Same rough ratio the benchmarks and result formatter use to estimate tokens
+_CHARS_PER_TOKEN = 4
+
+
+def _part_chars(part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call is not None:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response is not None:
+        return len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def estimate_history_tokens(contents: list) -> int:
+    """Rough token count of a request's conversation history (text, tool calls and tool responses)."""
+    chars = sum(_part_chars(part) for content in contents for part in (content.parts or []))
+    return -(-chars // _CHARS_PER_TOKEN)
+
+
+def _current_turn_start(contents: list) -> int:
+    """Index of the latest user message; tool responses from that turn on are never compacted."""
+    for index in range(len(contents) - 1, -1, -1):
+        parts = contents[index].parts or []
+        if contents[index].role == "user" and any(part.text for part in parts):
+            return index
+    return 0
+
+
+def digest_response(name: str, response: dict, max_chars: int) -> str:
+    """Short stand-in for an old tool response: its size and opening lines (e.g. column names)."""
+    text = response.get("result") if isinstance(response.get("result"), str) else json.dumps(response, default=str)
+    head = text[:max_chars].rstrip()
+    return (
+        f"[Earlier {name} result compacted: {len(text)} characters, {text.count(chr(10)) + 1} lines. "
+        f"It began:\n{head}\n...] Call the tool again if these rows are needed."
+    )
+
+
+class HistoryCompactor:
+    """Keeps the conversation history sent to the model under a per-session token budget.
+
+    Attach with `Agent(**compactor.callbacks(), ...)`. Before each model call,
+    if the history is over `max_tokens`, tool responses from earlier turns are
+    replaced (oldest first, in the outgoing request only; the session keeps the
+    originals) with a digest of `digest_chars` characters until it fits. The
+    history size before and after compaction is kept per session for `report()`.
+    """
+
+    def __init__(self, max_tokens: int = 8000, digest_chars: int = 300, max_sessions: int = 1000,
+                 points_per_session: int = 200):
+        self.max_tokens = max_tokens
+        self.digest_chars = digest_chars
+        self.max_sessions = max_sessions
+        self.points_per_session = points_per_session
+        self._lock = threading.Lock()
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self.requests = 0
+        self.compacted_requests = 0
+        self.responses_compacted = 0
+        self.tokens_saved = 0
+
+    def callbacks(self) -> dict:
+        """Returns the Agent keyword arguments that attach this compactor."""
+        return {"before_model_callback": self.before_model}
+
+    def compact(self, contents: list) -> tuple:
+        """Compacts `contents` in place; returns (history tokens before, after, responses compacted)."""
+        before = estimate_history_tokens(contents)
+        after, compacted = before, 0
+        if not self.max_tokens or before <= self.max_tokens:
+            return before, after, compacted
+        for content in contents[:_current_turn_start(contents)]:
+            for part in content.parts or []:
+                if after <= self.max_tokens:
+                    break
+                response = part.function_response
+                if response is None or not isinstance(response.response, dict):
+                    continue
+                digest = digest_response(response.name or "tool", response.response, self.digest_chars)
+                old_chars = _part_chars(part)
+                if len(digest) >= old_chars:
+                    continue
+                # Request contents are shallow copies of session events: replace the field, never mutate it
+                part.function_response = types.FunctionResponse(
+                    id=response.id, name=response.name, response={"result": digest}
+                )
+                after -= (old_chars - _part_chars(part)) // _CHARS_PER_TOKEN
+                compacted += 1
+        return before, estimate_history_tokens(contents), compacted
+
+    def before_model(self, callback_context, llm_request):
+        before, after, compacted = self.compact(llm_request.contents)
+        session = getattr(callback_context, "session", None)
+        session_id = getattr(session, "id", None)
+        with self._lock:
+            self.requests += 1
+            if compacted:
+                self.compacted_requests += 1
+                self.responses_compacted += compacted
+                self.tokens_saved += before - after
+            if isinstance(session_id, str):
+                if session_id not in self._history:
+                    self._history[session_id] = deque(maxlen=self.points_per_session)
+                self._history.move_to_end(session_id)
+                self._history[session_id].append({
+                    "time": time.time(), "history_tokens": before, "sent_tokens": after, "compacted": compacted,
+                })
+                while len(self._history) > self.max_sessions:
+                    self._history.popitem(last=False)
+        if compacted:
+            logger.info(f"Compacted {compacted} old tool responses in session {session_id}: ~{before} -> ~{after} tokens")
+        return None
+
+    def report(self, session_id: Optional[str] = None) -> dict:
+        """Per-session history size over time: one point per model call, oldest first."""
+        with self._lock:
+            if session_id is not None:
+                return {session_id: list(self._history.get(session_id, []))}
+            return {sid: list(points) for sid, points in self._history.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_tokens": self.max_tokens,
+                "sessions": len(self._history),
+                "requests": self.requests,
+                "compacted_requests": self.compacted_requests,
+                "responses_compacted": self.responses_compacted,
+                "tokens_saved": self.tokens_saved,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._history.clear()
+            self.requests = self.compacted_requests = self.responses_compacted = self.tokens_saved = 0
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """`InMemorySessionService` that evicts least recently used sessions.
+
+    A session is evicted when more than `max_sessions` are held, when the
+    estimated size of all sessions' events exceeds `max_bytes`, or when it has
+    been idle for `idle_ttl_seconds` (0 disables that check). The most
+    recently used session is never evicted, and one evicted while a turn is
+    still running is restored from the runner's copy on its next event. With
+    the runner's `auto_create_session`, a user who returns to an evicted
+    session simply starts a fresh one.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 256 * 1024 * 1024, idle_ttl_seconds: float = 3600):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._lock = threading.Lock()
+        # (app, user, session id) -> [estimated bytes, last used], least recently used first
+        self._usage: "OrderedDict[tuple, list]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = {"count": 0, "memory": 0, "idle": 0}
+
+    async def create_session(self, *, app_name: str, user_id: str, state=None, session_id=None):
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        self._touch((app_name, user_id, session.id), len(json.dumps(session.state, default=str)))
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config=None):
+        self._evict()
+        session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None:
+            self._touch((app_name, user_id, session.id))
+        return session
+
+    async def append_event(self, session, event):
+        user_sessions = self.sessions.setdefault(session.app_name, {}).setdefault(session.user_id, {})
+        if not event.partial and session.id not in user_sessions:
+            user_sessions[session.id] = session
+        event = await super().append_event(session=session, event=event)
+        if not event.partial:
+            self._touch((session.app_name, session.user_id, session.id),
+                        len(event.model_dump_json(exclude_none=True)))
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        with self._lock:
+            usage = self._usage.pop((app_name, user_id, session_id), None)
+            if usage is not None:
+                self._bytes -= usage[0]
+
+    def _touch(self, key: tuple, added_bytes: int = 0) -> None:
+        with self._lock:
+            usage = self._usage.setdefault(key, [0, 0.0])
+            usage[0] += added_bytes
+            usage[1] = time.monotonic()
+            self._bytes += added_bytes
+            self._usage.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            victims = []
+            # The most recently used session is the one being served; keep it
+            while len(self._usage) > 1:
+                key, (size, last_used) = next(iter(self._usage.items()))
+                if len(self._usage) > self.max_sessions:
+                    reason = "count"
+                elif self._bytes > self.max_bytes:
+                    reason = "memory"
+                elif self.idle_ttl_seconds and now - last_used > self.idle_ttl_seconds:
+                    reason = "idle"
+                else:
+                    break
+                self._usage.popitem(last=False)
+                self._bytes -= size
+                self.evictions[reason] += 1
+                victims.append(key)
+        for app_name, user_id, session_id in victims:
+            self._delete_session_impl(app_name=app_name, user_id=user_id, session_id=session_id)
+            logger.info(f"Evicted session {session_id} of user {user_id}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._usage), "bytes": self._bytes, "evictions": dict(self.evictions)}
+
+
+_compactor: Optional[HistoryCompactor] = None
+_compactor_lock = threading.Lock()
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """Returns the process-wide history compactor, configured from HISTORY_MAX_TOKENS on first use."""
+    global _compactor
+    with _compactor_lock:
+        if _compactor is None:
+            try:
+                from .config import config
+            except (ImportError, ValueError):
+                from config import config
+            _compactor = HistoryCompactor(max_tokens=config.history_max_tokens)
+        return _compactor
@@ -0,0 +1,138 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+try:
+    from .job_tracking import JobTracker, current_tracker
+except (ImportError, ValueError):
+    from job_tracking import JobTracker, current_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight call shared by every waiter with the same key."""
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.future: Future = Future()
+        # Jobs started by the call belong to the flight, not to the waiter that happened to start it
+        self.tracker = JobTracker()
+        self.waiters = 0
+        self.abandoned = False
+
+
+class _Waiter:
+    """Stands in for the shared jobs in one waiter's JobTracker.
+
+    Cancelling the waiter's tool call releases only its interest in the flight;
+    the BigQuery jobs are cancelled once every waiter has let go.
+    """
+
+    def __init__(self, single_flight: "SingleFlight", flight: _Flight):
+        self._single_flight = single_flight
+        self._flight = flight
+        self._released = False
+        self.job_id = f"single-flight waiter for {flight.key!r}"
+
+    def cancel(self) -> None:
+        self._single_flight._release(self, cancelled=True)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls so only one runs and every caller gets its result.
+
+    The first caller for a key (the leader) runs `fn` in its own thread;
+    callers arriving while it runs (followers) block until it finishes and
+    share its return value. Tool calls run in worker threads (see
+    async_tools.py), so this is safe for both threads and asyncio tasks.
+    If the leader's call raises, each follower runs `fn` on its own instead
+    of inheriting an error that may be specific to the leader.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flights: dict = {}
+        self.clear()
+
+    def do(self, key: Hashable, fn: Callable[[], object]) -> tuple:
+        """Returns (fn's result, whether it was shared from another caller's call)."""
+        if not self.enabled:
+            return fn(), False
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or flight.abandoned
+            if leader:
+                flight = _Flight(key)
+                self._flights[key] = flight
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+        waiter = _Waiter(self, flight)
+        tracker = current_tracker.get()
+        if tracker is not None:
+            tracker.add(waiter)
+        try:
+            if leader:
+                return self._lead(flight, fn), False
+            try:
+                return flight.future.result(), True
+            except Exception as e:
+                logger.info(f"Shared call failed ({e}); running it separately")
+                with self._lock:
+                    self.follower_retries += 1
+                return fn(), False
+        finally:
+            self._release(waiter, cancelled=False)
+
+    def _lead(self, flight: _Flight, fn: Callable[[], object]):
+        context = contextvars.copy_context()
+        context.run(current_tracker.set, flight.tracker)
+        try:
+            result = context.run(fn)
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+
+    def _release(self, waiter: _Waiter, cancelled: bool) -> None:
+        """Drops one waiter's interest; the flight's jobs are cancelled when the last one was cancelled."""
+        flight = waiter._flight
+        with self._lock:
+            if waiter._released:
+                return
+            waiter._released = True
+            flight.waiters -= 1
+            abandon = cancelled and flight.waiters == 0 and not flight.future.done()
+            if abandon:
+                flight.abandoned = True
+                self.abandoned += 1
+        if abandon:
+            logger.info(f"Every caller abandoned the shared call for {flight.key!r}; cancelling its jobs")
+            flight.tracker.cancel_all()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.leaders = self.coalesced = self.follower_retries = self.abandoned = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesce_rate": self.coalesced / calls if calls else None,
+                "follower_retries": self.follower_retries,
+                "abandoned": self.abandoned,
+            }
@@ -0,0 +1,133 @@
+import re
+from typing import List, Optional
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+    |(?P<string>'''.*?'''|\"\"\".*?\"\"\"|'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*")
+    |(?P<quoted>`[^`]*`)
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<space>\s+)
+    |(?P<other>.)
+    """,
+    re.S | re.X,
+)
+
+_WORDLIKE = {"string", "quoted", "number", "word"}
+
+# A table path: `a.b.c`, `a`.`b`.`c` or an unquoted a.b.c (project ids may contain dashes)
+_PATH = r"(?:`[^`]+`|[A-Za-z0-9_\-]+)(?:\.(?:`[^`]+`|[A-Za-z0-9_\-*]+))*"
+# Words that can follow a table path but are not its alias
+_NOT_ALIAS = (
+    r"(?!(?:where|group|order|limit|join|on|using|inner|left|right|full|cross|union|intersect|except|having"
+    r"|window|qualify|for|tablesample|pivot|unpivot)\b)"
+)
+_ALIAS = rf"(?:\s+(?:as\s+)?{_NOT_ALIAS}([A-Za-z_]\w*))?"
+_FROM_RE = re.compile(rf"\b(?:from|join)\s+({_PATH}){_ALIAS}", re.I)
+_COMMA_JOIN_RE = re.compile(rf"\s*,\s*({_PATH}){_ALIAS}", re.I)
+# FROM that does not introduce a table: EXTRACT(part FROM x) and IS [NOT] DISTINCT FROM
+_NOT_A_SOURCE_RE = re.compile(r"\bextract\s*\(\s*\w+(?:\s*\(\s*\w+\s*\))?\s+from\b|\bdistinct\s+from\b", re.I)
+_CTE_RE = re.compile(r"(?:\bwith(?:\s+recursive)?|,)\s*([A-Za-z_]\w*)\s+as\s*\(", re.I)
+
+_NON_DETERMINISTIC_RE = re.compile(
+    r"\b(current_date|current_datetime|current_time|current_timestamp|rand|generate_uuid|session_user)\b",
+    re.I,
+)
+_READ_ONLY_RE = re.compile(r"^\(*\s*(select|with)\b", re.I)
+
+
+def tokenize(sql: str) -> List[tuple]:
+    """Splits SQL into (kind, text) tokens; kinds are comment, string, quoted, number, word, space, other."""
+    return [(m.lastgroup, m.group()) for m in _TOKEN_RE.finditer(sql)]
+
+
+def normalize_sql(sql: str) -> str:
+    """Returns a canonical form of `sql` that ignores comments, whitespace and keyword case.
+
+    String literals and backtick-quoted names are kept verbatim, and so are
+    dotted names (BigQuery dataset and table names are case-sensitive).
+    """
+    tokens = [t for t in tokenize(sql) if t[0] != "comment"]
+    parts = []
+    previous_kind = None
+    for i, (kind, text) in enumerate(tokens):
+        if kind == "space":
+            continue
+        if kind == "word":
+            before = tokens[i - 1][1] if i > 0 else ""
+            after = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+            if before != "." and after != ".":
+                text = text.lower()
+        if previous_kind in _WORDLIKE and kind in _WORDLIKE and i > 0 and tokens[i - 1][0] == "space":
+            parts.append(" ")
+        parts.append(text)
+        previous_kind = kind
+    return "".join(parts).rstrip(";").strip()
+
+
+def strip_literals(sql: str) -> str:
+    """Returns `sql` with comments removed and string literals blanked, for pattern matching."""
+    return "".join(
+        "''" if kind == "string" else " " if kind == "comment" else text
+        for kind, text in tokenize(sql)
+    )
+
+
+def extract_table_refs(sql: str) -> List[str]:
+    """Returns the table paths referenced after FROM/JOIN (including comma joins), minus CTE names.
+
+    Backticks are removed, so `p.d.t` and `p`.`d`.`t` both come back as p.d.t.
+    Paths that start with a table alias or CTE name (correlated references such
+    as `FROM orders o, o.items`) are not tables and are left out.
+    """
+    text = _NOT_A_SOURCE_RE.sub(lambda match: match.group()[:-4] + "    ", strip_literals(sql))
+    cte_names = {name.lower() for name in _CTE_RE.findall(text)}
+    sources = []
+    for match in _FROM_RE.finditer(text):
+        sources.append(match.groups())
+        position = match.end()
+        while True:
+            comma = _COMMA_JOIN_RE.match(text, position)
+            if not comma:
+                break
+            sources.append(comma.groups())
+            position = comma.end()
+    range_names = set(cte_names)
+    refs = []
+    for path, alias in sources:
+        # A single backticked path (`a.b`) is always a table; otherwise a.b may be field b of an earlier alias a
+        head = path if path.startswith("`") and path.count("`") == 2 else path.split(".", 1)[0]
+        path = path.replace("`", "")
+        correlated = "." in path and head.lower() in range_names
+        if alias:
+            range_names.add(alias.lower())
+        if correlated or path.lower() in cte_names or path.lower() == "unnest":
+            continue
+        if path not in refs:
+            refs.append(path)
+    return refs
+
+
+def qualify_table_id(path: str, default_project: str) -> Optional[str]:
+    """Returns `project.dataset.table` for a table path, or None for anything else.
+
+    Unqualified names, wildcard tables and INFORMATION_SCHEMA views return None.
+    """
+    parts = path.split(".")
+    if "*" in path or len(parts) not in (2, 3) or any(not part for part in parts):
+        return None
+    if len(parts) == 2:
+        parts = [default_project] + parts
+    return ".".join(parts)
+
+
+def is_read_only(sql: str) -> bool:
+    """True for a single SELECT/WITH statement."""
+    text = strip_literals(sql).strip().rstrip(";")
+    return bool(_READ_ONLY_RE.match(text)) and ";" not in text
+
+
+def is_deterministic(sql: str) -> bool:
+    """False if the query calls functions whose result changes between runs (e.g. CURRENT_DATE)."""
+    return not _NON_DETERMINISTIC_RE.search(strip_literals(sql))
@@ -0,0 +1,195 @@
+import difflib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .metadata_cache import TableMetadata
+    from .sql_utils import is_read_only, qualify_table_id
+except (ImportError, ValueError):
+    from metadata_cache import TableMetadata
+    from sql_utils import is_read_only, qualify_table_id
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.optimizer.scope import Scope, traverse_scope
+except ImportError:  # optional: `uv sync --extra validation`
+    sqlglot = None
+
+logger = logging.getLogger(__name__)
+
+REJECTION_PREFIX = "Query rejected before submission"
+
+# Columns BigQuery provides on partitioned and wildcard tables without listing them in the schema
+_PSEUDO_COLUMNS = {"_partitiontime", "_partitiondate", "_table_suffix", "_file_name"}
+
+# Longest list of valid names shown with a rejection
+_MAX_LISTED_NAMES = 40
+
+
+class _Invalid(Exception):
+    pass
+
+
+def _suggest(name: str, candidates: List[str]) -> str:
+    matches = difflib.get_close_matches(name.lower(), [c.lower() for c in candidates], n=1, cutoff=0.6)
+    if not matches:
+        return ""
+    match = next(c for c in candidates if c.lower() == matches[0])
+    return f"; did you mean `{match}`?"
+
+
+def _listing(kind: str, names: List[str]) -> str:
+    names = sorted(names)
+    more = f", ... ({len(names) - _MAX_LISTED_NAMES} more)" if len(names) > _MAX_LISTED_NAMES else ""
+    return f" Available {kind}: {', '.join(names[:_MAX_LISTED_NAMES])}{more}."
+
+
+class SqlValidator:
+    """Checks the tables and columns a query references against cached schemas, before BigQuery sees it.
+
+    The query is parsed locally with sqlglot (BigQuery dialect) and every
+    column is resolved against the schemas already in the metadata cache, so a
+    misspelled name is reported in about a millisecond instead of after a
+    failed job. Validation only ever rejects what it can prove wrong: anything
+    it cannot resolve (unparsable SQL, tables whose schema is not cached,
+    UNNEST, struct fields, correlated references) is let through for BigQuery
+    to judge. Without sqlglot installed every query is let through.
+    """
+
+    def __init__(self, default_project: str, enabled: bool = True):
+        self.default_project = default_project
+        self.enabled = enabled and sqlglot is not None
+        if enabled and sqlglot is None:
+            logger.warning("SQL_VALIDATION_ENABLED is set but sqlglot is not installed; queries are not validated "
+                           "locally (install the `validation` extra)")
+        self._lock = threading.Lock()
+        self.clear()
+        if self.enabled:
+            # The first parse builds sqlglot's BigQuery dialect tables; keep that off the first tool call
+            sqlglot.parse_one("SELECT 1", read="bigquery")
+
+    def validate(
+        self,
+        sql: str,
+        table_metadata: Callable[[str], Optional[TableMetadata]],
+        dataset_tables: Callable[[str], Optional[List[str]]] = lambda dataset_id: None,
+    ) -> Optional[str]:
+        """Returns a rejection message for the model, or None if the query may be submitted.
+
+        `table_metadata` and `dataset_tables` must only consult caches; they are
+        called with `project.dataset.table` and `project.dataset` ids.
+        """
+        if not self.enabled or not is_read_only(sql):
+            return None
+        start = time.perf_counter()
+        problem, checked = None, True
+        try:
+            self._check(sqlglot.parse_one(sql, read="bigquery"), table_metadata, dataset_tables)
+        except _Invalid as e:
+            problem = f"{REJECTION_PREFIX}: {e}"
+        except Exception as e:
+            # sqlglot's grammar is not BigQuery's; let BigQuery decide
+            logger.debug(f"Skipping local SQL validation: {e}")
+            checked = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.validated += int(checked)
+            self.skipped += int(not checked)
+            self.rejected += int(problem is not None)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+        return problem
+
+    def _check(self, expression, table_metadata, dataset_tables) -> None:
+        scopes = traverse_scope(expression)
+        # Sources of every scope first: a correlated subquery is checked against its enclosing query's
+        names_by_scope: Dict[int, Dict[str, Optional[dict]]] = {
+            id(select_scope): {
+                alias.lower(): self._source_columns(source, table_metadata, dataset_tables)
+                for alias, source in select_scope.sources.items()
+            }
+            for select_scope in scopes
+        }
+        for select_scope in scopes:
+            sources = names_by_scope[id(select_scope)]
+            # GROUP BY, HAVING, ORDER BY and QUALIFY may refer to select-list aliases
+            aliases = {
+                expression.alias.lower() for expression in getattr(select_scope.expression, "expressions", [])
+                if isinstance(expression, exp.Alias)
+            }
+            for column in select_scope.columns:
+                self._check_column(column, select_scope, sources, aliases, names_by_scope)
+
+    def _source_columns(self, source, table_metadata, dataset_tables) -> Optional[dict]:
+        """Lower-case column name -> (table id, column name) for a FROM source, or None if unknown."""
+        if isinstance(source, Scope):
+            if not isinstance(source.expression, (exp.Select, exp.Union)):
+                return None
+            names = source.expression.named_selects
+            return None if "*" in names or not names else {n.lower(): (None, n) for n in names}
+        if not isinstance(source, exp.Table) or not source.db:
+            return None
+        path = ".".join(part for part in (source.catalog, source.db, source.name) if part)
+        table_id = qualify_table_id(path, self.default_project)
+        if table_id is None:
+            return None
+        metadata = table_metadata(table_id)
+        if metadata is not None and metadata.columns:
+            return {column.name.lower(): (table_id, column.name) for column in metadata.columns}
+        dataset_id, _, table_name = table_id.rpartition(".")
+        tables = dataset_tables(dataset_id) if metadata is None else None
+        if tables and table_name not in tables:
+            raise _Invalid(
+                f"table `{table_id}` not found{_suggest(table_name, tables)}" + _listing(f"tables in `{dataset_id}`", tables)
+            )
+        return None
+
+    def _check_column(self, column, select_scope, sources, aliases, names_by_scope) -> None:
+        name = column.name
+        if not name or name.lower() in _PSEUDO_COLUMNS or column.args.get("db"):
+            return
+        key, qualifier = name.lower(), column.table.lower()
+        if qualifier:
+            # Anything else qualified is a struct field or an outer reference
+            columns = sources.get(qualifier)
+            if columns is None or key in columns:
+                return
+            table = next(iter(columns.values()))[0] or qualifier
+            raise _Invalid(
+                f"column `{name}` not found in `{table}`{_suggest(name, [c for _, c in columns.values()])}"
+                + _listing("columns", [c for _, c in columns.values()])
+            )
+        if not sources or key in sources or key in aliases:
+            return
+        if any(columns is None or key in columns for columns in sources.values()):
+            return
+        # A correlated subquery may name a column of an enclosing query
+        parent = select_scope.parent if select_scope.is_subquery else None
+        while parent is not None:
+            outer = names_by_scope.get(id(parent))
+            if outer is None or any(columns is None or key in columns for columns in outer.values()):
+                return
+            parent = parent.parent
+        candidates = sorted({c for columns in sources.values() for _, c in columns.values()})
+        tables = sorted({table for columns in sources.values() for table, _ in columns.values() if table})
+        where = f" in `{tables[0]}`" if len(tables) == 1 else ""
+        raise _Invalid(f"column `{name}` not found{where}{_suggest(name, candidates)}" + _listing("columns", candidates))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.validated = self.skipped = self.rejected = 0
+            self.total_ms = self.max_ms = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "validated": self.validated,
+                "rejected": self.rejected,
+                "skipped": self.skipped,
+                "avg_ms": self.total_ms / self.validated if self.validated else None,
+                "max_ms": self.max_ms,
+            }
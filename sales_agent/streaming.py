@@ -0,0 +1,166 @@
+import sys
+import time
+from typing import Optional, TextIO
+
+try:
+    from .instrumentation import QUERY_PROGRESS_STATE_KEY
+    from .preflight import format_bytes
+except (ImportError, ValueError):
+    from instrumentation import QUERY_PROGRESS_STATE_KEY
+    from preflight import format_bytes
+
+
+def _field(data: dict, name: str):
+    """Reads a snake_case field, falling back to its camelCase alias (as some JSON dumps use)."""
+    if name in data:
+        return data[name]
+    head, *rest = name.split("_")
+    return data.get(head + "".join(word.title() for word in rest))
+
+
+def _event_dict(event) -> dict:
+    """ADK events from `Runner.run_async` and the dicts a deployed agent's `stream_query` yields, in one shape."""
+    if isinstance(event, dict):
+        return event
+    return event.model_dump(mode="json", exclude_none=True)
+
+
+def describe_tool_call(name: str, args: dict) -> str:
+    """A short progress line for a tool call the model just made."""
+    args = args or {}
+    if name == "execute_sql":
+        return "running query…"
+    if name == "execute_sql_batch":
+        return f"running {len(args.get('queries') or [])} queries…"
+    if name == "fetch_more_results":
+        return "fetching more rows…"
+    if name == "list_tables":
+        return f"listing tables in {args.get('dataset_id', 'the dataset')}…"
+    if name == "get_table_schema":
+        return f"reading schema of {args.get('table_id', 'a table')}…"
+    return f"calling {name}…"
+
+
+def describe_tool_result(name: str, elapsed_s: Optional[float], progress: Optional[dict]) -> str:
+    """A short line for a finished tool call, with the query statistics the tool reported, if any."""
+    details = []
+    if progress:
+        if progress.get("cache_hits") and progress.get("cache_hits") == progress.get("queries"):
+            details.append("served from cache")
+        elif progress.get("bytes_processed"):
+            details.append(f"{format_bytes(progress['bytes_processed'])} scanned")
+        elif "replica" in (progress.get("engines") or []):
+            details.append("served from local replica")
+    if elapsed_s is not None:
+        details.append(f"{elapsed_s:.1f} s")
+    return f"{name} done" + (f" ({', '.join(details)})" if details else "")
+
+
+class StreamRenderer:
+    """Prints one agent turn as its events arrive and times it.
+
+    Feed it every event of the turn with `feed()`, either ADK events from
+    `Runner.run_async` or the dicts a deployed agent's `stream_query` yields.
+    Partial (streamed) text is printed as it arrives, and each tool call gets
+    a progress line when the model makes it and another when its response
+    comes back, with the bytes scanned the tool reported. `finish()` returns
+    the perceived latency (time to first token and to the final answer)
+    separately from the total.
+    """
+
+    def __init__(self, out: TextIO = None, prefix: str = "Agent: ", show_tools: bool = True):
+        self.out = out or sys.stdout
+        self.prefix = prefix
+        self.show_tools = show_tools
+        self.started = time.perf_counter()
+        self.first_token_s: Optional[float] = None
+        self.answer_s: Optional[float] = None
+        self.answer = ""
+        self.tool_calls = 0
+        self.partial_events = 0
+        self._streamed = False
+        self._line_open = False
+        # function call id -> (tool name, seconds since start)
+        self._calls = {}
+
+    def feed(self, event) -> None:
+        data = _event_dict(event)
+        now = time.perf_counter() - self.started
+        partial = bool(data.get("partial"))
+        parts = (data.get("content") or {}).get("parts") or []
+        text = "".join(part.get("text") or "" for part in parts if not part.get("thought"))
+        # A streamed call may also arrive in a partial chunk; only the complete event counts
+        calls = [] if partial else [_field(part, "function_call") for part in parts if _field(part, "function_call")]
+        responses = [_field(part, "function_response") for part in parts if _field(part, "function_response")]
+
+        if text:
+            if self.first_token_s is None:
+                self.first_token_s = now
+            if partial:
+                self.partial_events += 1
+                self._write(text)
+                self._streamed = True
+            elif self._streamed:
+                # The complete message after its streamed chunks; it is already on screen
+                self._streamed = False
+            else:
+                self._write(text)
+            if not partial and not calls:
+                self.answer, self.answer_s = text, now
+                self._end_line()
+
+        for call in calls:
+            self.tool_calls += 1
+            self._calls[call.get("id")] = (call.get("name"), now)
+            self._progress(describe_tool_call(call.get("name"), call.get("args")))
+
+        if responses:
+            actions = data.get("actions") or {}
+            progress = (_field(actions, "state_delta") or {}).get(QUERY_PROGRESS_STATE_KEY) or {}
+            for response in responses:
+                name, called_at = self._calls.pop(response.get("id"), (response.get("name"), None))
+                elapsed = now - called_at if called_at is not None else None
+                self._progress(describe_tool_result(name or "tool", elapsed, progress.get(response.get("id"))))
+
+    def finish(self) -> dict:
+        """Ends the output and returns the turn's timings in seconds."""
+        self._end_line()
+        return {
+            "first_token_s": self.first_token_s,
+            "answer_s": self.answer_s,
+            "total_s": time.perf_counter() - self.started,
+            "tool_calls": self.tool_calls,
+            "partial_events": self.partial_events,
+        }
+
+    def _write(self, text: str) -> None:
+        if not self._line_open:
+            self.out.write(self.prefix)
+            self._line_open = True
+        self.out.write(text)
+        self.out.flush()
+
+    def _end_line(self) -> None:
+        if self._line_open:
+            self.out.write("\n")
+            self._line_open = False
+            self.out.flush()
+
+    def _progress(self, line: str) -> None:
+        if not self.show_tools:
+            return
+        self._end_line()
+        self.out.write(f"  [{line}]\n")
+        self.out.flush()
+
+
+def format_timings(timings: dict) -> str:
+    """One line of perceived vs total latency for a finished turn."""
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}s"
+
+    return (
+        f"first token {seconds(timings.get('first_token_s'))}, answer {seconds(timings.get('answer_s'))}, "
+        f"total {seconds(timings.get('total_s'))}, {timings.get('tool_calls', 0)} tool calls"
+    )
@@ -1,4 +1,8 @@
+import contextvars
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 import google.auth
 from google.adk.tools.tool_context import ToolContext
 from google.cloud import bigquery
@@ -6,33 +10,281 @@ from google.oauth2.credentials import Credentials
 
 try:
     from .config import config
+    from .arrow_results import ArrowResultStore, download_result_arrow, iter_arrow_rows, storage_read_available
+    from .client_pool import BigQueryClientPool, credential_scope
+    from .instrumentation import record_format_stats, record_query_stats
+    from .job_tracking import track_job
+    from .metadata_cache import MetadataCache, TableMetadata, TABLE
+    from .plan_cache import PlanCache
+    from .preflight import QueryPreflight
+    from .result_cache import ResultCache, create_result_cache_backend
+    from .result_format import ResultFormatter
+    from .single_flight import SingleFlight
+    from .sql_validation import SqlValidator
+    from .sql_utils import extract_table_refs, is_deterministic, is_read_only, normalize_sql, qualify_table_id
 except (ImportError, ValueError):
     from config import config
+    from arrow_results import ArrowResultStore, download_result_arrow, iter_arrow_rows, storage_read_available
+    from client_pool import BigQueryClientPool, credential_scope
+    from instrumentation import record_format_stats, record_query_stats
+    from job_tracking import track_job
+    from metadata_cache import MetadataCache, TableMetadata, TABLE
+    from plan_cache import PlanCache
+    from preflight import QueryPreflight
+    from result_cache import ResultCache, create_result_cache_backend
+    from result_format import ResultFormatter
+    from single_flight import SingleFlight
+    from sql_validation import SqlValidator
+    from sql_utils import extract_table_refs, is_deterministic, is_read_only, normalize_sql, qualify_table_id
 
 logger = logging.getLogger(__name__)
 
+def _create_bigquery_client(token: str = None) -> bigquery.Client:
+    """Builds a new BigQuery client from an OAuth token, or from ADC when no token is given."""
+    if token:
+        credentials = Credentials(token=token)
+        return bigquery.Client(
+            project=config.project_id,
+            credentials=credentials,
+            location=config.bigquery_location
+        )
+    return bigquery.Client(
+        project=config.project_id,
+        location=config.bigquery_location
+    )
+
+# Process-wide client pool shared by all tool calls and sessions.
+client_pool = BigQueryClientPool(
+    client_factory=_create_bigquery_client,
+    max_size=config.bigquery_client_pool_size,
+    token_ttl_seconds=config.bigquery_client_token_ttl_seconds,
+)
+
+# Process-wide schema and table-listing cache, shared across sessions per credential scope.
+metadata_cache = MetadataCache(
+    ttl_seconds=config.metadata_cache_ttl_seconds,
+    max_entries=config.metadata_cache_size,
+)
+
+# Query result cache, keyed by normalized SQL, credential scope and referenced table versions.
+result_cache = ResultCache(
+    backend=create_result_cache_backend(
+        config.result_cache_backend,
+        max_bytes=config.result_cache_max_bytes,
+        path=config.result_cache_path,
+    ),
+    ttl_seconds=config.result_cache_ttl_seconds,
+)
+
+def _invalidate_results_on_change(kind: str, scope: str, object_id: str) -> None:
+    if kind == TABLE:
+        result_cache.invalidate_table(object_id)
+
+metadata_cache.add_listener(_invalidate_results_on_change)
+
+def _latest_schema_version(table_id: str):
+    metadata = metadata_cache.peek_latest_table(table_id)
+    return metadata.schema_version if metadata is not None else None
+
+# Question -> SQL plans from completed turns; create_agent() attaches its callbacks when PLAN_CACHE_ENABLED is set.
+plan_cache = PlanCache(
+    default_project=config.project_id,
+    max_entries=config.plan_cache_max_entries,
+    ttl_seconds=config.plan_cache_ttl_seconds,
+    min_similarity=config.plan_cache_min_similarity,
+    schema_lookup=_latest_schema_version,
+)
+
+def _invalidate_plans_on_change(kind: str, scope: str, object_id: str) -> None:
+    if kind == TABLE:
+        plan_cache.check_schema(object_id, _latest_schema_version(object_id))
+
+metadata_cache.add_listener(_invalidate_plans_on_change)
+
+# Dry-run guard that rejects queries scanning too much before they use any slot time.
+query_preflight = QueryPreflight(
+    enabled=config.query_preflight_enabled,
+    max_scan_bytes=config.max_scan_bytes,
+    maximum_bytes_billed=config.maximum_bytes_billed,
+    require_partition_filter=config.require_partition_filter,
+    partition_scan_min_bytes=config.partition_scan_min_bytes,
+)
+
+# Large results downloaded as Arrow (Storage Read API), so later pages are sliced locally.
+arrow_results = ArrowResultStore(max_bytes=config.result_arrow_cache_bytes)
+if arrow_results.enabled and config.result_arrow_min_rows > 0 and not storage_read_available():
+    logger.warning("google-cloud-bigquery-storage is not installed; large results are paged over REST "
+                   "(install the `arrow` extra)")
+
+# Local check of table and column names against cached schemas, before a query reaches BigQuery.
+sql_validator = SqlValidator(default_project=config.project_id, enabled=config.sql_validation_enabled)
+
+# Concurrent identical queries (same normalized SQL and credential scope) share one BigQuery job.
+single_flight = SingleFlight(enabled=config.single_flight_enabled)
+
+# Compact, token-budgeted rendering of result pages, summarizing what does not fit.
+result_formatter = ResultFormatter(fmt=config.result_format, max_tokens=config.result_max_tokens)
+
+# Optional local replica of the default table, created by start_replica_sync() when REPLICA_ENABLED is set.
+replica_router = None
+
+_SESSION_MEMO_PREFIX = "metadata_memo"
+
+def _get_context_token(tool_context: ToolContext = None) -> str:
+    """Returns the Gemini Enterprise managed OAuth token from ToolContext, if any."""
+    auth_id = config.gemini_enterprise_auth_id
+    if tool_context and tool_context.state and auth_id:
+        return tool_context.state.get(f"{auth_id}")
+    return None
+
 def get_authorized_bigquery_client(tool_context: ToolContext = None) -> bigquery.Client:
-    """Creates a BigQuery client using either ToolContext tokens or ADC."""
+    """Returns a pooled BigQuery client using either ToolContext tokens or ADC."""
     
     # 1. Check for Gemini Enterprise managed OAuth token in ToolContext
-    auth_id = config.gemini_enterprise_auth_id
-    if tool_context and tool_context.state and auth_id:
-        token = tool_context.state.get(f"{auth_id}")
-        if token:
-            logger.info("Using Gemini Enterprise managed OAuth token from ToolContext")
-            credentials = Credentials(token=token)
-            return bigquery.Client(
-                project=config.project_id,
-                credentials=credentials,
-                location=config.bigquery_location
-            )
+    token = _get_context_token(tool_context)
+    if token:
+        logger.info("Using Gemini Enterprise managed OAuth token from ToolContext")
+        return client_pool.get(token)
     
     # 2. Fallback to ADC (standard behavior)
     logger.info("Falling back to Application Default Credentials (ADC)")
-    return bigquery.Client(
-        project=config.project_id,
-        location=config.bigquery_location
+    return client_pool.get(None)
+
+def start_metadata_refresh(interval_seconds: float = None) -> None:
+    """Starts background revalidation of cached metadata, if an interval is configured."""
+    interval_seconds = interval_seconds or config.metadata_refresh_interval_seconds
+    if interval_seconds and interval_seconds > 0:
+        metadata_cache.start_background_refresh(interval_seconds, client_pool.get_cached)
+
+def start_replica_sync() -> None:
+    """Creates the local replica router and starts its periodic sync, if the replica is enabled."""
+    global replica_router
+    if not config.replica_enabled or replica_router is not None:
+        return
+    try:
+        from .replica import ReplicaRouter, TableReplica
+    except (ImportError, ValueError):
+        from replica import ReplicaRouter, TableReplica
+    try:
+        replica = TableReplica(
+            config.bigquery_table_id,
+            config.replica_dir,
+            client_getter=lambda: client_pool.get(None),
+            incremental_column=config.replica_incremental_column,
+            max_bytes=config.replica_max_bytes,
+        )
+    except ImportError as e:
+        logger.warning(f"Local replica disabled: {e}")
+        return
+    replica_router = ReplicaRouter(
+        replica, config.project_id, allow_user_credentials=config.replica_allow_user_credentials
     )
+    replica_router.start_periodic_sync(config.replica_sync_interval_seconds)
+
+def _read_session_memo(tool_context: ToolContext, key: str) -> str:
+    """Returns memoized tool output from the session state if it is still within the TTL."""
+    if not tool_context or not tool_context.state:
+        return None
+    memo = tool_context.state.get(key)
+    if not isinstance(memo, dict):
+        return None
+    if time.time() - memo.get("cached_at", 0) > config.metadata_cache_ttl_seconds:
+        return None
+    return memo.get("text")
+
+def _write_session_memo(tool_context: ToolContext, key: str, version: str, text: str) -> None:
+    """Stores tool output in the session state, skipping the write if the version is unchanged."""
+    if not tool_context or tool_context.state is None:
+        return
+    memo = tool_context.state.get(key)
+    if isinstance(memo, dict) and memo.get("version") == version and memo.get("text") == text:
+        return
+    tool_context.state[key] = {"version": version, "text": text, "cached_at": time.time()}
+
+def _format_schema(metadata: TableMetadata) -> str:
+    schema_info = [f"{column.name}: {column.field_type}" for column in metadata.columns]
+    return f"Schema for {metadata.table_id}:\n" + "\n".join(schema_info)
+
+def _result_cache_key(sql: str, scope: str, client_getter) -> tuple:
+    """Returns (cache key, referenced table ids) for a cacheable query, or (None, ()) otherwise.
+
+    Only deterministic, read-only queries over plain tables whose versions can be
+    looked up are cached; anything else always goes to BigQuery.
+    """
+    if not result_cache.enabled or not is_read_only(sql) or not is_deterministic(sql):
+        return None, ()
+    table_ids = []
+    for ref in extract_table_refs(sql):
+        table_id = qualify_table_id(ref, config.project_id)
+        if table_id is None:
+            return None, ()
+        table_ids.append(table_id)
+    if not table_ids:
+        return None, ()
+    try:
+        versions = {}
+        for table_id in table_ids:
+            metadata = metadata_cache.get_table(scope, table_id, client_getter)
+            if not metadata.is_static:
+                return None, ()
+            versions[table_id] = metadata.version
+    except Exception as e:
+        # Let the query itself surface the problem (e.g. a missing table)
+        logger.warning(f"Skipping result cache, could not resolve table versions: {e}")
+        return None, ()
+    return ResultCache.make_key(scope, normalize_sql(sql), versions), tuple(table_ids)
+
+def _cached_table_metadata(scope: str, client_getter):
+    """Returns a `table_id -> TableMetadata` lookup backed by the metadata cache that never raises."""
+    def lookup(table_id: str):
+        try:
+            return metadata_cache.get_table(scope, table_id, client_getter)
+        except Exception as e:
+            logger.warning(f"Could not load metadata for {table_id}: {e}")
+            return None
+    return lookup
+
+def make_result_handle(query_job) -> str:
+    """Returns an opaque handle for a finished query job: `project:location.job_id`."""
+    return f"{query_job.project}:{query_job.location}.{query_job.job_id}"
+
+def parse_result_handle(handle: str) -> tuple:
+    """Splits a result handle into (project, location, job_id); raises ValueError if malformed."""
+    prefix, _, job_id = handle.strip().rpartition(".")
+    project, _, location = prefix.rpartition(":")
+    if not (project and location and job_id):
+        raise ValueError(f"Invalid result handle: {handle}")
+    return project, location, job_id
+
+def _read_page(rows, max_rows: int, max_bytes: int) -> tuple:
+    """Reads at most `max_rows` rows and roughly `max_bytes` of text from a row iterator.
+
+    Returns (rows as dicts, whether the iterator had more rows). At least one row
+    is always returned so an oversized first row cannot stall paging.
+    """
+    page = []
+    size = 0
+    for row in rows:
+        if len(page) >= max_rows:
+            return page, True
+        row = dict(row)
+        size += len(str(row))
+        if page and size > max_bytes:
+            return page, True
+        page.append(row)
+    return page, False
+
+def _read_arrow_page(table, start_row: int) -> tuple:
+    """Like `_read_page`, for an Arrow table: only the rows on the page become Python objects."""
+    rows = iter_arrow_rows(table, start_row, chunk_rows=config.result_page_rows + 1)
+    return _read_page(rows, config.result_page_rows, config.result_page_max_bytes)
+
+def _format_page(rows: list, start_row: int, total_rows, has_more: bool, handle: str,
+                 tool_context: ToolContext = None, summary_source=None) -> str:
+    """Renders a page of rows plus, when truncated, instructions for fetching the rest."""
+    page = result_formatter.format_page(rows, start_row, total_rows, has_more, handle, summary_source)
+    record_format_stats(tool_context, page.output_bytes, page.output_tokens, page.format_ms, page.summarized)
+    return page.text
 
 def execute_sql(sql: str, tool_context: ToolContext = None) -> str:
     """
@@ -46,21 +298,214 @@ def execute_sql(sql: str, tool_context: ToolContext = None) -> str:
         tool_context: The ToolContext containing runtime information.
     """
     logger.info(f"Executing SQL: {sql}")
+    scope = credential_scope(_get_context_token(tool_context))
     client = get_authorized_bigquery_client(tool_context)
     
     try:
-        query_job = client.query(sql)
-        results = query_job.result()
-        
-        # Simple string representation for the agent
-        rows = [dict(row) for row in results]
-        if not rows:
-            return "No results found."
-        return str(rows)
+        cache_key, cache_tables = _result_cache_key(sql, scope, lambda: client)
+        if cache_key:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving query result from result cache")
+                record_query_stats(tool_context, cache_hit=True, engine="result_cache")
+                return cached
+
+        problem = sql_validator.validate(
+            sql,
+            table_metadata=lambda table_id: metadata_cache.peek_table(scope, table_id),
+            dataset_tables=lambda dataset_id: metadata_cache.peek_dataset(scope, dataset_id),
+        )
+        if problem:
+            return problem
+
+        if replica_router is not None:
+            replica_result = replica_router.execute(sql, scope, _cached_table_metadata(scope, lambda: client))
+            if replica_result is not None:
+                record_query_stats(tool_context, cache_hit=False, engine="replica")
+                return _format_replica_page(replica_result, 0, tool_context)
+
+        def run_query():
+            return _run_query(client, sql, scope, tool_context, cache_key, cache_tables)
+
+        if is_read_only(sql):
+            (response, query_job), shared = single_flight.do((scope, normalize_sql(sql)), run_query)
+        else:
+            (response, query_job), shared = run_query(), False
+        if shared:
+            record_query_stats(tool_context, cache_hit=True, engine="single_flight")
+        elif query_job is not None:
+            record_query_stats(tool_context, query_job)
+        return response
     except Exception as e:
         logger.error(f"Error executing BigQuery SQL: {e}")
         return f"Error executing query: {str(e)}"
 
+def _run_query(client, sql: str, scope: str, tool_context, cache_key, cache_tables) -> tuple:
+    """Runs a query on BigQuery and renders its first page; returns (response, job or None if rejected)."""
+    verdict = query_preflight.check(client, sql, scope, _cached_table_metadata(scope, lambda: client))
+    if not verdict.allowed:
+        return verdict.to_message(), None
+
+    query_job = client.query(sql, job_config=query_preflight.job_config())
+    track_job(query_job)
+    # Only the first page is pulled; the rest stays in the job's destination table
+    results = query_job.result(page_size=config.result_page_rows, max_results=config.result_page_rows + 1)
+
+    total_rows = getattr(results, "total_rows", None)
+    handle = make_result_handle(query_job)
+    rows, has_more = _read_page(results, config.result_page_rows, config.result_page_max_bytes)
+    if rows:
+        response = _format_page(rows, 0, total_rows, has_more, handle, tool_context)
+    else:
+        response = "No results found."
+    if cache_key:
+        result_cache.put(cache_key, response, cache_tables, query_job.total_bytes_processed)
+    return response, query_job
+
+def _download_large_result(client, query_job, key: tuple):
+    """Downloads a large result as Arrow and stores it under `key`; None if it should stay in BigQuery.
+
+    Called on the first `fetch_more_results` of a result, so `execute_sql` still
+    returns its first page without pulling the whole result into memory. Only
+    results of RESULT_ARROW_MIN_ROWS..RESULT_ARROW_MAX_ROWS rows that fit in
+    RESULT_ARROW_CACHE_BYTES (judged from the destination table's size before
+    downloading) qualify, and only when the Storage Read API library is
+    installed; otherwise every page is read over REST as before. A result that
+    does not qualify is remembered, so later pages go straight to REST.
+    """
+    if (
+        not arrow_results.enabled
+        or config.result_arrow_min_rows <= 0
+        or not storage_read_available()
+        or not query_job.destination
+        or arrow_results.is_rejected(key)
+    ):
+        return None
+    try:
+        destination = client.get_table(query_job.destination)
+    except Exception as e:
+        logger.warning(f"Could not read the size of {query_job.destination}, paging over REST instead: {e}")
+        return None
+    total_rows, total_bytes = destination.num_rows, destination.num_bytes
+    if (
+        not isinstance(total_rows, int)
+        or not config.result_arrow_min_rows <= total_rows <= config.result_arrow_max_rows
+        or not isinstance(total_bytes, int)
+        or total_bytes > arrow_results.max_bytes
+    ):
+        arrow_results.reject(key)
+        return None
+    try:
+        table = download_result_arrow(query_job)
+    except Exception as e:
+        logger.warning(f"Arrow download failed, paging over REST instead: {e}")
+        return None
+    if not arrow_results.put(key, table):
+        logger.info(f"Result {key[1]} is larger in Arrow than RESULT_ARROW_CACHE_BYTES; paging over REST from now on")
+    # The download serves this page either way
+    return table
+
+def _format_replica_page(result, start_row: int, tool_context: ToolContext = None) -> str:
+    """Renders a page of a replica result, noting which snapshot served it."""
+    page, has_more = _read_arrow_page(result.table, start_row)
+    if not page:
+        return "No results found." if start_row == 0 else "No more results."
+    text = _format_page(page, start_row, result.table.num_rows, has_more, result.handle, tool_context, result.table)
+    return f"{text}\n\n(Served from the local replica, table last modified {result.as_of}.)"
+
+def format_batch_results(queries: List[str], results: List[str]) -> str:
+    """Labels each query's result (or error) so the model can tell them apart."""
+    sections = []
+    for i, (sql, result) in enumerate(zip(queries, results), start=1):
+        sections.append(f"### Query {i}\nSQL: {sql}\nResult:\n{result}")
+    return "\n\n".join(sections)
+
+def _check_batch(queries: List[str]) -> str:
+    """Returns an error message if the batch cannot be run, otherwise None."""
+    if not queries:
+        return "Error: no queries provided."
+    if len(queries) > config.batch_max_queries:
+        return f"Error: at most {config.batch_max_queries} queries can be run in one batch."
+    return None
+
+def execute_sql_batch(queries: List[str], tool_context: ToolContext = None) -> str:
+    """
+    Executes several independent GoogleSQL queries in BigQuery concurrently.
+    
+    Use this tool instead of multiple execute_sql calls when a question needs several
+    queries that do not depend on each other's results (e.g. comparing this quarter
+    with last quarter). Each result is labelled with its query number.
+    
+    Args:
+        queries: The valid GoogleSQL queries to execute.
+        tool_context: The ToolContext containing runtime information.
+    """
+    logger.info(f"Executing batch of {len(queries)} queries")
+    error = _check_batch(queries)
+    if error:
+        return error
+
+    with ThreadPoolExecutor(max_workers=min(len(queries), config.batch_max_parallel)) as executor:
+        # Each query runs in a copy of the caller's context so its job is tracked for cancellation
+        futures = [
+            executor.submit(contextvars.copy_context().run, execute_sql, sql, tool_context)
+            for sql in queries
+        ]
+        results = [future.result() for future in futures]
+    return format_batch_results(queries, results)
+
+def fetch_more_results(handle: str, start_row: int, tool_context: ToolContext = None) -> str:
+    """
+    Fetches more rows of a previous execute_sql result without re-running the query.
+    
+    Use this tool only when execute_sql reported that more rows are available and
+    those rows are needed to answer the question.
+    
+    Args:
+        handle: The result handle returned by execute_sql.
+        start_row: The zero-based index of the first row to fetch.
+        tool_context: The ToolContext containing runtime information.
+    """
+    logger.info(f"Fetching more results for {handle} from row {start_row}")
+    scope = credential_scope(_get_context_token(tool_context))
+    client = get_authorized_bigquery_client(tool_context)
+    
+    try:
+        project, location, job_id = parse_result_handle(handle)
+        if replica_router is not None and project == replica_router.handle_project:
+            replica_result = replica_router.get_result(job_id)
+            if replica_result is None:
+                return "Error fetching results: this replica result has expired; run the query again."
+            return _format_replica_page(replica_result, max(0, int(start_row)), tool_context)
+        # Downloaded results are only served to the credentials that read them
+        arrow_key = (scope, handle.strip())
+        arrow_table = arrow_results.get(arrow_key)
+        if arrow_table is None:
+            query_job = client.get_job(job_id, project=project, location=location)
+            if not query_job.destination:
+                return f"Error fetching results: job {job_id} has no stored result table."
+            arrow_table = _download_large_result(client, query_job, arrow_key)
+        if arrow_table is not None:
+            rows, has_more = _read_arrow_page(arrow_table, max(0, int(start_row)))
+            if not rows:
+                return "No more results."
+            return _format_page(rows, max(0, int(start_row)), arrow_table.num_rows, has_more, handle, tool_context,
+                                arrow_table)
+        results = client.list_rows(
+            query_job.destination,
+            start_index=max(0, int(start_row)),
+            page_size=config.result_page_rows,
+            max_results=config.result_page_rows + 1,
+        )
+        rows, has_more = _read_page(results, config.result_page_rows, config.result_page_max_bytes)
+        if not rows:
+            return "No more results."
+        return _format_page(rows, max(0, int(start_row)), getattr(results, "total_rows", None), has_more, handle,
+                            tool_context)
+    except Exception as e:
+        logger.error(f"Error fetching more results: {e}")
+        return f"Error fetching results: {str(e)}"
+
 def list_tables(dataset_id: str, tool_context: ToolContext = None) -> str:
     """
     Lists all available tables in a specific BigQuery dataset.
@@ -73,14 +518,25 @@ def list_tables(dataset_id: str, tool_context: ToolContext = None) -> str:
         tool_context: The ToolContext containing runtime information.
     """
     logger.info(f"Listing tables in dataset: {dataset_id}")
-    client = get_authorized_bigquery_client(tool_context)
+    scope = credential_scope(_get_context_token(tool_context))
+    memo_key = f"{_SESSION_MEMO_PREFIX}:dataset:{dataset_id}"
     
     try:
-        tables = client.list_tables(dataset_id)
-        table_ids = [table.table_id for table in tables]
+        # Tier 1: per-session memo, used when the process cache has nothing fresh (e.g. a new replica)
+        if metadata_cache.peek_dataset(scope, dataset_id) is None:
+            memoized = _read_session_memo(tool_context, memo_key)
+            if memoized:
+                return memoized
+
+        # Tier 2: process-level cache, shared across sessions
+        table_ids = metadata_cache.list_tables(
+            scope, dataset_id, lambda: get_authorized_bigquery_client(tool_context)
+        )
         if not table_ids:
             return f"No tables found in dataset {dataset_id}."
-        return f"Tables in {dataset_id}: {', '.join(table_ids)}"
+        text = f"Tables in {dataset_id}: {', '.join(table_ids)}"
+        _write_session_memo(tool_context, memo_key, ",".join(table_ids), text)
+        return text
     except Exception as e:
         logger.error(f"Error listing tables: {e}")
         return f"Error listing tables: {str(e)}"
@@ -97,16 +553,39 @@ def get_table_schema(table_id: str, tool_context: ToolContext = None) -> str:
         tool_context: The ToolContext containing runtime information.
     """
     logger.info(f"Getting schema for table: {table_id}")
-    client = get_authorized_bigquery_client(tool_context)
+    scope = credential_scope(_get_context_token(tool_context))
+    memo_key = f"{_SESSION_MEMO_PREFIX}:table:{table_id}"
     
     try:
-        table = client.get_table(table_id)
-        schema_info = [f"{field.name}: {field.field_type}" for field in table.schema]
-        return f"Schema for {table_id}:\n" + "\n".join(schema_info)
+        # Tier 1: per-session memo, used when the process cache has nothing fresh (e.g. a new replica)
+        if metadata_cache.peek_table(scope, table_id) is None:
+            memoized = _read_session_memo(tool_context, memo_key)
+            if memoized:
+                return memoized
+
+        # Tier 2: process-level cache, shared across sessions
+        metadata = metadata_cache.get_table(
+            scope, table_id, lambda: get_authorized_bigquery_client(tool_context)
+        )
+        text = _format_schema(metadata)
+        _write_session_memo(tool_context, memo_key, metadata.version, text)
+        return text
     except Exception as e:
         logger.error(f"Error getting table schema: {e}")
         return f"Error getting table schema: {str(e)}"
 
-def get_bigquery_tools() -> list:
-    """Returns a list of custom context-aware BigQuery tools."""
-    return [execute_sql, list_tables, get_table_schema]
+def get_bigquery_tools(use_async: bool = None) -> list:
+    """Returns a list of custom context-aware BigQuery tools.
+
+    Unless `use_async` is False (or ASYNC_TOOLS=false), the non-blocking versions
+    from `async_tools` are returned so a running query never stalls the event loop.
+    """
+    if use_async is None:
+        use_async = config.async_tools
+    if use_async:
+        try:
+            from .async_tools import get_async_bigquery_tools
+        except (ImportError, ValueError):
+            from async_tools import get_async_bigquery_tools
+        return get_async_bigquery_tools()
+    return [execute_sql, execute_sql_batch, fetch_more_results, list_tables, get_table_schema]
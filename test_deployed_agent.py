@@ -1,6 +1,7 @@
 import vertexai
 from vertexai import agent_engines
 from sales_agent.config import config
+from sales_agent.streaming import StreamRenderer, format_timings
 
 def test_deployed_agent():
     if not config.agent_engine_id:
@@ -19,20 +20,20 @@ def test_deployed_agent():
         question = "What is the schema of the sales transactions table?"
         print(f"Querying agent: {question}")
         
+        # Time to first token is measured from here, so it includes the request round trip
+        renderer = StreamRenderer(prefix="")
         responses = remote_agent.stream_query(
             message=question,
-            user_id="test-user-001"
+            user_id="test-user-001",
+            run_config={"streaming_mode": "sse"} if config.streaming_enabled else None,
         )
         
         print("\nAgent Response:")
         for response in responses:
-            # ADK stream_query returns a sequence of events.
-            # We look for the final model response text.
-            if "content" in response and "parts" in response["content"]:
-                for part in response["content"]["parts"]:
-                    if "text" in part:
-                        print(part["text"], end="", flush=True)
-        print("\n")
+            # ADK stream_query returns a sequence of event dicts; partial text
+            # is printed as it arrives, tool calls as progress lines.
+            renderer.feed(response)
+        print(f"\n({format_timings(renderer.finish())})")
         
     except Exception as e:
         print(f"Error querying agent: {e}")
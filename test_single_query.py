@@ -1,6 +1,7 @@
 import asyncio
 import sys
-from sales_agent.agent import create_runner
+from sales_agent.agent import create_run_config, create_runner
+from sales_agent.streaming import StreamRenderer, format_timings
 from google.genai import types
 
 async def run_test_query(query: str):
@@ -12,16 +13,16 @@ async def run_test_query(query: str):
     print("-" * 50)
     
     # Using runner.run_async to manage the session and execution
+    renderer = StreamRenderer()
     async for event in runner.run_async(
         user_id=user_id,
         session_id=session_id,
-        new_message=types.Content(role='user', parts=[types.Part(text=query)])
+        new_message=types.Content(role='user', parts=[types.Part(text=query)]),
+        run_config=create_run_config(),
     ):
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if part.text:
-                    print(f"Agent: {part.text}")
+        renderer.feed(event)
     
+    print(f"({format_timings(renderer.finish())})")
     print("-" * 50)
 
 if __name__ == "__main__":
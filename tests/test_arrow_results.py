@@ -0,0 +1,164 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import MagicMock, call, patch
+import pyarrow as pa
+from benchmarks import arrow_results as arrow_benchmark
+from sales_agent.arrow_results import ArrowResultStore, iter_arrow_rows
+from sales_agent.tools import arrow_results, execute_sql, fetch_more_results, query_preflight, result_cache
+
+def token_context(token):
+    tool_context = MagicMock()
+    tool_context.state = {"auth": token}
+    return tool_context
+
+class TestArrowResults(unittest.TestCase):
+
+    def test_iter_arrow_rows_converts_lazily_from_start_row(self):
+        table = pa.table({"id": list(range(10))})
+        rows = iter_arrow_rows(table, start_row=7, chunk_rows=2)
+        self.assertEqual(next(rows), {"id": 7})
+        self.assertEqual(list(rows), [{"id": 8}, {"id": 9}])
+        self.assertEqual(list(iter_arrow_rows(table, start_row=10)), [])
+
+    def test_store_is_bounded_by_bytes(self):
+        table = pa.table({"id": list(range(100))})
+        store = ArrowResultStore(max_bytes=table.nbytes * 2)
+        store.put(("adc", "a"), table)
+        store.put(("adc", "b"), table)
+        store.get(("adc", "a"))
+        store.put(("adc", "c"), table)
+        self.assertIsNone(store.get(("adc", "b")))
+        self.assertIs(store.get(("adc", "a")), table)
+        self.assertIsNone(store.get(("token:other", "a")))
+        self.assertFalse(store.put(("adc", "huge"), pa.table({"id": list(range(1000))})))
+        self.assertTrue(store.is_rejected(("adc", "huge")))
+        self.assertEqual(store.stats()["entries"], 2)
+
+class TestArrowFastPath(unittest.TestCase):
+
+    def setUp(self):
+        arrow_results.clear()
+        result_cache.clear()
+        query_preflight.clear()
+
+    def large_result_client(self, mock_get_client, mock_config, num_bytes):
+        mock_config.result_page_rows = 2
+        mock_config.result_page_max_bytes = 10000
+        mock_config.result_arrow_min_rows = 5
+        mock_config.result_arrow_max_rows = 100
+        mock_config.gemini_enterprise_auth_id = None
+        client = MagicMock()
+        mock_get_client.return_value = client
+        query_job = client.query.return_value
+        query_job.project, query_job.location, query_job.job_id = "p", "US", "job_1"
+        client.get_job.return_value = query_job
+        client.get_table.return_value = MagicMock(num_rows=6, num_bytes=num_bytes)
+        first_page = MagicMock(total_rows=6)
+        first_page.__iter__.return_value = iter([{"id": i} for i in range(3)])
+        full_result = MagicMock()
+        full_result.to_arrow.return_value = pa.table({"id": list(range(6))})
+        query_job.result.side_effect = [first_page, full_result]
+        return client, full_result
+
+    @patch('sales_agent.tools.storage_read_available', return_value=True)
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_large_result_is_downloaded_on_first_fetch_and_paged_locally(self, mock_get_client, mock_config, _):
+        client, full_result = self.large_result_client(mock_get_client, mock_config, num_bytes=48)
+
+        first = execute_sql("SELECT id FROM `p.d.t`", tool_context=MagicMock())
+        self.assertTrue(first.startswith("id\n0\n1\n\n"))
+        self.assertIn('fetch_more_results(handle="p:US.job_1", start_row=2)', first)
+        # The first page never waits for the full download
+        full_result.to_arrow.assert_not_called()
+
+        second = fetch_more_results("p:US.job_1", 2, tool_context=MagicMock())
+        self.assertTrue(second.startswith("id\n2\n3"))
+        full_result.to_arrow.assert_called_once_with(create_bqstorage_client=True)
+        third = fetch_more_results("p:US.job_1", 4, tool_context=MagicMock())
+        self.assertTrue(third.startswith("id\n4\n5"))
+        self.assertEqual(client.get_job.call_count, 1)
+        client.list_rows.assert_not_called()
+
+    @patch('sales_agent.tools.storage_read_available', return_value=True)
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_result_larger_than_the_store_is_not_downloaded(self, mock_get_client, mock_config, _):
+        client, full_result = self.large_result_client(mock_get_client, mock_config,
+                                                       num_bytes=arrow_results.max_bytes + 1)
+        page = MagicMock(total_rows=6)
+        page.__iter__.return_value = iter([{"id": 2}, {"id": 3}, {"id": 4}])
+        client.list_rows.return_value = page
+
+        execute_sql("SELECT id FROM `p.d.t`", tool_context=MagicMock())
+        self.assertTrue(fetch_more_results("p:US.job_1", 2, tool_context=MagicMock()).startswith("id\n2\n3"))
+        full_result.to_arrow.assert_not_called()
+        self.assertEqual(arrow_results.stats()["entries"], 0)
+
+    @patch('sales_agent.tools.storage_read_available', return_value=True)
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_downloaded_result_is_not_served_to_other_credentials(self, mock_get_client, mock_config, _):
+        client, full_result = self.large_result_client(mock_get_client, mock_config, num_bytes=48)
+        mock_config.gemini_enterprise_auth_id = "auth"
+        owner, other = token_context("owner-token"), token_context("other-token")
+
+        execute_sql("SELECT id FROM `p.d.t`", tool_context=owner)
+        self.assertTrue(fetch_more_results("p:US.job_1", 2, tool_context=owner).startswith("id\n2\n3"))
+        client.get_job.side_effect = LookupError("Access Denied: Job p:US.job_1")
+        self.assertIn("Access Denied", fetch_more_results("p:US.job_1", 4, tool_context=other))
+        self.assertTrue(fetch_more_results("p:US.job_1", 4, tool_context=owner).startswith("id\n4\n5"))
+        full_result.to_arrow.assert_called_once()
+
+    @patch('sales_agent.tools.storage_read_available', return_value=True)
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_result_larger_in_arrow_than_the_store_is_downloaded_once(self, mock_get_client, mock_config, _):
+        client, full_result = self.large_result_client(mock_get_client, mock_config, num_bytes=48)
+        full_result.to_arrow.return_value = pa.table({"id": list(range(6)), "pad": ["x" * 1000] * 6})
+        client.list_rows.side_effect = lambda *args, start_index, **kwargs: MagicMock(
+            total_rows=6, __iter__=lambda _: iter([{"id": i} for i in range(start_index, 6)]))
+
+        with patch.object(arrow_results, "max_bytes", 1000):
+            execute_sql("SELECT id FROM `p.d.t`", tool_context=MagicMock())
+            self.assertTrue(fetch_more_results("p:US.job_1", 2, tool_context=MagicMock()).startswith("id\tpad\n2\t"))
+            self.assertTrue(fetch_more_results("p:US.job_1", 4, tool_context=MagicMock()).startswith("id\n4\n5"))
+        full_result.to_arrow.assert_called_once()
+        destination = client.query.return_value.destination
+        self.assertEqual([c for c in client.get_table.call_args_list if c.args == (destination,)], [call(destination)])
+        self.assertEqual(arrow_results.stats()["entries"], 0)
+
+    @patch('sales_agent.tools.storage_read_available', return_value=False)
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_rest_paging_without_storage_library(self, mock_get_client, mock_config, _):
+        mock_config.result_page_rows = 2
+        mock_config.result_page_max_bytes = 10000
+        mock_config.result_arrow_min_rows = 5
+        mock_config.result_arrow_max_rows = 100
+        client = MagicMock()
+        mock_get_client.return_value = client
+        query_job = client.query.return_value
+        query_job.project, query_job.location, query_job.job_id = "p", "US", "job_2"
+        page = MagicMock(total_rows=6)
+        page.__iter__.return_value = iter([{"id": i} for i in range(3)])
+        query_job.result.return_value = page
+
+        self.assertIn("Showing rows 1-2 of 6", execute_sql("SELECT id FROM `p.d.t`", tool_context=MagicMock()))
+        self.assertEqual(query_job.result.call_count, 1)
+        self.assertEqual(arrow_results.stats()["entries"], 0)
+
+class TestArrowBenchmark(unittest.TestCase):
+
+    def test_reports_every_path(self):
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            self.assertEqual(arrow_benchmark.main(["--rows", "300", "--repeats", "1", "--page-rows", "10"]), 0)
+        size = json.loads(out.getvalue())["sizes"][0]
+        self.assertEqual(set(size["paths"]), {"rest_dicts", "arrow_page", "arrow_dicts"})
+        self.assertTrue(all(path["rows"] == 300 for path in size["paths"].values()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import inspect
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from google.adk.tools.function_tool import FunctionTool
+from sales_agent import async_tools
+from sales_agent.job_tracking import track_job
+from sales_agent.tools import get_bigquery_tools
+
+class TestAsyncTools(unittest.TestCase):
+
+    def test_get_bigquery_tools_returns_async_versions(self):
+        tools = get_bigquery_tools(use_async=True)
+        self.assertEqual(
+            [tool.__name__ for tool in tools],
+            ["execute_sql", "execute_sql_batch", "fetch_more_results", "list_tables", "get_table_schema"],
+        )
+        self.assertTrue(all(inspect.iscoroutinefunction(tool) for tool in tools))
+
+    def test_function_declaration_matches_sync_tool(self):
+        declaration = FunctionTool(async_tools.execute_sql)._get_declaration()
+        if declaration.parameters is not None:
+            properties = declaration.parameters.properties
+        else:
+            properties = declaration.parameters_json_schema["properties"]
+        self.assertEqual(declaration.name, "execute_sql")
+        self.assertIn("sql", properties)
+        self.assertNotIn("tool_context", properties)
+
+    def test_event_loop_is_not_blocked(self):
+        release = threading.Event()
+
+        def slow_tool(sql, tool_context=None):
+            release.wait(5)
+            return "done"
+
+        async def scenario():
+            tool = async_tools._async_tool(slow_tool)
+            task = asyncio.create_task(tool("SELECT 1"))
+            # The loop keeps running other work while the tool blocks in the pool
+            await asyncio.sleep(0.05)
+            self.assertFalse(task.done())
+            release.set()
+            return await task
+
+        self.assertEqual(asyncio.run(scenario()), "done")
+
+    @patch('sales_agent.async_tools.config')
+    def test_timeout_cancels_bigquery_job(self, mock_config):
+        mock_config.tool_timeout_seconds = 0.05
+        job = MagicMock()
+        started = threading.Event()
+
+        def slow_query(sql, tool_context=None):
+            track_job(job)
+            started.set()
+            time.sleep(0.3)
+            return "late"
+
+        result = asyncio.run(async_tools._async_tool(slow_query)("SELECT 1"))
+
+        self.assertIn("timed out", result)
+        self.assertTrue(started.wait(1))
+        time.sleep(0.05)
+        job.cancel.assert_called_once()
+
+    @patch('sales_agent.async_tools.config')
+    def test_timeout_cancels_jobs_while_pool_is_saturated(self, mock_config):
+        mock_config.tool_timeout_seconds = 0.1
+        release = threading.Event()
+        job = MagicMock()
+        blocked = []
+
+        def blocked_query(sql, tool_context=None):
+            track_job(job)
+            blocked.append(sql)
+            release.wait(5)
+            return "late"
+
+        async def scenario():
+            # Every worker of the tool pool is busy, as when queries pile up and time out
+            tool = async_tools._async_tool(blocked_query)
+            return await asyncio.gather(*(tool(f"SELECT {i}") for i in range(2)))
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            with patch('sales_agent.async_tools._executor', pool):
+                results = asyncio.run(scenario())
+            self.assertTrue(all("timed out" in result for result in results))
+            deadline = time.monotonic() + 1
+            while job.cancel.call_count < len(blocked) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            # Cancelled while the workers that started the jobs are still blocked
+            self.assertEqual(job.cancel.call_count, len(blocked))
+            self.assertGreater(len(blocked), 0)
+        finally:
+            release.set()
+            pool.shutdown(wait=False)
+
+    def test_execute_sql_batch_runs_queries_concurrently(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        def query(sql, tool_context=None):
+            # Both queries must be in flight at the same time to pass the barrier
+            barrier.wait()
+            return f"rows for {sql}"
+
+        with patch.object(async_tools, 'execute_sql', async_tools._async_tool(query)):
+            result = asyncio.run(async_tools.execute_sql_batch(["SELECT 1", "SELECT 2"]))
+
+        self.assertIn("### Query 1\nSQL: SELECT 1\nResult:\nrows for SELECT 1", result)
+        self.assertIn("rows for SELECT 2", result)
+
+if __name__ == '__main__':
+    unittest.main()
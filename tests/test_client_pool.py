@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from sales_agent.client_pool import BigQueryClientPool, credential_scope, ADC_SCOPE
+
+class TestBigQueryClientPool(unittest.TestCase):
+
+    def test_credential_scope_hashes_token(self):
+        self.assertEqual(credential_scope(None), ADC_SCOPE)
+        scope = credential_scope("secret-token")
+        self.assertTrue(scope.startswith("token:"))
+        self.assertNotIn("secret-token", scope)
+        self.assertEqual(scope, credential_scope("secret-token"))
+
+    def test_clients_are_keyed_by_credential(self):
+        factory = MagicMock(side_effect=lambda token: MagicMock(name=f"client-{token}"))
+        pool = BigQueryClientPool(client_factory=factory)
+
+        adc = pool.get(None)
+        user_a = pool.get("token-a")
+        self.assertIs(pool.get(None), adc)
+        self.assertIs(pool.get("token-a"), user_a)
+        self.assertIsNot(pool.get("token-b"), user_a)
+
+        self.assertEqual(factory.call_count, 3)
+        self.assertEqual(pool.stats()["hits"], 2)
+        self.assertEqual(pool.stats()["misses"], 3)
+
+    def test_lru_eviction(self):
+        pool = BigQueryClientPool(client_factory=lambda token: MagicMock(), max_size=2)
+        first = pool.get("token-a")
+        pool.get("token-b")
+        pool.get("token-a")  # token-b is now least recently used
+        pool.get("token-c")
+
+        self.assertIs(pool.get("token-a"), first)
+        self.assertIsNone(pool.get_cached(credential_scope("token-b")))
+        self.assertEqual(pool.stats()["evictions"], 1)
+
+    @patch('sales_agent.client_pool.time.monotonic')
+    def test_token_clients_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        pool = BigQueryClientPool(client_factory=lambda token: MagicMock(), token_ttl_seconds=60)
+        token_client = pool.get("token-a")
+        adc_client = pool.get(None)
+
+        mock_monotonic.return_value = 1061.0
+        self.assertIsNot(pool.get("token-a"), token_client)
+        self.assertIs(pool.get(None), adc_client)
+        self.assertEqual(pool.stats()["expirations"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
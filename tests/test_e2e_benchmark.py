@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from google.cloud import bigquery
+from google.genai import types
+from benchmarks.e2e import compare, load_corpus
+from benchmarks.fakes import _conversation_position, _function_call_parts, create_sales_client
+
+TABLE_ID = "bench.sales.sales_transactions"
+
+class TestFakeBigQueryClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_sales_client(TABLE_ID, num_rows=500)
+
+    def test_query_translates_bigquery_sql(self):
+        job = self.client.query(
+            "SELECT region, SUM(revenue) AS revenue FROM `bench.sales.sales_transactions` "
+            "WHERE order_date >= DATE '2024-01-01' GROUP BY region ORDER BY region"
+        )
+        rows = [dict(row) for row in job.result()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {"region", "revenue"})
+        self.assertGreater(job.total_bytes_processed, 0)
+
+    def test_dry_run_validates_and_estimates_referenced_columns(self):
+        config = bigquery.QueryJobConfig(dry_run=True)
+        narrow = self.client.query(f"SELECT region FROM `{TABLE_ID}`", job_config=config)
+        wide = self.client.query(f"SELECT * FROM `{TABLE_ID}`", job_config=config)
+        self.assertLess(narrow.total_bytes_processed, wide.total_bytes_processed)
+        self.assertEqual([str(t) for t in narrow.referenced_tables], [TABLE_ID])
+        self.assertEqual(self.client.queries_run, 0)
+        with self.assertRaises(Exception):
+            self.client.query(f"SELECT no_such_column FROM `{TABLE_ID}`", job_config=config)
+
+    def test_list_rows_pages_through_job_destination(self):
+        job = self.client.query(f"SELECT transaction_id FROM `{TABLE_ID}` ORDER BY transaction_id")
+        same_job = self.client.get_job(job.job_id, project=job.project, location=job.location)
+        rows = list(self.client.list_rows(same_job.destination, start_index=100, max_results=3))
+        self.assertEqual([row["transaction_id"] for row in rows], [101, 102, 103])
+
+    def test_table_metadata(self):
+        table = self.client.get_table(TABLE_ID)
+        self.assertEqual(table.time_partitioning.field, "order_date")
+        self.assertEqual(table.num_rows, 500)
+        self.assertTrue(table.etag)
+        self.assertEqual(
+            [t.table_id for t in self.client.list_tables("bench.sales")], ["products", "sales_transactions"]
+        )
+
+class TestScriptedLlm(unittest.TestCase):
+
+    def test_conversation_position_counts_steps_since_latest_question(self):
+        call = types.Part(function_call=types.FunctionCall(name="execute_sql", args={}))
+        response = types.Part(function_response=types.FunctionResponse(name="execute_sql", response={"result": "rows"}))
+        contents = [
+            types.Content(role="user", parts=[types.Part(text="first question")]),
+            types.Content(role="model", parts=[call]),
+            types.Content(role="user", parts=[response]),
+            types.Content(role="model", parts=[types.Part(text="answer")]),
+            types.Content(role="user", parts=[types.Part(text="second question")]),
+            types.Content(role="model", parts=[call]),
+            types.Content(role="user", parts=[response]),
+        ]
+        self.assertEqual(_conversation_position(contents), ("second question", 1, "rows"))
+
+    def test_handle_placeholders_are_filled_from_paging_footer(self):
+        footer = 'More rows are available: call fetch_more_results(handle="p:US.job_1", start_row=100) ...'
+        step = {"tool": "fetch_more_results", "args": {"handle": "{handle}", "start_row": "{next_row}"}}
+        parts = _function_call_parts(step, footer)
+        self.assertEqual(parts[0].function_call.args, {"handle": "p:US.job_1", "start_row": 100})
+        self.assertEqual(_function_call_parts(step, "no footer"), [])
+
+class TestE2EBenchmark(unittest.TestCase):
+
+    def test_corpus_placeholders_are_filled(self):
+        corpus = load_corpus(os.path.join("benchmarks", "sales_questions.json"), TABLE_ID)
+        text = json.dumps(corpus)
+        for placeholder in ("{table_id}", "{dataset_id}", "{dataset_name}", "{project_id}"):
+            self.assertNotIn(placeholder, text)
+        self.assertIn("{handle}", text)
+
+    def test_compare_flags_more_round_trips_and_slower_questions(self):
+        baseline = {"questions": {"q": {"tool_calls": 1, "llm_round_trips": 2, "tool_errors": 0,
+                                        "prompt_tokens": 1000, "latency_s": 1.0, "answered": True}}}
+        report = {"questions": {"q": {"tool_calls": 1, "llm_round_trips": 3, "tool_errors": 0,
+                                      "prompt_tokens": 1100, "latency_s": 2.0, "answered": True}}}
+        regressions = compare(report, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("q.llm_round_trips"))
+
+    def test_runs_offline_and_answers_every_question(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_CLOUD_PROJECT", "BIGQUERY_TABLE_ID")}
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.e2e", "--write-baseline", output],
+                capture_output=True, text=True, env=env,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(output) as f:
+                report = json.load(f)
+        questions = report["questions"]
+        self.assertTrue(all(q["answered"] and q["tool_errors"] == 0 for q in questions.values()))
+        self.assertEqual(questions["large_orders_paged"]["tools"], ["execute_sql", "fetch_more_results"])
+        self.assertEqual(questions["top_customers_repeat"]["cache_hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from types import SimpleNamespace
+from typing import AsyncGenerator
+from google.adk.agents.llm_agent import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from sales_agent.instrumentation import (
+    Instrumentation, JsonlSink, PrometheusFileSink, percentile, record_query_stats, serve_prometheus,
+)
+
+class OneCallLlm(BaseLlm):
+    """Calls `lookup` once, then answers with the tool's result."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        last = llm_request.contents[-1].parts[0]
+        if last.function_response is None:
+            part = types.Part(function_call=types.FunctionCall(name="lookup", args={}))
+        else:
+            part = types.Part(text=str(last.function_response.response))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=100, candidates_token_count=7),
+        )
+
+def lookup(tool_context) -> str:
+    """Looks up the answer."""
+    job = SimpleNamespace(job_id="job-1", total_bytes_processed=2048, slot_millis=30, cache_hit=False)
+    record_query_stats(tool_context, job)
+    return "42"
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_partial_streaming_chunks_do_not_close_llm_span(self):
+        instrumentation = Instrumentation()
+        context = SimpleNamespace(invocation_id="inv", session=SimpleNamespace(id="s"))
+        instrumentation.before_model(callback_context=context, llm_request=None)
+        instrumentation.after_model(callback_context=context, llm_response=SimpleNamespace(partial=True))
+        self.assertEqual(instrumentation.summary()["latency"], {})
+        instrumentation.after_model(callback_context=context, llm_response=SimpleNamespace(partial=False))
+        self.assertEqual(instrumentation.summary()["latency"]["llm:generate_content"]["count"], 1)
+
+    def test_end_to_end_turn_with_in_memory_services(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = os.path.join(directory, "spans.jsonl")
+            prom_path = os.path.join(directory, "metrics.prom")
+            instrumentation = Instrumentation([JsonlSink(jsonl_path), PrometheusFileSink(prom_path)])
+            agent = Agent(name="test_agent", model=OneCallLlm(model="scripted"), tools=[lookup], **instrumentation.callbacks())
+            runner = InMemoryRunner(agent=agent, app_name="test")
+
+            async def run():
+                session = await runner.session_service.create_session(app_name="test", user_id="u")
+                message = types.Content(role="user", parts=[types.Part(text="What is the answer?")])
+                async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                    pass
+            asyncio.run(run())
+
+            with open(jsonl_path) as f:
+                spans = [json.loads(line) for line in f]
+            self.assertEqual([s["kind"] for s in spans], ["llm", "tool", "llm", "turn"])
+            tool_span = spans[1]
+            self.assertEqual(tool_span["name"], "lookup")
+            self.assertEqual(tool_span["attributes"]["job_ids"], ["job-1"])
+            self.assertEqual(tool_span["attributes"]["bytes_processed"], 2048)
+            self.assertEqual(tool_span["attributes"]["slot_ms"], 30)
+            self.assertEqual(tool_span["attributes"]["cache_misses"], 1)
+            turn = spans[3]["attributes"]
+            self.assertEqual((turn["llm_calls"], turn["tool_calls"], turn["prompt_tokens"]), (2, 1, 200))
+
+            summary = instrumentation.summary()
+            self.assertEqual(summary["counters"]["response_tokens"], 14)
+            self.assertIsNotNone(summary["latency"]["turn:test_agent"]["p99_ms"])
+            with open(prom_path) as f:
+                text = f.read()
+            self.assertIn('sales_agent_latency_seconds{kind="tool",name="lookup",quantile="0.95"}', text)
+            self.assertIn("sales_agent_bytes_processed_total 2048", text)
+
+    def test_metrics_endpoint(self):
+        instrumentation = Instrumentation()
+        server = serve_prometheus(instrumentation, port=0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+                self.assertIn("sales_agent_latency_seconds", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_record_query_stats_ignores_calls_outside_a_tool(self):
+        record_query_stats(None, SimpleNamespace(job_id="j"))
+        record_query_stats(SimpleNamespace(function_call_id=None), SimpleNamespace(job_id="j"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from benchmarks.load import create_session_service, find_ceiling, monitor_event_loop_lag, parse_mix, pick_questions
+
+CORPUS = [{"id": "a", "question": "A?"}, {"id": "b", "question": "B?"}, {"id": "c", "question": "C?"}]
+
+class TestLoadBenchmark(unittest.TestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("a=3, b"), {"a": 3.0, "b": 1.0})
+        self.assertEqual(parse_mix(""), {})
+
+    def test_pick_questions_respects_mix(self):
+        picked = pick_questions(CORPUS, {"a": 1, "c": 1}, random.Random(1), 50)
+        self.assertEqual({item["id"] for item in picked}, {"a", "c"})
+        self.assertEqual(len(pick_questions(CORPUS, {}, random.Random(1), 5)), 5)
+        with self.assertRaises(ValueError):
+            pick_questions(CORPUS, {"missing": 1}, random.Random(1), 1)
+
+    def test_find_ceiling(self):
+        levels = [
+            {"users": 1, "errors": 0, "latency_p99_s": 1.0},
+            {"users": 10, "errors": 0, "latency_p99_s": 2.0},
+            {"users": 50, "errors": 0, "latency_p99_s": 9.0},
+            {"users": 100, "errors": 3, "latency_p99_s": 1.0},
+        ]
+        self.assertEqual(find_ceiling(levels, 5.0), 10)
+        self.assertIsNone(find_ceiling(levels, 0.5))
+
+    def test_pluggable_session_backend(self):
+        service = create_session_service(
+            "google.adk.sessions.in_memory_session_service:InMemorySessionService", tempfile.gettempdir()
+        )
+        self.assertIsInstance(service, InMemorySessionService)
+        with self.assertRaises(ValueError):
+            create_session_service("redis", tempfile.gettempdir())
+
+    def test_event_loop_lag_monitor_sees_blocking_calls(self):
+        import time
+
+        async def scenario():
+            lags, stop = [], asyncio.Event()
+            monitor = asyncio.create_task(monitor_event_loop_lag(0.005, lags, stop))
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)  # blocks the loop
+            await asyncio.sleep(0.02)
+            stop.set()
+            await monitor
+            return lags
+        self.assertGreaterEqual(max(asyncio.run(scenario())), 0.05)
+
+    def test_runs_offline_with_concurrent_users(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "load.json")
+            env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_CLOUD_PROJECT", "BIGQUERY_TABLE_ID")}
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.load", "--users", "1,4", "--turns", "2", "--think-time-s", "0",
+                 "--ramp-up-s", "0", "--llm-latency-ms", "0", "--llm-latency-per-1k-tokens-ms", "0",
+                 "--query-latency-ms", "0", "--rows", "500", "--p99-slo-ms", "60000", "--output", output],
+                capture_output=True, text=True, env=env,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(output) as f:
+                report = json.load(f)
+        self.assertEqual([level["turns"] for level in report["levels"]], [2, 8])
+        self.assertTrue(all(level["errors"] == 0 for level in report["levels"]))
+        self.assertEqual(report["ceiling_users"], 4)
+
+if __name__ == '__main__':
+    unittest.main()
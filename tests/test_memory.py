@@ -0,0 +1,256 @@
+import asyncio
+import io
+import json
+import random
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from typing import AsyncGenerator
+from unittest.mock import patch
+from google.adk.agents.llm_agent import Agent
+from google.adk.events.event import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.sessions.session import Session
+from google.genai import types
+from benchmarks import memory as memory_benchmark
+from benchmarks.fakes import FakeMemoryBank
+from sales_agent import memory as memory_module
+from sales_agent.config import AgentConfig
+from sales_agent.memory import InvertedIndexMemoryService, MemoryIngestor
+
+WORDS = "revenue region europe quarter top customers laptops growth margin orders".split()
+
+def make_event(text, timestamp):
+    return Event(author="user", timestamp=timestamp, content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+def make_session(session_id, texts, user_id="u"):
+    session = Session(id=session_id, app_name="app", user_id=user_id)
+    session.events = [make_event(text, 1.7e9 + i) for i, text in enumerate(texts)]
+    return session
+
+def search_texts(service, query, user_id="u"):
+    response = asyncio.run(service.search_memory(app_name="app", user_id=user_id, query=query))
+    return [memory.content.parts[0].text for memory in response.memories]
+
+class FlakyService(BaseMemoryService):
+    """Fails the first `failures` calls, then records the sessions it was given."""
+
+    def __init__(self, failures=0, latency_s=0.0):
+        self.failures = failures
+        self.latency_s = latency_s
+        self.calls = 0
+        self.sessions = []
+
+    async def add_session_to_memory(self, session):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        if self.calls <= self.failures:
+            raise RuntimeError("503 Service Unavailable")
+        self.sessions.append((session.id, len(session.events)))
+
+    async def search_memory(self, *, app_name, user_id, query):
+        return SearchMemoryResponse()
+
+class TestInvertedIndexMemoryService(unittest.TestCase):
+
+    def test_matches_adk_in_memory_search(self):
+        rng = random.Random(3)
+        adk, index = InMemoryMemoryService(), InvertedIndexMemoryService()
+        sessions = [make_session(f"s{n}", [" ".join(rng.sample(WORDS, rng.randint(1, 5))) for _ in range(8)])
+                    for n in range(5)]
+        for session in sessions:
+            for service in (adk, index):
+                asyncio.run(service.add_session_to_memory(session))
+        # Later turns re-add a session with more events; a rewound session has fewer
+        sessions[0].events.append(make_event("europe laptops revenue", 1.8e9))
+        sessions[1].events = sessions[1].events[:2]
+        for session in sessions[:2]:
+            for service in (adk, index):
+                asyncio.run(service.add_session_to_memory(session))
+
+        for _ in range(30):
+            query = " ".join(rng.sample(WORDS, rng.randint(1, 4)))
+            self.assertEqual(search_texts(index, query), search_texts(adk, query), query)
+        self.assertEqual(index.stats()["events"], 8 * 3 + 9 + 2)
+
+    def test_non_ascii_words_match_inside_longer_words(self):
+        adk, index = InMemoryMemoryService(), InvertedIndexMemoryService()
+        session = make_session("s", ["私はPythonを使う", "売上は東京が一番", "Revenue in Tokyo"])
+        for service in (adk, index):
+            asyncio.run(service.add_session_to_memory(session))
+        for query in ("python", "東京", "売上 tokyo", "使う"):
+            self.assertEqual(search_texts(index, query), search_texts(adk, query), query)
+        self.assertEqual(search_texts(index, "python"), ["私はPythonを使う"])
+
+    def test_users_are_isolated(self):
+        index = InvertedIndexMemoryService()
+        asyncio.run(index.add_session_to_memory(make_session("s", ["europe revenue"], user_id="a")))
+        self.assertEqual(search_texts(index, "europe", user_id="b"), [])
+        self.assertEqual(search_texts(index, "europe", user_id="a"), ["europe revenue"])
+
+class TestMemoryIngestor(unittest.TestCase):
+
+    def test_write_behind_returns_before_ingestion_and_coalesces(self):
+        ingestor = MemoryIngestor(batch_size=10, flush_interval_seconds=10)
+        service = FlakyService(latency_s=0.2)
+        session = make_session("s", ["europe revenue"])
+
+        async def turns():
+            start = time.perf_counter()
+            for text in ("top customers", "laptops growth"):
+                await ingestor.ingest(service, session)
+                session.events.append(make_event(text, time.time()))
+            await ingestor.ingest(service, session)
+            return time.perf_counter() - start
+
+        self.assertLess(asyncio.run(turns()), 0.2)
+        self.assertTrue(ingestor.flush(timeout=5))
+        ingestor.close()
+        self.assertEqual(service.sessions, [("s", 3)])
+        stats = ingestor.stats()
+        self.assertEqual((stats["submitted"], stats["coalesced"], stats["ingested"]), (3, 2, 1))
+        self.assertEqual(stats["pending"], 0)
+
+    def test_failed_ingestion_is_retried_with_backoff(self):
+        ingestor = MemoryIngestor(flush_interval_seconds=0, max_retries=3, retry_backoff_seconds=0.01)
+        service = FlakyService(failures=2)
+        asyncio.run(ingestor.ingest(service, make_session("s", ["europe"])))
+        self.assertTrue(ingestor.flush(timeout=5))
+        ingestor.close()
+        self.assertEqual(service.calls, 3)
+        stats = ingestor.stats()
+        self.assertEqual((stats["retries"], stats["ingested"], stats["failed"]), (2, 1, 0))
+
+    def test_gives_up_after_max_retries(self):
+        ingestor = MemoryIngestor(write_behind=False, max_retries=1, retry_backoff_seconds=0.01)
+        service = FlakyService(failures=5)
+        self.assertFalse(asyncio.run(ingestor.ingest(service, make_session("s", ["europe"]))))
+        self.assertEqual(service.calls, 2)
+        self.assertEqual(ingestor.stats()["failed"], 1)
+
+    def test_full_queue_applies_backpressure_then_drops(self):
+        ingestor = MemoryIngestor(batch_size=10, flush_interval_seconds=10, max_pending=1,
+                                  enqueue_timeout_seconds=0.05)
+        service = FlakyService()
+
+        async def turns():
+            return [await ingestor.ingest(service, make_session(f"s{n}", ["europe"])) for n in range(2)]
+
+        self.assertEqual(asyncio.run(turns()), [True, False])
+        stats = ingestor.stats()
+        self.assertEqual((stats["dropped"], stats["backpressure_waits"]), (1, 1))
+        ingestor.close(timeout=5)
+        self.assertEqual(service.sessions, [("s0", 1)])
+
+    def test_inline_mode_ingests_before_returning(self):
+        ingestor = MemoryIngestor(write_behind=False)
+        bank = FakeMemoryBank()
+        self.assertTrue(asyncio.run(ingestor.ingest(bank, make_session("s", ["europe revenue"]))))
+        self.assertEqual(search_texts(bank, "europe"), ["europe revenue"])
+        self.assertEqual(ingestor.stats()["mode"], "inline")
+
+    def test_after_agent_callback_ingests_into_runner_memory(self):
+
+        class EchoLlm(BaseLlm):
+            async def generate_content_async(self, llm_request, stream=False) -> AsyncGenerator[LlmResponse, None]:
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Europe led revenue.")]))
+
+        ingestor = MemoryIngestor(flush_interval_seconds=0)
+        agent = Agent(name="test_agent", model=EchoLlm(model="echo"), **ingestor.callbacks())
+        runner = InMemoryRunner(agent=agent, app_name="app")
+        runner.memory_service = InvertedIndexMemoryService()
+
+        async def turn():
+            session = await runner.session_service.create_session(app_name="app", user_id="u")
+            message = types.Content(role="user", parts=[types.Part(text="Which region led?")])
+            async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                pass
+
+        memory_module._warned_private_lookup.clear()
+        with self.assertLogs("sales_agent.memory", "WARNING") as logs:
+            asyncio.run(turn())
+        self.assertIn("private invocation context", logs.output[0])
+        self.assertTrue(ingestor.flush(timeout=5))
+        ingestor.close()
+        self.assertEqual(search_texts(runner.memory_service, "region led"),
+                         ["Which region led?", "Europe led revenue."])
+
+    def test_after_agent_uses_the_memory_service_it_was_given(self):
+
+        class EchoLlm(BaseLlm):
+            async def generate_content_async(self, llm_request, stream=False) -> AsyncGenerator[LlmResponse, None]:
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Europe led revenue.")]))
+
+        service = InvertedIndexMemoryService()
+        ingestor = MemoryIngestor(flush_interval_seconds=0, memory_service=service)
+        agent = Agent(name="test_agent", model=EchoLlm(model="echo"), **ingestor.callbacks())
+        runner = InMemoryRunner(agent=agent, app_name="app")
+
+        async def turn():
+            session = await runner.session_service.create_session(app_name="app", user_id="u")
+            message = types.Content(role="user", parts=[types.Part(text="Which region led?")])
+            async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                pass
+
+        with patch("sales_agent.memory._memory_service") as private_lookup:
+            asyncio.run(turn())
+        private_lookup.assert_not_called()
+        self.assertTrue(ingestor.flush(timeout=5))
+        ingestor.close()
+        self.assertEqual(search_texts(service, "region led"), ["Which region led?", "Europe led revenue."])
+
+    def test_inline_after_agent_uses_callback_context_api(self):
+
+        class EchoLlm(BaseLlm):
+            async def generate_content_async(self, llm_request, stream=False) -> AsyncGenerator[LlmResponse, None]:
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Europe led revenue.")]))
+
+        ingestor = MemoryIngestor(write_behind=False)
+        agent = Agent(name="test_agent", model=EchoLlm(model="echo"), **ingestor.callbacks())
+        runner = InMemoryRunner(agent=agent, app_name="app")
+        runner.memory_service = FlakyService()
+
+        async def turn():
+            session = await runner.session_service.create_session(app_name="app", user_id="u")
+            message = types.Content(role="user", parts=[types.Part(text="Which region led?")])
+            async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                pass
+            return session.id
+
+        session_id = asyncio.run(turn())
+        self.assertEqual(runner.memory_service.sessions, [(session_id, 2)])
+        self.assertEqual(ingestor.stats()["ingested"], 1)
+
+    def test_unknown_ingestion_mode_is_rejected(self):
+        env = {"GOOGLE_CLOUD_PROJECT": "p", "GOOGLE_CLOUD_LOCATION": "us-central1", "BIGQUERY_TABLE_ID": "p.d.t",
+               "MEMORY_INGESTION": "write-behind"}
+        with patch.dict("os.environ", env), self.assertRaises(ValueError) as raised:
+            AgentConfig.from_env()
+        self.assertIn("MEMORY_INGESTION", str(raised.exception))
+        with patch.dict("os.environ", {**env, "MEMORY_INGESTION": "Inline"}):
+            self.assertEqual(AgentConfig.from_env().memory_ingestion, "inline")
+        # Ingestion is opt-in, so deployments do not start writing every turn to Memory Bank
+        del env["MEMORY_INGESTION"]
+        with patch.dict("os.environ", env, clear=True):
+            self.assertEqual(AgentConfig.from_env().memory_ingestion, "none")
+
+class TestMemoryBenchmark(unittest.TestCase):
+
+    def test_reports_both_modes_and_search(self):
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            self.assertEqual(memory_benchmark.main([
+                "--users", "3", "--turns", "2", "--turn-ms", "0", "--bank-latency-ms", "5", "--failure-rate", "0",
+                "--flush-interval-s", "0.05", "--events", "300", "--queries", "5",
+            ]), 0)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report["ingestion"]), {"inline", "write_behind"})
+        self.assertTrue(all(mode["ingestor"]["pending"] == 0 for mode in report["ingestion"].values()))
+        self.assertEqual(report["search"]["identical_results"], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from google.cloud import bigquery
+from sales_agent.metadata_cache import MetadataCache, TableMetadata, TABLE
+
+def make_table(etag, fields=("revenue",)):
+    table = bigquery.Table("p.d.t", schema=[bigquery.SchemaField(name, "NUMERIC") for name in fields])
+    table._properties["etag"] = etag
+    return table
+
+class TestMetadataCache(unittest.TestCase):
+
+    def test_table_metadata_from_table(self):
+        table = make_table("v1")
+        table.time_partitioning = bigquery.TimePartitioning(field="order_date")
+        table.clustering_fields = ["region"]
+
+        metadata = TableMetadata.from_table("p.d.t", table)
+
+        self.assertEqual([c.name for c in metadata.columns], ["revenue"])
+        self.assertEqual(metadata.partitioning_field, "order_date")
+        self.assertEqual(metadata.clustering_fields, ("region",))
+        self.assertEqual(metadata.etag, "v1")
+
+    def test_hit_after_first_load(self):
+        cache = MetadataCache()
+        client = MagicMock()
+        client.get_table.return_value = make_table("v1")
+
+        cache.get_table("adc", "p.d.t", lambda: client)
+        cache.get_table("adc", "p.d.t", lambda: client)
+
+        client.get_table.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertIsNotNone(cache.peek_table("adc", "p.d.t"))
+        self.assertIsNone(cache.peek_table("token:other", "p.d.t"))
+
+    def test_schema_version_ignores_data_changes(self):
+        cache = MetadataCache()
+        client = MagicMock()
+        client.get_table.return_value = make_table("v1")
+        first = cache.get_table("token:a", "p.d.t", lambda: client)
+        client.get_table.return_value = make_table("v2")
+        second = cache.reload(TABLE, "adc", "p.d.t", client)
+
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(first.schema_version, second.schema_version)
+        self.assertNotEqual(TableMetadata.from_table("p.d.t", make_table("v2", ("revenue", "cost"))).schema_version,
+                            second.schema_version)
+        self.assertIs(cache.peek_latest_table("p.d.t"), second)
+        self.assertIsNone(cache.peek_latest_table("p.d.other"))
+
+    @patch('sales_agent.metadata_cache.time.monotonic')
+    def test_expired_entry_is_reloaded(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        cache = MetadataCache(ttl_seconds=10)
+        client = MagicMock()
+        client.get_table.return_value = make_table("v1")
+        cache.get_table("adc", "p.d.t", lambda: client)
+
+        mock_monotonic.return_value = 11.0
+        self.assertIsNone(cache.peek_table("adc", "p.d.t"))
+        cache.get_table("adc", "p.d.t", lambda: client)
+        self.assertEqual(client.get_table.call_count, 2)
+
+    def test_refresh_notifies_listeners_on_change(self):
+        cache = MetadataCache()
+        listener = MagicMock()
+        cache.add_listener(listener)
+        client = MagicMock()
+        client.get_table.return_value = make_table("v1")
+        cache.get_table("adc", "p.d.t", lambda: client)
+
+        # Unchanged etag: no notification
+        self.assertEqual(cache.refresh(lambda scope: client), 0)
+        listener.assert_not_called()
+
+        client.get_table.return_value = make_table("v2", fields=("revenue", "region"))
+        self.assertEqual(cache.refresh(lambda scope: client), 1)
+        listener.assert_called_once_with(TABLE, "adc", "p.d.t")
+        self.assertEqual(len(cache.peek_table("adc", "p.d.t").columns), 2)
+
+    def test_lru_bound(self):
+        cache = MetadataCache(max_entries=1)
+        client = MagicMock()
+        client.list_tables.return_value = []
+        cache.list_tables("adc", "p.a", lambda: client)
+        cache.list_tables("adc", "p.b", lambda: client)
+
+        self.assertIsNone(cache.peek_dataset("adc", "p.a"))
+        self.assertEqual(cache.peek_dataset("adc", "p.b"), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import asyncio
+import time
+import unittest
+from typing import AsyncGenerator
+from google.adk.agents.llm_agent import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from sales_agent.plan_cache import PlanCache, QuestionShape, bind_numbers, is_failed_response
+
+TOP_SQL = (
+    "SELECT customer_name, SUM(revenue) AS total FROM `p.sales.tx` "
+    "WHERE order_date BETWEEN DATE '2024-01-01' AND DATE '2024-12-31' GROUP BY 1 ORDER BY total DESC LIMIT 5"
+)
+TOP_QUESTION = "Show me the top 5 customers by revenue in 2024"
+
+model_calls = []
+executed = []
+
+class PlanningLlm(BaseLlm):
+    """Plans one execute_sql call for a question, then answers with its result."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        model_calls.append(llm_request)
+        last = llm_request.contents[-1].parts[0]
+        if last.function_response is None:
+            part = types.Part(function_call=types.FunctionCall(name="execute_sql", args={"sql": TOP_SQL}))
+        else:
+            part = types.Part(text=str(last.function_response.response))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+def execute_sql(sql: str, tool_context) -> str:
+    """Runs a query."""
+    executed.append(sql)
+    return "[{'customer_name': 'Acme', 'total': 10.0}]"
+
+class TestPlanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.schemas = {"p.sales.tx": "v1"}
+        self.cache = PlanCache("p", schema_lookup=self.schemas.get)
+
+    def test_question_shape(self):
+        shape = QuestionShape.parse("Show me the top 5 Customers by revenue in 2024?")
+        self.assertEqual(shape.content, ("top", "customer", "revenue"))
+        self.assertEqual(shape.numbers, ("5", "2024"))
+
+    def test_bind_numbers_swaps_literals_in_one_pass(self):
+        self.assertEqual(
+            bind_numbers("SELECT 5 AS `t2024`, x2024 FROM t WHERE d >= '2024-01-01' LIMIT 2024",
+                         {"5": "2024", "2024": "2025"}),
+            "SELECT 2024 AS `t2024`, x2024 FROM t WHERE d >= '2025-01-01' LIMIT 2025",
+        )
+
+    def test_parameterized_hit_binds_new_numbers(self):
+        self.cache.record(TOP_QUESTION, [("execute_sql", {"sql": TOP_SQL})])
+        _, calls = self.cache.lookup("Remind me who the top 10 customers by revenue were in 2025")
+        sql = calls[0][1]["sql"]
+        self.assertIn("DATE '2025-01-01' AND DATE '2025-12-31'", sql)
+        self.assertTrue(sql.endswith("LIMIT 10"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_different_content_words_or_literal_numbers_miss(self):
+        self.cache.record(TOP_QUESTION, [("execute_sql", {"sql": TOP_SQL})])
+        self.cache.record("Revenue for Q1 2024", [("execute_sql", {"sql": "SELECT SUM(revenue) FROM `p.sales.tx` "
+                                                   "WHERE order_date BETWEEN '2024-01-01' AND '2024-03-31'"})])
+        self.assertIsNone(self.cache.lookup("Show me the bottom 5 customers by revenue in 2024"))
+        self.assertIsNone(self.cache.lookup("Show me the top 5 products by revenue in 2024"))
+        # "1" in Q1 is not in the SQL, so it is a literal and Q2 must not reuse the Q1 plan
+        self.assertIsNone(self.cache.lookup("Revenue for Q2 2024"))
+        self.assertIsNotNone(self.cache.lookup("Revenue for Q1 2023"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["lookups"], stats["hits"]), (4, 1))
+        self.assertEqual(stats["hit_rate"], 0.25)
+
+    def test_logical_and_directional_words_must_match(self):
+        sql = "SELECT COUNT(DISTINCT customer_id) FROM `p.sales.tx` WHERE product IN ('Laptop', 'Phone')"
+        self.cache.record("customers who bought laptops or phones", [("execute_sql", {"sql": sql})])
+        self.assertIsNone(self.cache.lookup("customers who bought laptops and phones"))
+        sql = "SELECT SUM(revenue) FROM `p.sales.tx` WHERE ship_from = 'Asia' AND ship_to = 'Europe'"
+        self.cache.record("revenue from Asia to Europe", [("execute_sql", {"sql": sql})])
+        self.assertIsNone(self.cache.lookup("revenue from Europe to Asia"))
+        self.assertIsNone(self.cache.lookup("revenue to Asia from Europe"))
+        self.assertIsNotNone(self.cache.lookup("show the revenue from Asia to Europe"))
+
+    def test_similarity_threshold(self):
+        cache = PlanCache("p", min_similarity=0.99)
+        cache.record(TOP_QUESTION, [("execute_sql", {"sql": TOP_SQL})])
+        self.assertIsNone(cache.lookup("Remind me who the top 5 customers by revenue were in 2024"))
+        self.assertIsNotNone(cache.lookup(TOP_QUESTION))
+        self.assertEqual(cache.stats()["below_threshold"], 1)
+
+    def test_schema_change_invalidates(self):
+        self.cache.record(TOP_QUESTION, [("execute_sql", {"sql": TOP_SQL})])
+        self.assertEqual(self.cache.check_schema("p.sales.tx", "v1"), 0)
+        self.schemas["p.sales.tx"] = "v2"
+        self.assertIsNone(self.cache.lookup(TOP_QUESTION))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+        self.cache.record(TOP_QUESTION, [("execute_sql", {"sql": TOP_SQL})])
+        self.assertEqual(self.cache.check_schema("p.sales.tx", "v3"), 1)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_bounded_with_lru_eviction_and_ttl(self):
+        cache = PlanCache("p", max_entries=2, ttl_seconds=60)
+        for word in ("alpha", "beta", "gamma"):
+            cache.record(f"{word} revenue", [("execute_sql", {"sql": "SELECT 1 FROM `p.sales.tx`"})])
+        self.assertIsNone(cache.lookup("alpha revenue"))
+        self.assertIsNotNone(cache.lookup("gamma revenue"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        for plan in cache._plans.values():
+            plan.stored_at = time.time() - 120
+        self.assertIsNone(cache.lookup("gamma revenue"))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_unqualified_tables_are_not_recorded(self):
+        self.assertIsNone(self.cache.record("count rows", [("execute_sql", {"sql": "SELECT COUNT(*) FROM t"})]))
+        self.assertTrue(is_failed_response("Error executing query: 400 Unrecognized name"))
+
+    def test_repeated_question_skips_planning_round_trip(self):
+        executed.clear()
+        model_calls.clear()
+        agent = Agent(name="test_agent", model=PlanningLlm(model="planner"), tools=[execute_sql], **self.cache.callbacks())
+        runner = InMemoryRunner(agent=agent, app_name="test")
+
+        async def ask(question):
+            session = await runner.session_service.create_session(app_name="test", user_id="u")
+            message = types.Content(role="user", parts=[types.Part(text=question)])
+            async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                pass
+
+        asyncio.run(ask(TOP_QUESTION))
+        self.assertEqual((len(model_calls), len(executed)), (2, 1))
+        asyncio.run(ask("Show me the top 3 customers by revenue in 2024"))
+        # Only the answering call reached the model; the SQL came from the cache
+        self.assertEqual((len(model_calls), len(executed)), (3, 2))
+        self.assertTrue(executed[1].endswith("LIMIT 3"))
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_follow_up_only_replays_after_the_same_conversation(self):
+        executed.clear()
+        model_calls.clear()
+        agent = Agent(name="test_agent", model=PlanningLlm(model="planner"), tools=[execute_sql], **self.cache.callbacks())
+        runner = InMemoryRunner(agent=agent, app_name="test")
+
+        async def conversation(*questions):
+            session = await runner.session_service.create_session(app_name="test", user_id="u")
+            for question in questions:
+                message = types.Content(role="user", parts=[types.Part(text=question)])
+                async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+                    pass
+
+        asyncio.run(conversation(TOP_QUESTION, "What about Asia?"))
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        # Asked first in a new session, the follow-up's recorded SQL would answer a different question
+        asyncio.run(conversation("What about Asia?"))
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        # After the same earlier question it is the same follow-up
+        asyncio.run(conversation(TOP_QUESTION, "What about Asia?"))
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
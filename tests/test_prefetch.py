@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from google.cloud import bigquery
+from sales_agent.metadata_cache import MetadataCache
+from sales_agent.prefetch import SchemaPrefetcher, render_schema_context
+
+def make_client(etag="v1", description="Order total in USD"):
+    client = MagicMock()
+    table = bigquery.Table("p.d.sales", schema=[
+        bigquery.SchemaField("order_date", "DATE"),
+        bigquery.SchemaField("revenue", "NUMERIC", description=description),
+    ])
+    table.time_partitioning = bigquery.TimePartitioning(field="order_date")
+    table.clustering_fields = ["region"]
+    table._properties["etag"] = etag
+    client.get_table.return_value = table
+    listed = MagicMock()
+    listed.table_id = "sales"
+    client.list_tables.return_value = [listed]
+    return client
+
+class TestSchemaPrefetcher(unittest.TestCase):
+
+    def test_prefetch_renders_compact_context(self):
+        client = make_client()
+        prefetcher = SchemaPrefetcher(MetadataCache(), lambda: client, "p.d.sales")
+        prefetcher.prefetch()
+
+        context = prefetcher.context()
+        self.assertIn("Table `p.d.sales` (partitioned by DAY on `order_date`; clustered by region):", context)
+        self.assertIn("- revenue: NUMERIC — Order total in USD", context)
+        self.assertIn("Tables in `p.d`: sales", context)
+        self.assertEqual(prefetcher.prefetched_table_ids, ["p.d.sales"])
+
+    def test_prefetched_schema_warms_metadata_cache(self):
+        cache = MetadataCache()
+        client = make_client()
+        SchemaPrefetcher(cache, lambda: client, "p.d.sales").prefetch()
+
+        self.assertIsNotNone(cache.peek_table("adc", "p.d.sales"))
+        self.assertEqual(cache.peek_dataset("adc", "p.d"), ["sales"])
+
+    def test_change_detected_elsewhere_updates_context(self):
+        cache = MetadataCache()
+        prefetcher = SchemaPrefetcher(cache, lambda: make_client(), "p.d.sales")
+        prefetcher.prefetch()
+
+        # Another lookup (e.g. the background refresher) sees a new version of the table
+        cache.refresh(lambda scope: make_client(etag="v2", description="Net revenue"))
+
+        self.assertIn("Net revenue", prefetcher.context())
+
+    def test_render_without_metadata(self):
+        self.assertEqual(render_schema_context(None, "p.d", None), "")
+
+class TestBuildInstruction(unittest.TestCase):
+
+    def test_prefetched_tables_relax_schema_rule(self):
+        from sales_agent.agent import build_instruction
+
+        plain = build_instruction()
+        prefetched = build_instruction("Table `p.d.sales`:\n- revenue: NUMERIC", ["p.d.sales"])
+
+        self.assertNotIn("Prefetched Metadata:", plain)
+        self.assertIn("Prefetched Metadata:\nTable `p.d.sales`", prefetched)
+        self.assertIn("except `p.d.sales`", prefetched)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import ANY, MagicMock
+from google.cloud import bigquery
+from sales_agent.metadata_cache import ColumnInfo, TableMetadata
+from sales_agent.preflight import QueryPreflight, format_bytes, referenced_columns
+
+GiB = 1024 ** 3
+
+def make_client(estimated_bytes, tables=("p.d.sales",), unfiltered_bytes=None):
+    """A client whose dry runs estimate `estimated_bytes`, or `unfiltered_bytes` for the unfiltered column scan."""
+    client = MagicMock()
+    refs = [bigquery.TableReference.from_string(t) for t in tables]
+
+    def query(sql, job_config=None):
+        unfiltered = unfiltered_bytes is not None and sql.startswith("SELECT `")
+        return MagicMock(total_bytes_processed=unfiltered_bytes if unfiltered else estimated_bytes,
+                         referenced_tables=refs)
+
+    client.query.side_effect = query
+    return client
+
+PARTITIONED = TableMetadata(
+    table_id="p.d.sales",
+    columns=tuple(ColumnInfo(name, field_type) for name, field_type in
+                  (("order_date", "DATE"), ("region", "STRING"), ("revenue", "FLOAT64"))),
+    partitioning_field="order_date",
+)
+
+class TestQueryPreflight(unittest.TestCase):
+
+    def test_allows_small_query(self):
+        preflight = QueryPreflight(max_scan_bytes=10 * GiB)
+        verdict = preflight.check(make_client(GiB), "SELECT 1 FROM p.d.sales", "adc", lambda t: None)
+
+        self.assertTrue(verdict.allowed)
+        self.assertEqual(verdict.estimated_bytes, GiB)
+        self.assertEqual(verdict.referenced_tables, ("p.d.sales",))
+
+    def test_rejects_scan_over_limit(self):
+        preflight = QueryPreflight(max_scan_bytes=10 * GiB)
+        verdict = preflight.check(make_client(20 * GiB), "SELECT * FROM p.d.sales", "adc", lambda t: None)
+
+        self.assertFalse(verdict.allowed)
+        self.assertIn("20.0 GiB", verdict.to_message())
+        self.assertIn("10.0 GiB limit", verdict.to_message())
+        self.assertIn("Suggestion", verdict.to_message())
+
+    def test_rejects_partitioned_scan_without_filter(self):
+        preflight = QueryPreflight(partition_scan_min_bytes=GiB)
+        client = make_client(5 * GiB, unfiltered_bytes=5 * GiB)
+
+        verdict = preflight.check(client, "SELECT SUM(revenue) FROM p.d.sales", "adc", lambda t: PARTITIONED)
+        self.assertFalse(verdict.allowed)
+        self.assertIn("order_date", verdict.suggestion)
+        client.query.assert_called_with("SELECT `revenue` FROM `p.d.sales`", job_config=ANY)
+
+    def test_partition_filter_is_judged_by_pruned_bytes(self):
+        preflight = QueryPreflight(partition_scan_min_bytes=GiB)
+        pruned = make_client(2 * GiB, unfiltered_bytes=5 * GiB)
+        filtered = "SELECT SUM(revenue) FROM p.d.sales WHERE order_date >= '2024-01-01'"
+        self.assertTrue(preflight.check(pruned, filtered, "adc", lambda t: PARTITIONED).allowed)
+
+        # Mentioning the partition column is not enough when every partition is still read
+        unpruned = make_client(5 * GiB, unfiltered_bytes=5 * GiB)
+        for sql in ("SELECT SUM(revenue) FROM p.d.sales WHERE order_date IS NOT NULL",
+                    "SELECT SUM(revenue) FROM p.d.sales WHERE order_date = order_date"):
+            verdict = preflight.check(unpruned, sql, "adc", lambda t: PARTITIONED)
+            self.assertFalse(verdict.allowed, sql)
+            self.assertIn("IS NOT NULL", verdict.suggestion)
+
+    def test_small_partitioned_scan_is_allowed(self):
+        preflight = QueryPreflight(partition_scan_min_bytes=GiB)
+        client = make_client(10)
+        verdict = preflight.check(client, "SELECT 1 FROM p.d.sales", "adc", lambda t: PARTITIONED)
+        self.assertTrue(verdict.allowed)
+        self.assertEqual(client.query.call_count, 1)
+
+    def test_referenced_columns(self):
+        self.assertEqual(referenced_columns("SELECT * FROM p.d.sales", PARTITIONED), ("order_date", "region", "revenue"))
+        self.assertEqual(referenced_columns("SELECT s.* FROM p.d.sales s", PARTITIONED),
+                         ("order_date", "region", "revenue"))
+        self.assertEqual(referenced_columns("SELECT COUNT(*) FROM p.d.sales WHERE Region = 'revenue'", PARTITIONED),
+                         ("region",))
+
+    def test_verdicts_are_cached_per_normalized_sql(self):
+        preflight = QueryPreflight()
+        client = make_client(GiB)
+        preflight.check(client, "SELECT 1 FROM p.d.sales", "adc", lambda t: None)
+        preflight.check(client, "select 1\nfrom p.d.sales", "adc", lambda t: None)
+        preflight.check(client, "select 1 from p.d.sales", "token:other", lambda t: None)
+
+        self.assertEqual(client.query.call_count, 2)
+        self.assertEqual(preflight.stats()["cache_hits"], 1)
+
+    def test_job_config_enforces_maximum_bytes_billed(self):
+        self.assertIsNone(QueryPreflight().job_config())
+        self.assertEqual(QueryPreflight(maximum_bytes_billed=GiB).job_config().maximum_bytes_billed, GiB)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(2_254_857_830), "2.1 GiB")
+        self.assertEqual(format_bytes(3 * 1024 ** 5), "3.0 PiB")
+        self.assertEqual(format_bytes(2048 * 1024 ** 5), "2048.0 PiB")
+        self.assertEqual(format_bytes(None), "an unknown amount of data")
+
+if __name__ == '__main__':
+    unittest.main()
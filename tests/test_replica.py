@@ -0,0 +1,191 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import pyarrow as pa
+from google.cloud import bigquery
+from benchmarks.fakes import create_sales_client
+from sales_agent import tools
+from sales_agent.client_pool import ADC_SCOPE
+from sales_agent.metadata_cache import TableMetadata
+from sales_agent.replica import BIGQUERY, REPLICA, ReplicaRouter, TableReplica, duckdb, replica_compatible, translate_sql
+
+TABLE_ID = "p.sales.sales_transactions"
+
+def metadata_lookup(client):
+    return lambda table_id: TableMetadata.from_table(table_id, client.get_table(table_id))
+
+class TestTranslateSql(unittest.TestCase):
+
+    def test_replaces_table_paths_and_backticks(self):
+        sql = (
+            "SELECT `region`, SUM(s.revenue) FROM `p.sales.sales_transactions` s "
+            "JOIN sales.sales_transactions t ON TRUE WHERE s.note = 'p.sales.sales_transactions'"
+        )
+        self.assertEqual(
+            translate_sql(sql, TABLE_ID, "SRC"),
+            "SELECT \"region\", SUM(s.revenue) FROM SRC s JOIN SRC t ON TRUE WHERE s.note = 'p.sales.sales_transactions'",
+        )
+
+    def test_replica_compatible_allows_only_matching_semantics(self):
+        for sql in (
+            f"SELECT region, ROUND(SUM(revenue), 2) AS revenue FROM `{TABLE_ID}` WHERE order_date >= DATE '2024-06-01' GROUP BY region",
+            f"SELECT EXTRACT(YEAR FROM order_date) AS y, COUNT(DISTINCT customer_id) FROM `{TABLE_ID}` GROUP BY y",
+            f"SELECT product, ROW_NUMBER() OVER (PARTITION BY region ORDER BY revenue DESC) AS n FROM `{TABLE_ID}`",
+            f"SELECT COALESCE(NULLIF(region, 'Europe'), 'n/a') FROM `{TABLE_ID}` WHERE region IN ('Europe', 'Asia Pacific')",
+        ):
+            self.assertTrue(replica_compatible(sql), sql)
+        for sql in (
+            f"SELECT CONCAT(region, NULL) FROM `{TABLE_ID}`",
+            f"SELECT SUBSTR(region, 0, 3) FROM `{TABLE_ID}`",
+            f"SELECT EXTRACT(DAYOFWEEK FROM order_date) FROM `{TABLE_ID}`",
+            f"SELECT SAFE.LOG(revenue) FROM `{TABLE_ID}`",
+            f"SELECT revenue / quantity FROM `{TABLE_ID}`",
+            f"SELECT region || '!' FROM `{TABLE_ID}`",
+            f'SELECT COUNT(*) FROM `{TABLE_ID}` WHERE region = "Europe"',
+            f"SELECT COUNT(*) FROM `{TABLE_ID}` WHERE order_date > TIMESTAMP '2024-01-01'",
+            f"SELECT * FROM `{TABLE_ID}`, UNNEST([1, 2])",
+        ):
+            self.assertFalse(replica_compatible(sql), sql)
+
+@unittest.skipUnless(duckdb, "duckdb is not installed")
+class TestReplica(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = create_sales_client(TABLE_ID, num_rows=300)
+        self.replica = TableReplica(TABLE_ID, self.directory.name, lambda: self.client)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_sync_and_query_match_bigquery(self):
+        self.assertTrue(self.replica.sync())
+        self.assertFalse(self.replica.sync(), "unchanged modification time should not download again")
+        sql = f"SELECT region, COUNT(*) AS n FROM `{TABLE_ID}` WHERE order_date >= DATE '2024-06-01' GROUP BY region ORDER BY region"
+        expected = [dict(row) for row in self.client.query(sql).result()]
+        self.assertEqual(self.replica.query(sql).to_pylist(), expected)
+
+    def test_nulls_sort_like_bigquery(self):
+        self.replica.sync()
+        sql = f"SELECT DISTINCT IF(region = 'Europe', NULL, region) AS region FROM `{TABLE_ID}` ORDER BY region"
+        self.assertIsNone(self.replica.query(sql).column("region")[0].as_py())
+        self.assertIsNone(self.replica.query(sql + " DESC").column("region")[-1].as_py())
+
+    def test_allowed_queries_match_bigquery_on_null_and_index_edges(self):
+        self.replica.sync()
+        router = ReplicaRouter(self.replica, "p")
+        lookup = metadata_lookup(self.client)
+        nullable = (f"WITH s AS (SELECT transaction_id, CASE WHEN region = 'Europe' THEN NULL ELSE region END AS region, "
+                    f"revenue FROM `{TABLE_ID}`) ")
+        for sql in (
+            nullable + "SELECT DISTINCT region FROM s ORDER BY region",
+            nullable + "SELECT DISTINCT region FROM s ORDER BY region DESC",
+            nullable + "SELECT COUNT(region) AS n, COUNT(*) AS total, MIN(region) AS lo, MAX(region) AS hi FROM s",
+            nullable + "SELECT region, COALESCE(region, 'none') AS a, IFNULL(region, 'none') AS b, "
+                       "NULLIF(region, 'Asia Pacific') AS c, UPPER(region) AS d, LENGTH(region) AS e "
+                       "FROM s GROUP BY region ORDER BY region",
+            nullable + "SELECT region, SUM(CASE WHEN region IS NULL THEN 1 ELSE 0 END) AS nulls FROM s "
+                       "GROUP BY region HAVING COUNT(*) > 0 ORDER BY region",
+            nullable + "SELECT transaction_id, LAG(transaction_id) OVER (ORDER BY transaction_id) AS previous, "
+                       "ROW_NUMBER() OVER (ORDER BY transaction_id) AS n FROM s ORDER BY transaction_id LIMIT 3",
+            f"SELECT region, ROUND(SUM(revenue), 2) AS revenue, ROUND(2.5) AS up, ROUND(-2.5) AS down "
+            f"FROM `{TABLE_ID}` GROUP BY region ORDER BY revenue DESC",
+            f"SELECT transaction_id FROM `{TABLE_ID}` ORDER BY transaction_id LIMIT 2 OFFSET 298",
+            f"SELECT SUM(revenue) AS revenue, AVG(quantity) AS quantity FROM `{TABLE_ID}` WHERE region = 'Nowhere'",
+        ):
+            result = router.execute(sql, ADC_SCOPE, lookup)
+            self.assertIsNotNone(result, sql)
+            expected = [dict(row) for row in self.client.query(sql).result()]
+            self.assertEqual(result.rows(0, 1000), expected, sql)
+
+    def test_differing_semantics_route_to_bigquery(self):
+        self.replica.sync()
+        router = ReplicaRouter(self.replica, "p")
+        lookup = metadata_lookup(self.client)
+        for sql in (
+            f"SELECT CONCAT(region, NULL) AS r FROM `{TABLE_ID}`",
+            f"SELECT SUBSTR(region, 0, 3) AS r FROM `{TABLE_ID}`",
+            f"SELECT EXTRACT(DAYOFWEEK FROM order_date) AS d FROM `{TABLE_ID}`",
+        ):
+            self.assertIsNone(router.execute(sql, ADC_SCOPE, lookup), sql)
+        self.assertEqual(router.report()["bigquery_reasons"], {"unsupported_sql": 3})
+
+    def test_snapshot_survives_restart(self):
+        self.replica.sync()
+        restarted = TableReplica(TABLE_ID, self.directory.name, lambda: self.client)
+        self.assertTrue(restarted.ready)
+        self.assertEqual(restarted.manifest.num_rows, 300)
+
+    def test_router_serves_eligible_queries_and_reports_routing(self):
+        self.replica.sync()
+        router = ReplicaRouter(self.replica, "p")
+        lookup = metadata_lookup(self.client)
+
+        result = router.execute(f"SELECT COUNT(*) AS n FROM `{TABLE_ID}`", ADC_SCOPE, lookup)
+        self.assertEqual(result.rows(0, 10), [{"n": 300}])
+        self.assertIs(router.get_result(result.result_id), result)
+        self.assertIsNone(router.execute("SELECT * FROM `p.sales.products`", ADC_SCOPE, lookup))
+        self.assertIsNone(router.execute(f"SELECT COUNT(*) FROM `{TABLE_ID}`", "token:abc", lookup))
+        self.assertIsNone(router.execute(f"SELECT FORMAT_DATE('%Y', order_date) FROM `{TABLE_ID}`", ADC_SCOPE, lookup))
+        # Queries DuckDB fails to run fall back to BigQuery
+        self.assertIsNone(router.execute(f"SELECT no_such_column FROM `{TABLE_ID}`", ADC_SCOPE, lookup))
+
+        report = router.report()
+        self.assertEqual(report["served"], {REPLICA: 1, BIGQUERY: 4})
+        self.assertEqual(report["bigquery_reasons"],
+                         {"other_tables": 1, "user_credentials": 1, "unsupported_sql": 1, "engine_error": 1})
+        self.assertEqual([d["engine"] for d in report["recent"]], [REPLICA] + [BIGQUERY] * 4)
+
+    def test_stale_snapshot_routes_to_bigquery_and_resyncs(self):
+        self.replica.sync()
+        router = ReplicaRouter(self.replica, "p")
+        changed = TableMetadata(table_id=TABLE_ID, columns=(), modified="2099-01-01T00:00:00+00:00")
+        with patch.object(router, "sync_in_background") as resync:
+            self.assertIsNone(router.execute(f"SELECT COUNT(*) FROM `{TABLE_ID}`", ADC_SCOPE, lambda _: changed))
+        resync.assert_called_once()
+        self.assertEqual(router.report()["bigquery_reasons"], {"stale": 1})
+
+    def test_incremental_sync_appends_rows_above_watermark(self):
+        client = MagicMock()
+        table = bigquery.Table(TABLE_ID, schema=[bigquery.SchemaField("id", "INT64")])
+        table._properties["lastModifiedTime"] = "1000"
+        table._properties["numRows"] = "2"
+        client.get_table.return_value = table
+        client.list_rows.return_value.to_arrow.return_value = pa.table({"id": [1, 2]})
+        client.query.return_value.to_arrow.return_value = pa.table({"id": [3]})
+        replica = TableReplica(TABLE_ID, self.directory.name, lambda: client, incremental_column="id")
+
+        replica.sync()
+        table._properties["lastModifiedTime"] = "2000"
+        table._properties["numRows"] = "3"
+        replica.sync()
+
+        job_config = client.query.call_args.kwargs["job_config"]
+        self.assertEqual(job_config.query_parameters[0].value, 2)
+        self.assertEqual((replica.manifest.num_rows, replica.manifest.watermark), (3, "3"))
+        self.assertEqual(replica.query(f"SELECT SUM(id) AS s FROM `{TABLE_ID}`").to_pylist(), [{"s": 6}])
+
+    def test_execute_sql_pages_replica_results(self):
+        self.replica.sync()
+        router = ReplicaRouter(self.replica, "p")
+        with patch("sales_agent.tools.replica_router", router), \
+             patch("sales_agent.tools.get_authorized_bigquery_client", return_value=self.client), \
+             patch("sales_agent.tools.config") as mock_config:
+            mock_config.project_id = "p"
+            mock_config.result_page_rows = 100
+            mock_config.result_page_max_bytes = 32000
+            mock_config.gemini_enterprise_auth_id = None
+            tools.metadata_cache.clear()
+            tools.result_cache.clear()
+            first = tools.execute_sql(f"SELECT transaction_id FROM `{TABLE_ID}` ORDER BY transaction_id")
+            self.assertIn("Showing rows 1-100 of 300", first)
+            self.assertIn("Served from the local replica", first)
+            self.assertEqual(self.client.queries_run, 0)
+
+            handle = first.split('handle="')[1].split('"')[0]
+            second = tools.fetch_more_results(handle, 100)
+            self.assertTrue(second.startswith("transaction_id\n101\n"))
+            self.assertIn("Error", tools.fetch_more_results("replica:local.unknown", 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from sales_agent.result_cache import ResultCache, InMemoryResultBackend, SQLiteResultBackend
+
+class ResultCacheBackendTests:
+    """Shared tests run against every backend."""
+
+    def make_backend(self, max_bytes):
+        raise NotImplementedError
+
+    def test_hit_miss_and_bytes_saved(self):
+        cache = ResultCache(self.make_backend(1024))
+        key = ResultCache.make_key("adc", "select 1 from p.d.t", {"p.d.t": "v1"})
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "[{'a': 1}]", ["p.d.t"], bytes_processed=500)
+        self.assertEqual(cache.get(key), "[{'a': 1}]")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["bytes_saved"], 500)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_table_version_changes_key(self):
+        v1 = ResultCache.make_key("adc", "select 1 from p.d.t", {"p.d.t": "v1"})
+        v2 = ResultCache.make_key("adc", "select 1 from p.d.t", {"p.d.t": "v2"})
+        other_user = ResultCache.make_key("token:abc", "select 1 from p.d.t", {"p.d.t": "v1"})
+        self.assertEqual(len({v1, v2, other_user}), 3)
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResultCache(self.make_backend(25))
+        cache.put("a", "x" * 10, ["p.d.t"])
+        cache.put("b", "y" * 10, ["p.d.t"])
+        cache.get("a")  # b is now least recently used
+        cache.put("c", "z" * 10, ["p.d.t"])
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertLessEqual(cache.stats()["bytes"], 25)
+
+    def test_invalidate_table(self):
+        cache = ResultCache(self.make_backend(1024))
+        cache.put("a", "1", ["p.d.t"])
+        cache.put("b", "2", ["p.d.t2"])
+
+        self.assertEqual(cache.invalidate_table("p.d.t"), 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "2")
+
+class TestInMemoryResultBackend(ResultCacheBackendTests, unittest.TestCase):
+
+    def make_backend(self, max_bytes):
+        return InMemoryResultBackend(max_bytes)
+
+class TestSQLiteResultBackend(ResultCacheBackendTests, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "results.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_backend(self, max_bytes):
+        return SQLiteResultBackend(self.path, max_bytes)
+
+    def test_results_survive_restart(self):
+        ResultCache(self.make_backend(1024)).put("a", "warm", ["p.d.t"])
+        self.assertEqual(ResultCache(self.make_backend(1024)).get("a"), "warm")
+
+if __name__ == '__main__':
+    unittest.main()
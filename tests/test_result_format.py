@@ -0,0 +1,94 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock
+import pyarrow as pa
+from sales_agent.instrumentation import Instrumentation, record_format_stats
+from sales_agent.result_format import ResultFormatter, encode_rows, estimate_tokens
+
+ROWS = [
+    {"region": "North", "revenue": 1000.5, "order_date": datetime.date(2024, 1, 2), "note": None},
+    {"region": "South|East", "revenue": 2000.0, "order_date": datetime.date(2024, 3, 1), "note": "a\tb"},
+]
+
+def sales_rows(n):
+    regions = ["North", "South", "East", "West"]
+    return [{"transaction_id": i, "region": regions[i % 4], "revenue": float(i)} for i in range(n)]
+
+class TestResultFormat(unittest.TestCase):
+
+    def test_encodings_write_column_names_once(self):
+        header, lines = encode_rows(ROWS, "tsv")
+        self.assertEqual(header, ["region\trevenue\torder_date\tnote"])
+        self.assertEqual(lines, ["North\t1000.5\t2024-01-02\tNULL", "South|East\t2000\t2024-03-01\ta b"])
+        header, lines = encode_rows(ROWS, "markdown")
+        self.assertEqual(header[1], "| --- | --- | --- | --- |")
+        self.assertEqual(lines[1], "| South\\|East | 2000 | 2024-03-01 | a\tb |")
+        self.assertEqual(encode_rows(ROWS, "csv")[1][0], "North,1000.5,2024-01-02,")
+
+    def test_compact_format_is_smaller_than_repr(self):
+        rows = sales_rows(100)
+        tsv = ResultFormatter("tsv", max_tokens=0).format_page(rows, 0, 100, False, "h")
+        legacy = ResultFormatter("repr", max_tokens=0).format_page(rows, 0, 100, False, "h")
+        self.assertEqual(legacy.text, str(rows))
+        self.assertLess(tsv.output_bytes, legacy.output_bytes / 2)
+        self.assertFalse(tsv.summarized)
+
+    def test_over_budget_page_is_cut_and_summarized(self):
+        formatter = ResultFormatter("tsv", max_tokens=300)
+        rows = sales_rows(100)
+        page = formatter.format_page(rows, 0, 100, False, "p:US.job_1")
+
+        self.assertLessEqual(page.output_tokens, 300)
+        self.assertTrue(page.summarized)
+        self.assertLess(page.rows_shown, 100)
+        self.assertIn("Summary of all 100 rows:", page.text)
+        self.assertIn("revenue\tfloat64\t100\t100\t0\t99\t4950\t49.5", page.text)
+        self.assertIn("region: North (25), South (25)", page.text)
+        self.assertIn(f'fetch_more_results(handle="p:US.job_1", start_row={page.rows_shown})', page.text)
+        self.assertEqual(formatter.stats()["summarized"], 1)
+
+    def test_summary_covers_full_result_when_available(self):
+        table = pa.Table.from_pylist(sales_rows(5000))
+        page = ResultFormatter("tsv", max_tokens=300).format_page(sales_rows(100), 0, 5000, True, "h", table)
+        self.assertIn("Summary of all 5000 rows:", page.text)
+        self.assertIn("Showing rows 1-", page.text)
+
+        page = ResultFormatter("tsv", max_tokens=300).format_page(sales_rows(100), 0, None, True, "h")
+        self.assertIn("Summary of the 100 rows read for this page:", page.text)
+
+    def test_array_and_struct_columns_are_summarized(self):
+        rows = [{"region": r["region"], "tags": [r["region"], "x"], "meta": {"id": r["transaction_id"] % 2}}
+                for r in sales_rows(100)]
+        for source in (None, pa.Table.from_pylist(rows)):
+            page = ResultFormatter("tsv", max_tokens=300).format_page(rows, 0, 100, False, "h", source)
+            self.assertTrue(page.summarized)
+            self.assertRegex(page.text, r"tags\tobject\t100\t4\t")
+            self.assertIn('meta: {"id": 0} (50), {"id": 1} (50)', page.text)
+
+    def test_full_result_is_summarized_once_per_handle(self):
+        formatter = ResultFormatter("tsv", max_tokens=300)
+        table = MagicMock(wraps=pa.Table.from_pylist(sales_rows(5000)))
+        first = formatter.format_page(sales_rows(100), 0, 5000, True, "h", table)
+        second = formatter.format_page(sales_rows(200)[100:], 100, 5000, True, "h", table)
+        self.assertEqual(table.to_pandas.call_count, 1)
+        self.assertIn("Summary of all 5000 rows:", second.text)
+        self.assertEqual(first.text.split("Summary")[1].split("Showing")[0],
+                         second.text.split("Summary")[1].split("Showing")[0])
+
+    def test_oversized_single_row_is_truncated(self):
+        page = ResultFormatter("tsv", max_tokens=100).format_page([{"text": "x" * 5000}], 0, 1, False, "h")
+        self.assertEqual(page.rows_shown, 1)
+        self.assertLessEqual(page.output_tokens, 100)
+
+    def test_format_stats_reach_tool_spans(self):
+        instrumentation = Instrumentation()
+        tool_context = MagicMock(function_call_id="call_1", invocation_id="inv_1")
+        instrumentation.before_tool(tool=MagicMock(), args={}, tool_context=tool_context)
+        record_format_stats(tool_context, output_bytes=400, output_tokens=100, format_ms=1.5, summarized=True)
+        instrumentation.after_tool(tool=MagicMock(), args={}, tool_context=tool_context, tool_response="ok")
+        counters = instrumentation.summary()["counters"]
+        self.assertEqual((counters["output_tokens"], counters["summarized_results"]), (100, 1))
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+if __name__ == '__main__':
+    unittest.main()
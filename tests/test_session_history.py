@@ -0,0 +1,107 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+from google.adk.events.event import Event
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from sales_agent.session_history import BoundedInMemorySessionService, HistoryCompactor, estimate_history_tokens
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+def tool_response(result):
+    response = types.FunctionResponse(id="c1", name="execute_sql", response={"result": result})
+    return types.Content(role="user", parts=[types.Part(function_response=response)])
+
+def history(turns, result_chars=4000):
+    contents = []
+    for i in range(turns):
+        contents.append(user(f"question {i}"))
+        contents.append(types.Content(role="model", parts=[types.Part(
+            function_call=types.FunctionCall(id="c1", name="execute_sql", args={"sql": "SELECT 1"}))]))
+        contents.append(tool_response(f"col_{i}\n" + "x" * result_chars))
+    return contents
+
+class TestHistoryCompactor(unittest.TestCase):
+
+    def test_old_tool_responses_are_digested_until_within_budget(self):
+        compactor = HistoryCompactor(max_tokens=1500, digest_chars=50)
+        contents = history(4)
+        original = contents[2].parts[0].function_response
+
+        before, after, compacted = compactor.compact(contents)
+
+        self.assertGreater(before, 4000)
+        self.assertLessEqual(after, 1500)
+        self.assertEqual(compacted, 3)
+        self.assertEqual(after, estimate_history_tokens(contents))
+        self.assertIn("Earlier execute_sql result compacted", contents[2].parts[0].function_response.response["result"])
+        self.assertIn("col_0", contents[2].parts[0].function_response.response["result"])
+        # The current turn's result is kept, and the original response object is untouched
+        self.assertTrue(contents[-1].parts[0].function_response.response["result"].endswith("x" * 100))
+        self.assertEqual(len(original.response["result"]), 4006)
+
+    def test_within_budget_history_is_unchanged(self):
+        contents = history(2, result_chars=100)
+        self.assertEqual(HistoryCompactor(max_tokens=8000).compact(contents)[2], 0)
+
+    def test_reports_prompt_size_per_session(self):
+        compactor = HistoryCompactor(max_tokens=1000)
+        context = MagicMock()
+        context.session.id = "s1"
+        compactor.before_model(context, LlmRequest(contents=history(1, result_chars=100)))
+        compactor.before_model(context, LlmRequest(contents=history(3)))
+        points = compactor.report("s1")["s1"]
+        self.assertEqual([p["compacted"] for p in points], [0, 2])
+        self.assertLess(points[1]["sent_tokens"], points[1]["history_tokens"])
+        self.assertEqual(compactor.stats()["compacted_requests"], 1)
+
+class TestBoundedSessionService(unittest.TestCase):
+
+    def test_evicts_least_recently_used_sessions(self):
+        async def run():
+            service = BoundedInMemorySessionService(max_sessions=2)
+            for sid in ("a", "b"):
+                await service.create_session(app_name="app", user_id="u", session_id=sid)
+            await service.get_session(app_name="app", user_id="u", session_id="a")
+            await service.create_session(app_name="app", user_id="u", session_id="c")
+            return service, [await service.get_session(app_name="app", user_id="u", session_id=sid) is not None
+                             for sid in ("a", "b", "c")]
+
+        service, present = asyncio.run(run())
+        self.assertEqual(present, [True, False, True])
+        self.assertEqual(service.stats()["evictions"]["count"], 1)
+
+    def test_memory_cap_and_idle_expiry(self):
+        async def run():
+            service = BoundedInMemorySessionService(max_bytes=3000, idle_ttl_seconds=60)
+            first = await service.create_session(app_name="app", user_id="u", session_id="a")
+            await service.append_event(first, Event(author="user", content=user("x" * 2000)))
+            second = await service.create_session(app_name="app", user_id="u", session_id="b")
+            await service.append_event(second, Event(author="user", content=user("y" * 2000)))
+            memory_evicted = await service.get_session(app_name="app", user_id="u", session_id="a") is None
+
+            await service.create_session(app_name="app", user_id="u", session_id="c")
+            service._usage[("app", "u", "b")][1] = time.monotonic() - 120
+            idle_evicted = await service.get_session(app_name="app", user_id="u", session_id="b") is None
+            return service, memory_evicted, idle_evicted
+
+        service, memory_evicted, idle_evicted = asyncio.run(run())
+        self.assertTrue(memory_evicted)
+        self.assertTrue(idle_evicted)
+        self.assertEqual(service.stats()["evictions"], {"count": 0, "memory": 1, "idle": 1})
+
+    def test_session_evicted_mid_turn_is_restored(self):
+        async def run():
+            service = BoundedInMemorySessionService(max_sessions=1)
+            first = await service.create_session(app_name="app", user_id="u", session_id="a")
+            await service.create_session(app_name="app", user_id="u", session_id="b")
+            await service.append_event(first, Event(author="user", content=user("still running")))
+            return await service.get_session(app_name="app", user_id="u", session_id="a")
+
+        restored = asyncio.run(run())
+        self.assertEqual(restored.events[0].content.parts[0].text, "still running")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from sales_agent import async_tools
+from sales_agent.job_tracking import JobTracker, current_tracker, track_job
+from sales_agent.single_flight import SingleFlight
+from sales_agent.tools import query_preflight, result_cache, single_flight
+
+def run_concurrently(count, fn):
+    barrier = threading.Barrier(count)
+
+    def call(i):
+        barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(call, range(count)))
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_identical_calls_share_one_run(self):
+        flight, calls = SingleFlight(), []
+
+        def query():
+            calls.append(1)
+            time.sleep(0.2)
+            return "rows"
+
+        results = run_concurrently(5, lambda i: flight.do("key", query))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], ["rows"] * 5)
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 4)
+        stats = flight.stats()
+        self.assertEqual((stats["leaders"], stats["coalesced"], stats["in_flight"]), (1, 4, 0))
+
+    def test_followers_rerun_when_the_leader_fails(self):
+        flight, calls = SingleFlight(), []
+
+        def query():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise RuntimeError("leader's credentials expired")
+            return "rows"
+
+        def call(i):
+            try:
+                return flight.do("key", query)[0]
+            except RuntimeError as e:
+                return str(e)
+
+        results = run_concurrently(3, call)
+        self.assertEqual(sorted(results), ["leader's credentials expired", "rows", "rows"])
+        self.assertEqual(flight.stats()["follower_retries"], 2)
+
+    def test_jobs_are_cancelled_only_when_every_waiter_gives_up(self):
+        flight, job, started, finish = SingleFlight(), MagicMock(job_id="job_1"), threading.Event(), threading.Event()
+        trackers = [JobTracker(), JobTracker()]
+
+        def query():
+            track_job(job)
+            started.set()
+            finish.wait(5)
+            return "rows"
+
+        def call(i):
+            current_tracker.set(trackers[i])
+            if i:
+                started.wait(5)
+            return flight.do("key", query)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(call, i) for i in range(2)]
+            started.wait(5)
+            while flight.stats()["coalesced"] == 0:
+                time.sleep(0.01)
+            trackers[0].cancel_all()
+            job.cancel.assert_not_called()
+            trackers[1].cancel_all()
+            job.cancel.assert_called_once()
+            finish.set()
+            self.assertEqual([f.result()[0] for f in futures], ["rows", "rows"])
+        self.assertEqual(flight.stats()["abandoned"], 1)
+
+class TestExecuteSqlCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        query_preflight.clear()
+        single_flight.clear()
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_concurrent_tool_calls_run_one_job(self, mock_get_client):
+        client = MagicMock()
+        mock_get_client.return_value = client
+
+        def slow_result(*args, **kwargs):
+            time.sleep(0.3)
+            return [{"region": "North", "revenue": 10}]
+
+        client.query.return_value.result.side_effect = slow_result
+
+        async def run():
+            sql = "SELECT region, SUM(revenue) AS revenue FROM `p.d.sales` GROUP BY 1"
+            return await asyncio.gather(*(async_tools.execute_sql(sql, tool_context=MagicMock()) for _ in range(4)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(set(results), {"region\trevenue\nNorth\t10"})
+        real_queries = [c for c in client.query.call_args_list if not getattr(c.kwargs["job_config"], "dry_run", False)]
+        self.assertEqual(len(real_queries), 1)
+        self.assertEqual(single_flight.stats()["coalesced"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from sales_agent.sql_utils import normalize_sql, extract_table_refs, qualify_table_id, is_read_only, is_deterministic
+
+class TestSqlUtils(unittest.TestCase):
+
+    def test_normalize_sql_ignores_whitespace_case_and_comments(self):
+        a = "SELECT  Region, SUM(revenue) -- total\nFROM `p.d.sales` /* note */ WHERE region = 'North'"
+        b = "select region,sum(REVENUE) from `p.d.sales` where REGION='North';"
+        self.assertEqual(normalize_sql(a), normalize_sql(b))
+
+    def test_normalize_sql_keeps_literals_and_table_names(self):
+        self.assertNotEqual(normalize_sql("SELECT 'North'"), normalize_sql("SELECT 'north'"))
+        self.assertNotEqual(normalize_sql("SELECT * FROM d.Sales"), normalize_sql("SELECT * FROM d.sales"))
+
+    def test_extract_table_refs(self):
+        sql = """
+            WITH recent AS (SELECT * FROM `p.d.orders`)
+            SELECT * FROM recent JOIN p.d.customers c ON TRUE, UNNEST(c.tags)
+            WHERE c.id IN (SELECT id FROM d.vip)
+        """
+        self.assertEqual(extract_table_refs(sql), ["p.d.orders", "p.d.customers", "d.vip"])
+        self.assertEqual(extract_table_refs("SELECT * FROM a.b x, c.d y WHERE 1=1"), ["a.b", "c.d"])
+        self.assertEqual(extract_table_refs("SELECT 'from x.y' AS s"), [])
+
+    def test_extract_table_refs_skips_non_table_from(self):
+        sql = "SELECT EXTRACT(YEAR FROM order_date) y, SUM(revenue) FROM `p.d.t` GROUP BY y"
+        self.assertEqual(extract_table_refs(sql), ["p.d.t"])
+        sql = "SELECT EXTRACT(WEEK(MONDAY) FROM d) FROM p.d.t WHERE a IS DISTINCT FROM b.c"
+        self.assertEqual(extract_table_refs(sql), ["p.d.t"])
+
+    def test_extract_table_refs_skips_correlated_aliases(self):
+        sql = "SELECT o.id, i.sku FROM `p.d.orders` AS o, o.items AS i JOIN d.skus s ON s.sku = i.sku"
+        self.assertEqual(extract_table_refs(sql), ["p.d.orders", "d.skus"])
+        sql = "SELECT * FROM d.orders o WHERE EXISTS (SELECT 1 FROM o.lines l WHERE l.qty > 1)"
+        self.assertEqual(extract_table_refs(sql), ["d.orders"])
+        sql = "WITH recent AS (SELECT * FROM d.orders) SELECT * FROM recent r, r.items"
+        self.assertEqual(extract_table_refs(sql), ["d.orders"])
+        # A backticked path is a table even when its first part matches an alias
+        self.assertEqual(extract_table_refs("SELECT * FROM d.a AS d, `d.b`"), ["d.a", "d.b"])
+
+    def test_qualify_table_id(self):
+        self.assertEqual(qualify_table_id("d.t", "p"), "p.d.t")
+        self.assertEqual(qualify_table_id("p.d.t", "other"), "p.d.t")
+        self.assertIsNone(qualify_table_id("t", "p"))
+        self.assertIsNone(qualify_table_id("p.d.events_*", "p"))
+        self.assertIsNone(qualify_table_id("p.d.INFORMATION_SCHEMA.TABLES", "p"))
+
+    def test_statement_classification(self):
+        self.assertTrue(is_read_only("WITH x AS (SELECT 1) SELECT * FROM x;"))
+        self.assertFalse(is_read_only("DELETE FROM t WHERE TRUE"))
+        self.assertFalse(is_read_only("SELECT 1; DROP TABLE t"))
+        self.assertFalse(is_deterministic("SELECT * FROM t WHERE d = CURRENT_DATE()"))
+        self.assertTrue(is_deterministic("SELECT 'current_date' AS label"))
+
+if __name__ == '__main__':
+    unittest.main()
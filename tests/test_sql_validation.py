@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from google.cloud import bigquery
+from sales_agent.metadata_cache import ColumnInfo, TableMetadata
+from sales_agent.sql_validation import REJECTION_PREFIX, SqlValidator
+from sales_agent.tools import execute_sql, metadata_cache, query_preflight, result_cache, sql_validator
+
+SCHEMAS = {
+    "p.d.sales": ("order_id", "region", "product_id", "revenue", "order_date"),
+    "p.d.products": ("product_id", "name", "category"),
+}
+
+def table_metadata(table_id):
+    columns = SCHEMAS.get(table_id)
+    return TableMetadata(table_id, tuple(ColumnInfo(name, "STRING") for name in columns)) if columns else None
+
+def dataset_tables(dataset_id):
+    return sorted(t.rpartition(".")[2] for t in SCHEMAS if t.startswith(dataset_id + "."))
+
+class TestSqlValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = SqlValidator(default_project="p")
+
+    def validate(self, sql):
+        return self.validator.validate(sql, table_metadata, dataset_tables)
+
+    def test_valid_queries_pass(self):
+        for sql in (
+            "SELECT region, SUM(revenue) AS total FROM `p.d.sales` GROUP BY region ORDER BY total DESC",
+            "SELECT s.region, p.category FROM d.sales s JOIN d.products p ON s.product_id = p.product_id",
+            "WITH t AS (SELECT region, revenue FROM `p.d.sales`) SELECT region FROM t WHERE revenue > 0",
+            "SELECT * FROM `p.d.sales` s WHERE EXISTS (SELECT 1 FROM `p.d.products` p WHERE p.product_id = s.product_id)",
+            "SELECT region, tag FROM `p.d.sales`, UNNEST(['a', 'b']) AS tag",
+            "SELECT _PARTITIONTIME FROM `p.d.sales`",
+        ):
+            self.assertIsNone(self.validate(sql), sql)
+
+    def test_misspelled_column_is_rejected_with_suggestion(self):
+        problem = self.validate("SELECT region, SUM(revenu) FROM `p.d.sales` GROUP BY region")
+        self.assertTrue(problem.startswith(REJECTION_PREFIX))
+        self.assertIn("column `revenu` not found in `p.d.sales`; did you mean `revenue`?", problem)
+        self.assertIn("Available columns: order_date, order_id, product_id, region, revenue.", problem)
+
+    def test_qualified_column_is_checked_against_its_table(self):
+        problem = self.validate("SELECT p.region FROM `p.d.sales` s JOIN `p.d.products` p USING (product_id)")
+        self.assertIn("column `region` not found in `p.d.products`", problem)
+
+    def test_unknown_table_is_rejected_from_dataset_listing(self):
+        problem = self.validate("SELECT * FROM `p.d.sale`")
+        self.assertIn("table `p.d.sale` not found; did you mean `sales`?", problem)
+        self.assertIn("Available tables in `p.d`: products, sales.", problem)
+
+    def test_uncached_and_unparsable_queries_pass(self):
+        self.assertIsNone(self.validate("SELECT anything FROM `p.other.t`"))
+        self.assertIsNone(self.validate("SELECT FROM WHERE"))
+        self.assertIsNone(self.validate("DELETE FROM `p.d.sales` WHERE revnue < 0"))
+        self.assertEqual(self.validator.stats()["skipped"], 1)
+
+    def test_stats(self):
+        self.validate("SELECT region FROM `p.d.sales`")
+        self.validate("SELECT regoin FROM `p.d.sales`")
+        stats = self.validator.stats()
+        self.assertEqual((stats["validated"], stats["rejected"]), (2, 1))
+        self.assertLess(stats["avg_ms"], 100)
+
+    def test_disabled_validator_passes_everything(self):
+        validator = SqlValidator(default_project="p", enabled=False)
+        self.assertIsNone(validator.validate("SELECT regoin FROM `p.d.sales`", table_metadata, dataset_tables))
+
+class TestExecuteSqlValidation(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        query_preflight.clear()
+        metadata_cache.clear()
+        sql_validator.clear()
+
+    def tearDown(self):
+        metadata_cache.clear()
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_rejected_query_never_reaches_bigquery(self, mock_get_client):
+        client = MagicMock()
+        mock_get_client.return_value = client
+        loader = MagicMock()
+        loader.get_table.return_value = bigquery.Table(
+            "p.d.sales", schema=[bigquery.SchemaField(name, "STRING") for name in SCHEMAS["p.d.sales"]]
+        )
+        metadata_cache.get_table("adc", "p.d.sales", lambda: loader)
+
+        result = execute_sql("SELECT regoin, SUM(revenue) FROM `p.d.sales` GROUP BY 1")
+
+        self.assertIn("did you mean `region`?", result)
+        client.query.assert_not_called()
+        self.assertEqual(sql_validator.stats()["rejected"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import unittest
+from benchmarks.startup import parse_importtime, compare
+
+class TestStartup(unittest.TestCase):
+
+    def test_importing_agent_module_is_lazy(self):
+        code = (
+            "import sys, sales_agent.agent as a\n"
+            "assert a._root_agent is None, 'agent built at import'\n"
+            "assert 'google.adk.agents.llm_agent' not in sys.modules, 'ADK imported eagerly'\n"
+            "assert 'google.adk.sessions.vertex_ai_session_service' not in sys.modules\n"
+        )
+        env = dict(os.environ, GOOGLE_CLOUD_PROJECT="p", GOOGLE_CLOUD_LOCATION="us-central1", BIGQUERY_TABLE_ID="p.d.t")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_config_module_has_no_import_side_effects(self):
+        env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_CLOUD_PROJECT", "BIGQUERY_TABLE_ID")}
+        result = subprocess.run(
+            [sys.executable, "-c", "import sales_agent.config as c; assert c._config is None"],
+            capture_output=True, text=True, env=env,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_agent_module_imports_without_configuration(self):
+        env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_CLOUD_PROJECT", "BIGQUERY_TABLE_ID")}
+        code = (
+            "import sales_agent.agent, sales_agent.config as c\n"
+            "assert c._config is None, 'config read at import'\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     json.decoder\n"
+            "import time:       300 |        420 |   json\n"
+            "import time:        50 |        470 | sales_agent.agent\n"
+        )
+        self.assertEqual(parse_importtime(stderr), [
+            ("json.decoder", 120, 120, 2),
+            ("json", 300, 420, 1),
+            ("sales_agent.agent", 50, 470, 0),
+        ])
+
+    def test_compare_flags_regressions(self):
+        baseline = {"import_total_s": 0.1, "import_s": 0.1, "ready_s": 1.0}
+        report = {"import_total_s": 0.1, "import_s": 0.1, "ready_s": 1.5}
+        self.assertEqual(len(compare(report, baseline, tolerance=0.25)), 1)
+        self.assertEqual(compare(report, baseline, tolerance=0.6), [])
+
+if __name__ == '__main__':
+    unittest.main()
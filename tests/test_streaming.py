@@ -0,0 +1,108 @@
+import asyncio
+import io
+import unittest
+from types import SimpleNamespace
+from typing import AsyncGenerator
+from google.adk.agents.llm_agent import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from sales_agent.instrumentation import QUERY_PROGRESS_STATE_KEY, Instrumentation, record_query_stats
+from sales_agent.streaming import StreamRenderer, describe_tool_result
+
+ANSWER_CHUNKS = ["Revenue was ", "2.1 million ", "last quarter."]
+
+class StreamingLlm(BaseLlm):
+    """Calls `run_query` once, then streams its answer in chunks when asked to."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        last = llm_request.contents[-1].parts[0]
+        if last.function_response is None:
+            yield LlmResponse(content=types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(name="run_query", args={}))
+            ]))
+            return
+        if stream:
+            for chunk in ANSWER_CHUNKS:
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="".join(ANSWER_CHUNKS))]))
+
+def run_query(tool_context) -> str:
+    """Runs the query."""
+    job = SimpleNamespace(job_id="job-1", total_bytes_processed=2_254_857_830, slot_millis=30, cache_hit=False)
+    record_query_stats(tool_context, job)
+    return "2100000"
+
+def run_turn(streaming: bool):
+    instrumentation = Instrumentation()
+    agent = Agent(name="test_agent", model=StreamingLlm(model="scripted"), tools=[run_query],
+                  **instrumentation.callbacks())
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    out = io.StringIO()
+
+    async def run():
+        session = await runner.session_service.create_session(app_name="test", user_id="u")
+        renderer = StreamRenderer(out=out)
+        message = types.Content(role="user", parts=[types.Part(text="What was revenue?")])
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+        async for event in runner.run_async(user_id="u", session_id=session.id, new_message=message,
+                                            run_config=run_config):
+            renderer.feed(event)
+        return renderer.finish()
+
+    timings = asyncio.run(run())
+    return out.getvalue(), timings, instrumentation
+
+class TestStreamRenderer(unittest.TestCase):
+
+    def test_streamed_turn_prints_chunks_once_with_tool_progress(self):
+        output, timings, _ = run_turn(streaming=True)
+
+        self.assertEqual(timings["partial_events"], 3)
+        self.assertEqual(output.count("Revenue was 2.1 million last quarter."), 1)
+        self.assertIn("[calling run_query…]", output)
+        self.assertRegex(output, r"\[run_query done \(2\.1 GiB scanned, \d+\.\d s\)\]")
+        self.assertLessEqual(timings["first_token_s"], timings["answer_s"])
+        self.assertLessEqual(timings["answer_s"], timings["total_s"])
+
+    def test_unstreamed_turn_prints_whole_answer(self):
+        output, timings, _ = run_turn(streaming=False)
+        self.assertEqual(timings["partial_events"], 0)
+        self.assertTrue(output.rstrip().endswith("Agent: Revenue was 2.1 million last quarter."))
+
+    def test_deployed_event_dicts(self):
+        out = io.StringIO()
+        renderer = StreamRenderer(out=out, prefix="")
+        renderer.feed({"content": {"parts": [{"function_call": {"id": "c1", "name": "execute_sql", "args": {}}}]}})
+        renderer.feed({
+            "content": {"parts": [{"function_response": {"id": "c1", "name": "execute_sql", "response": {}}}]},
+            "actions": {"state_delta": {QUERY_PROGRESS_STATE_KEY: {"c1": {"queries": 1, "cache_hits": 1}}}},
+        })
+        renderer.feed({"content": {"parts": [{"text": "Done"}]}, "partial": True})
+        renderer.feed({"content": {"parts": [{"text": "Done."}]}})
+        self.assertEqual(out.getvalue().splitlines()[-1], "Done")
+        self.assertIn("execute_sql done (served from cache", out.getvalue())
+        self.assertEqual(renderer.answer, "Done.")
+
+    def test_describe_tool_result(self):
+        self.assertEqual(describe_tool_result("list_tables", None, None), "list_tables done")
+        self.assertEqual(
+            describe_tool_result("execute_sql", 2.04, {"queries": 1, "bytes_processed": 2_254_857_830, "cache_hits": 0}),
+            "execute_sql done (2.1 GiB scanned, 2.0 s)",
+        )
+
+class TestPerceivedLatency(unittest.TestCase):
+
+    def test_turn_span_records_time_to_first_token_and_answer(self):
+        _, _, instrumentation = run_turn(streaming=True)
+        latency = instrumentation.summary()["latency"]
+        self.assertEqual(latency["first_token:test_agent"]["count"], 1)
+        self.assertEqual(latency["answer:test_agent"]["count"], 1)
+        self.assertLessEqual(latency["first_token:test_agent"]["p50_ms"], latency["answer:test_agent"]["p50_ms"])
+        self.assertLessEqual(latency["answer:test_agent"]["p50_ms"], latency["turn:test_agent"]["p50_ms"])
+        self.assertIn('kind="first_token"', instrumentation.prometheus_text())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,22 @@
+import time
 import unittest
 from unittest.mock import MagicMock, patch
-from sales_agent.tools import get_authorized_bigquery_client, execute_sql, get_bigquery_tools, list_tables, get_table_schema
+from sales_agent.tools import get_authorized_bigquery_client, execute_sql, execute_sql_batch, fetch_more_results, get_bigquery_tools, list_tables, get_table_schema, client_pool, metadata_cache, result_cache, parse_result_handle, query_preflight
 
 class TestBigQueryTools(unittest.TestCase):
 
+    def setUp(self):
+        client_pool.clear()
+        metadata_cache.clear()
+        result_cache.clear()
+        query_preflight.clear()
+
     def test_get_bigquery_tools(self):
-        tools = get_bigquery_tools()
+        tools = get_bigquery_tools(use_async=False)
         self.assertIsInstance(tools, list)
         self.assertIn(execute_sql, tools)
+        self.assertIn(fetch_more_results, tools)
+        self.assertIn(execute_sql_batch, tools)
         self.assertIn(list_tables, tools)
         self.assertIn(get_table_schema, tools)
 
@@ -44,6 +53,34 @@ class TestBigQueryTools(unittest.TestCase):
         # Verify result
         self.assertIn("revenue: NUMERIC", result)
 
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_get_table_schema_is_cached_across_sessions(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        mock_field = MagicMock()
+        mock_field.name = "revenue"
+        mock_field.field_type = "NUMERIC"
+        mock_client.get_table.return_value = MagicMock(schema=[mock_field], etag="v1")
+
+        first = get_table_schema("p.d.t", tool_context=MagicMock())
+        second = get_table_schema("p.d.t", tool_context=MagicMock())
+
+        # The second session is served from the process-level cache
+        self.assertEqual(first, second)
+        mock_client.get_table.assert_called_once_with("p.d.t")
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_get_table_schema_uses_session_memo(self, mock_get_client):
+        tool_context = MagicMock()
+        tool_context.state = {
+            "metadata_memo:table:p.d.t": {"version": "v1", "text": "Schema for p.d.t:\nrevenue: NUMERIC", "cached_at": time.time()}
+        }
+
+        result = get_table_schema("p.d.t", tool_context=tool_context)
+
+        self.assertIn("revenue: NUMERIC", result)
+        mock_get_client.assert_not_called()
+
     @patch('sales_agent.tools.bigquery.Client')
     @patch('sales_agent.tools.Credentials')
     def test_get_authorized_bigquery_client_with_context(self, mock_credentials, mock_bq_client):
@@ -87,10 +124,98 @@ class TestBigQueryTools(unittest.TestCase):
         result = execute_sql("SELECT * FROM sales", tool_context=MagicMock())
         
         # Verify results
-        self.assertIn("'revenue': 1000", result)
-        self.assertIn("'region': 'North'", result)
-        self.assertIn("'revenue': 2000", result)
-        self.assertIn("'region': 'South'", result)
+        self.assertEqual(result, "revenue\tregion\n1000\tNorth\n2000\tSouth")
+
+    @patch('sales_agent.tools.bigquery.Client')
+    def test_get_authorized_bigquery_client_reuses_pooled_client(self, mock_bq_client):
+        first = get_authorized_bigquery_client(None)
+        second = get_authorized_bigquery_client(None)
+
+        # The ADC client is built once and then served from the pool
+        mock_bq_client.assert_called_once()
+        self.assertIs(first, second)
+        self.assertEqual(client_pool.stats()["hits"], 1)
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_execute_sql_serves_repeated_query_from_cache(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        mock_client.get_table.return_value = MagicMock(schema=[], etag="v1", table_type="TABLE", streaming_buffer=None)
+        mock_client.query.return_value.result.return_value = [{'revenue': 1000}]
+        mock_client.query.return_value.total_bytes_processed = 2048
+
+        first = execute_sql("SELECT SUM(revenue) FROM `p.d.sales`", tool_context=MagicMock())
+        second = execute_sql("select sum(revenue)\nfrom `p.d.sales` -- again", tool_context=MagicMock())
+
+        # Only the first call reaches BigQuery (one dry run plus the query itself)
+        self.assertEqual(first, second)
+        self.assertEqual(mock_client.query.call_count, 2)
+        self.assertEqual(result_cache.stats()["bytes_saved"], 2048)
+
+    @patch('sales_agent.tools.config')
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_execute_sql_returns_first_page_with_handle(self, mock_get_client, mock_config):
+        mock_config.result_page_rows = 2
+        mock_config.result_page_max_bytes = 10000
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        query_job = mock_client.query.return_value
+        query_job.project, query_job.location, query_job.job_id = "p", "US", "job_123"
+        query_job.result.return_value = iter([{'id': i} for i in range(3)])
+
+        result = execute_sql("SELECT id FROM sales", tool_context=MagicMock())
+
+        self.assertTrue(result.startswith("id\n0\n1\n\nShowing rows 1-2"))
+        self.assertIn('fetch_more_results(handle="p:US.job_123", start_row=2)', result)
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_fetch_more_results_reads_destination_table(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        mock_client.list_rows.return_value = [{'id': 2}]
+
+        result = fetch_more_results("p:US.job_123", 2, tool_context=MagicMock())
+
+        self.assertEqual(result, "id\n2")
+        mock_client.get_job.assert_called_once_with("job_123", project="p", location="US")
+        mock_client.query.assert_not_called()
+        _, kwargs = mock_client.list_rows.call_args
+        self.assertEqual(kwargs["start_index"], 2)
+
+    def test_parse_result_handle(self):
+        self.assertEqual(parse_result_handle("example.com:proj:US.job_1"), ("example.com:proj", "US", "job_1"))
+        with self.assertRaises(ValueError):
+            parse_result_handle("job_1")
+
+    @patch('sales_agent.tools.get_authorized_bigquery_client')
+    def test_execute_sql_rejected_by_preflight(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_get_client.return_value = mock_client
+        dry_run_job = MagicMock(total_bytes_processed=50 * 1024 ** 4, referenced_tables=[])
+        mock_client.query.return_value = dry_run_job
+
+        result = execute_sql("SELECT * FROM `p.d.sales`", tool_context=MagicMock())
+
+        self.assertIn("Query rejected by pre-flight check", result)
+        # Only the dry run was submitted
+        mock_client.query.assert_called_once()
+        self.assertTrue(mock_client.query.call_args.kwargs["job_config"].dry_run)
+
+    @patch('sales_agent.tools.execute_sql')
+    def test_execute_sql_batch_labels_results_and_errors(self, mock_execute_sql):
+        mock_execute_sql.side_effect = lambda sql, tool_context=None: (
+            "Error executing query: boom" if "bad" in sql else f"rows for {sql}"
+        )
+
+        result = execute_sql_batch(["SELECT 1", "SELECT bad", "SELECT 3"], tool_context=MagicMock())
+
+        self.assertEqual(mock_execute_sql.call_count, 3)
+        self.assertLess(result.index("### Query 1"), result.index("### Query 2"))
+        self.assertIn("### Query 2\nSQL: SELECT bad\nResult:\nError executing query: boom", result)
+        self.assertIn("rows for SELECT 3", result)
+
+    def test_execute_sql_batch_rejects_empty_batch(self):
+        self.assertIn("no queries", execute_sql_batch([], tool_context=MagicMock()))
 
 if __name__ == '__main__':
     unittest.main()